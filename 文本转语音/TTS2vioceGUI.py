@@ -1,14 +1,36 @@
 import sys
-import asyncio
 import os
+import time
+import queue
+import shutil
+import asyncio
+import logging
+import tempfile
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                               QHBoxLayout, QTextEdit, QPushButton, QComboBox, 
                               QLabel, QSpinBox, QMessageBox, QFileDialog, QSystemTrayIcon, QSlider)
 from PySide6.QtCore import Qt, QThread, Signal, QUrl, QSize, QTimer, QEvent
 from PySide6.QtMultimedia import QMediaPlayer, QAudioOutput
-from PySide6.QtGui import QIcon
+from PySide6.QtGui import QIcon, QColor
 import resources_rc
-from edge_tts import Communicate
+from tts_core import split_sentences, split_chunks, chunk_index_at, synthesize_scheduled, atomic_write
+from chunk_scheduler import PlayheadScheduler
+from audio_index import AudioIndex, index_path
+from sentence_cache import SentenceCache
+from event_watchdog import EventLoopWatchdog
+from large_editor import ChunkEditor, ChunkStatus
+import tts_core
+from connection_pool import ConnectionPool, shared_loop
+from estimator import DurationEstimator, format_duration
+from progress import ConversionProgress
+import local_render
+from local_render import LocalRenderer
+import session_replay
+import silence_trim
+from silence_trim import trim_results
+from chunk_journal import ChunkJournal
+from audition import DEFAULT_PREVIEW_DIR, audition, preview_text, cached_preview
+from tts_api import VOICES
 
 class CustomButton(QPushButton):
     def __init__(self, icon_path, tooltip, parent=None, is_import=False, button_size=None):
@@ -45,6 +67,17 @@ class CustomButton(QPushButton):
 class TTSThread(QThread):
     finished = Signal(bool)
     error = Signal(str)
+    chunk_started = Signal(int)
+    chunk_finished = Signal(int)
+    # 分块完成后发出 (分块区间列表, 句子结束位置列表)
+    chunks_ready = Signal(object, object)
+    # 开始合成前发出 estimator.Estimate
+    estimated = Signal(object)
+    # 合并限流后的进度快照 progress.ProgressSnapshot
+    progress_changed = Signal(object)
+    cancelled = Signal()
+    # 分块的音频已写入单独的文件时发出 (分块序号, 路径)，转换期间即可播放
+    chunk_playable = Signal(int, str)
     
     def __init__(self, text, voice, rate, volume, filename):
         super().__init__()
@@ -54,68 +87,269 @@ class TTSThread(QThread):
         self.volume = volume
         self.filename = filename
         self.is_cancelled = False
-        self._loop = None
+        self._future = None
+        # 后台事件循环中执行合成的任务，取消时直接取消它
+        self._task = None
         self.max_retries = 3
+        self.concurrency = 3
+        # 分块在线程中进行，避免大文档阻塞界面线程
+        self.chunks = []
+        self.scheduler = None
+        self.playhead_offset = 0
+        self.audio_index = None
+        # 跨文档的句子缓存，只合成从未出现过的句子；为 None 时不使用缓存（离线回放）
+        self.cache = SentenceCache()
+        # 由界面传入的 DurationEstimator，用于预估耗时并在完成后校准
+        self.estimator = None
+        self.progress = None
+        # 拼接前去掉各分块首尾多余的静音并规整停顿（需要 numpy 和 soundfile）
+        self.trim_silence = silence_trim.AVAILABLE
+        # 记录已完成分块的日志，中断后重新转换同一文档时从中恢复
+        self.journal = None
+        # 转换期间各分块单独的音频文件所在目录，界面不再播放后由界面删除
+        self.partial_dir = None
+        # 后台事件循环中完成的 (分块序号, ChunkAudio)，由本线程写成文件
+        self._completed = queue.Queue()
 
     def run(self):
-        retries = 0
-        while retries < self.max_retries:
+        success = None
+        try:
+            if self.is_cancelled:
+                return
+
+            # 按句子边界分块，由调度器决定合成顺序
+            sentences = split_sentences(self.text)
+            self.chunks = split_chunks(self.text, sentences=sentences)
+            self.scheduler = PlayheadScheduler(len(self.chunks))
+            self.scheduler.seek(chunk_index_at(self.chunks, self.playhead_offset))
+            self.chunks_ready.emit([(chunk.start, chunk.end) for chunk in self.chunks],
+                                   [end for _, end in sentences])
+            if self.estimator:
+                estimate = self.estimator.estimate(self.text, self.voice, self.rate, self.concurrency)
+                estimate.chunks = len(self.chunks)
+                self.estimated.emit(estimate)
+            start_time = time.monotonic()
+            cache_hits = self.cache.hits if self.cache else 0
+            self.progress = ConversionProgress(len(self.chunks), emit=self.progress_changed.emit)
+
             try:
-                async def tts_task():
-                    communicate = Communicate(self.text, self.voice, rate=self.rate, volume=self.volume)
-                    await communicate.save(self.filename)
+                self.journal = ChunkJournal(self.text, self.voice, self.rate, self.volume, self.chunks)
+                restored = self.journal.restored
+            except OSError as e:
+                print(f"无法创建分块日志，本次转换不支持断点续传: {str(e)}")
+                self.journal = None
+                restored = {}
+            for index in restored:
+                self.scheduler.mark_done(index)
+                self.progress.chunk_done(index)
+                self.chunk_finished.emit(index)
+            try:
+                self.partial_dir = tempfile.mkdtemp(prefix="text2voice_partial_")
+            except OSError as e:
+                print(f"无法创建临时目录，转换期间不能播放已完成的部分: {str(e)}")
+            for index, result in restored.items():
+                self.publish_chunk(index, result)
 
-                self._loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(self._loop)
-                
+            # 在共享的后台事件循环中合成，连接池中的连接可跨任务复用
+            self._future = shared_loop().submit(self.synthesize())
+            # 合成协程结束后放入 None，结束下面的发布循环
+            self._future.add_done_callback(lambda future: self._completed.put(None))
+            # 分块一完成就写成单独的文件，界面据此播放从播放位置起连续完成的部分
+            for index, result in iter(self._completed.get, None):
                 if not self.is_cancelled:
-                    self._loop.run_until_complete(tts_task())
-                    self.finished.emit(True)
-                    return
-                    
-            except Exception as e:
-                error_msg = str(e)
-                retries += 1
-                if retries < self.max_retries:
-                    print(f"转换失败，正在重试 ({retries}/{self.max_retries}): {error_msg}")
-                    self.msleep(1000)  # 等待1秒后重试
-                    continue
-                else:
-                    print(f"转换错误: {error_msg}")
-                    self.error.emit(f"转换失败: {error_msg}")
-                    self.finished.emit(False)
-                    return
-            finally:
-                if self._loop:
-                    self._loop.close()
-                    self._loop = None
+                    self.publish_chunk(index, result)
+            # 取消的是循环中的任务而不是这个 future，result() 返回时合成协程已经结束，不会再写日志
+            results = self._future.result()
+            if self.is_cancelled:
+                return
+            self.progress.flush()
+            for index, result in restored.items():
+                results[index] = result
+            if self.trim_silence:
+                results = trim_results(self.chunks, results)
+
+            # 按文档顺序拼接各分块音频，写完后原子地替换输出文件，中途失败不会留下残缺的文件
+            atomic_write(self.filename, (result.audio for result in results))
+
+            # 保存文本偏移与音频时间的索引，供点击跳转和句子高亮使用
+            self.audio_index = AudioIndex.from_chunks(self.text, self.chunks, results)
+            self.audio_index.save(index_path(self.filename))
+
+            if self.estimator:
+                # 命中缓存的任务耗时偏短，只用来校准音频时长
+                cached = self.cache is not None and self.cache.hits != cache_hits
+                wall_s = time.monotonic() - start_time if not cached and not restored else None
+                audio_s = sum(result.duration_ms for result in results) / 1000
+                self.estimator.observe(self.text, self.voice, self.rate, audio_s, wall_s, self.concurrency)
+                self.estimator.save()
+            if self.journal:
+                self.journal.discard()
+                self.journal = None
+            success = True
+            self.finished.emit(True)
+
+        except Exception as e:
+            if self.is_cancelled:
+                return
+            error_msg = str(e)
+            success = False
+            print(f"转换错误: {error_msg}")
+            self.error.emit(f"转换失败: {error_msg}")
+            self.finished.emit(False)
+        finally:
+            self._future = None
+            self._task = None
+            if self.journal:
+                # 失败或取消时保留日志，下次转换同一文档时继续；关闭前写完已提交的分块
+                self.journal.close()
+                self.journal = None
+            # 合成完成后、写入文件期间才取消时结果已被界面忽略，同样需要通知界面
+            if self.is_cancelled:
+                self.cancelled.emit()
+
+    async def synthesize(self):
+        self._task = asyncio.current_task()
+        return await synthesize_scheduled(
+            self.chunks, self.scheduler, self.voice, self.rate, self.volume,
+            concurrency=self.concurrency, max_retries=self.max_retries,
+            on_chunk_start=self.on_chunk_start, on_chunk_done=self.on_chunk_done,
+            on_audio=self.progress.audio_received, on_result=self.on_chunk_result,
+            is_cancelled=lambda: self.is_cancelled, cache=self.cache)
+
+    def on_chunk_start(self, index):
+        self.progress.chunk_started(index)
+        self.chunk_started.emit(index)
+
+    def on_chunk_result(self, index, result):
+        if self.journal:
+            self.journal.append(index, result)
+        self._completed.put((index, result))
+
+    def publish_chunk(self, index, result):
+        """把一个分块的音频写成单独的文件，写完后通知界面"""
+        if not self.partial_dir:
+            return
+        path = os.path.join(self.partial_dir, f"{index}.mp3")
+        try:
+            with open(path, 'wb') as file:
+                file.write(result.audio)
+        except OSError as e:
+            print(f"写入分块音频失败: {str(e)}")
+            return
+        self.chunk_playable.emit(index, path)
+
+    def on_chunk_done(self, index):
+        self.progress.chunk_done(index)
+        self.chunk_finished.emit(index)
+
+    def seek(self, offset):
+        """播放位置跳转到字符偏移 offset，优先合成附近的分块"""
+        self.playhead_offset = offset
+        if self.scheduler:
+            self.scheduler.seek(chunk_index_at(self.chunks, offset))
 
     def cancel(self):
         """取消转换"""
         self.is_cancelled = True
-        if self._loop and self._loop.is_running():
-            self._loop.call_soon_threadsafe(self._loop.stop)
+        # 任务尚未开始时，工作协程看到 is_cancelled 后立即结束
+        task = self._task
+        if task:
+            shared_loop().loop.call_soon_threadsafe(task.cancel)
 
-class AudioPlayThread(QThread):
-    finished = Signal()
+class RenderThread(QThread):
+    """在本地按新的语速和音量重新渲染已有音频"""
+    finished = Signal(bool)
     error = Signal(str)
-    
-    def __init__(self, player):
+    # 变化超出本地渲染的容差，需要重新合成
+    declined = Signal()
+
+    def __init__(self, renderer, source, rate, volume, filename):
         super().__init__()
-        self.player = player
+        # renderer 为 None 时从 filename 中的原始合成结果创建，source 为 (文本, 语音, 语速, 音量, 索引)
+        self.renderer = renderer
+        self.source = source
+        self.rate = rate
+        self.volume = volume
+        self.filename = filename
+        self.audio_index = None
         self.is_cancelled = False
-    
+
     def run(self):
         try:
-            while not self.is_cancelled and self.player.playbackState() == QMediaPlayer.PlaybackState.PlayingState:
-                self.msleep(100)  # 每100ms检查一次状态
-            self.finished.emit()
+            if self.renderer is None:
+                text, voice, rate, volume, audio_index = self.source
+                with open(self.filename, 'rb') as file:
+                    self.renderer = LocalRenderer(text, voice, rate, volume, file.read(), audio_index)
+            if not self.renderer.can_render(self.rate, self.volume):
+                self.declined.emit()
+                return
+            audio, self.audio_index = self.renderer.render(self.rate, self.volume,
+                                                           is_cancelled=lambda: self.is_cancelled)
+            if self.is_cancelled:
+                return
+            atomic_write(self.filename, (audio,))
+            if self.audio_index:
+                self.audio_index.save(index_path(self.filename))
+            self.finished.emit(True)
         except Exception as e:
+            if self.is_cancelled:
+                return
+            print(f"本地渲染错误: {str(e)}")
             self.error.emit(str(e))
-    
+
     def cancel(self):
         self.is_cancelled = True
 
+class AuditionThread(QThread):
+    """用所有语音并发合成文本开头的试听音频"""
+    # 每个语音的试听可用时发出 (语音, 路径)
+    preview_ready = Signal(str, str)
+    finished = Signal(int)
+
+    def __init__(self, text, voices, rate, volume, cache, cache_dir):
+        super().__init__()
+        self.text = text
+        self.voices = voices
+        self.rate = rate
+        self.volume = volume
+        self.cache = cache
+        self.cache_dir = cache_dir
+        self.is_cancelled = False
+        self._future = None
+
+    def run(self):
+        paths = {}
+        try:
+            if self.is_cancelled:
+                return
+            # 与转换共用后台事件循环和连接池
+            self._future = shared_loop().submit(audition(
+                self.text, self.voices, self.rate, self.volume, cache_dir=self.cache_dir, cache=self.cache,
+                on_ready=lambda voice, path: self.is_cancelled or self.preview_ready.emit(voice, path)))
+            paths = self._future.result()
+        except Exception as e:
+            if not self.is_cancelled:
+                print(f"试听合成错误: {str(e)}")
+        finally:
+            self._future = None
+            self.finished.emit(len(paths))
+
+    def cancel(self):
+        self.is_cancelled = True
+        future = self._future
+        if future:
+            future.cancel()
+
+class AppState:
+    """界面状态，所有状态切换都通过 TTSWindow.set_state 完成"""
+    IDLE = "idle"
+    CONVERTING = "converting"
+    CANCELLING = "cancelling"
+    PLAYING = "playing"
+    PAUSED = "paused"
+    RENDERING = "rendering"
+    CLOSING = "closing"
+
 class TTSWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -130,13 +364,41 @@ class TTSWindow(QMainWindow):
         layout.setSpacing(20)
 
         # 初始化状态
-        self.is_playing = False
-        self.is_paused = False
-        self.is_converting = False
-        self.is_busy = False
+        self.state = AppState.IDLE
+        self.has_audio = False
         self.tts_thread = None
-        self.audio_thread = None
+        self.render_thread = None
+        self.audition_thread = None
+        # 最近一次联网合成的 (文本, 语音, 语速, 音量, 索引)，只改语速或音量时据此在本地重新渲染
+        self.render_source = None
+        self.renderer = None
+        # 当前音频文件对应的语速，用于换算重新渲染后的播放位置
+        self.rendered_rate = None
+        self.render_resume_ms = None
         self.output_path = "output.mp3"
+        # 关闭窗口时等待转换线程退出的最长时间
+        self.close_timeout_ms = 3000
+        self.close_deadline = None
+        self.setup_connection_pool()
+        self.audio_index = None
+        self.pending_seek_ms = None
+        self.highlight_span = None
+        # 转换期间播放已完成的分块：分块序号 -> 单独的音频文件
+        self.partial_paths = {}
+        # 正在播放的分块，None 表示没有播放转换中的音频
+        self.partial_chunk = None
+        self.partial_paused = False
+        # 播放到尚未完成的分块，等它完成后继续
+        self.partial_waiting = False
+        # 转换耗时估计，随每次转换的实际结果校准
+        self.estimator = DurationEstimator()
+        self.conversion_estimate = None
+        self.conversion_started = 0
+        self.last_progress = None
+        # 没有新进度时也定时刷新，以便显示停滞时间
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(1000)
+        self.progress_timer.timeout.connect(self.refresh_progress)
         
         # 初始化UI
         self.setup_ui(layout)
@@ -149,6 +411,92 @@ class TTSWindow(QMainWindow):
         self.tray_icon.setToolTip("TTS文本转语音")
         self.tray_icon.show()
 
+    def setup_connection_pool(self):
+        """所有合成请求通过连接池复用 websocket 连接"""
+        self.prewarmed = False
+        self.pool = None
+        self.replaying = False
+        self.preview_dir = DEFAULT_PREVIEW_DIR
+        # 设置了 TEXT2VOICE_REPLAY 时回放录制的会话，完全离线，不建立连接
+        replay = session_replay.replay_from_environment()
+        if replay:
+            print(f"离线回放 {len(replay.sessions)} 个录制的会话，速度 x{replay.speed:g}，"
+                  f"{'严格匹配' if replay.strict else '未匹配的请求轮流取用录制的会话'}")
+            tts_core.set_backend(replay)
+            # 回放的音频不写入句子缓存和试听目录，回放结果也不受本地已有缓存的影响
+            self.replaying = True
+            self.preview_dir = tempfile.mkdtemp(prefix="text2voice_replay_")
+            return
+        try:
+            self.pool = ConnectionPool()
+            tts_core.set_backend(self.pool.communicate)
+        except RuntimeError as e:
+            print(f"连接池不可用，每次合成将新建连接: {str(e)}")
+        # 设置了 TEXT2VOICE_RECORD 时录制每次会话的时序和数据
+        recorder = session_replay.recorder_from_environment(tts_core.get_backend())
+        if recorder:
+            tts_core.set_backend(recorder)
+
+    def prewarm_connections(self):
+        """首次输入文本时预先建立连接，转换开始时无需再等待握手"""
+        if self.pool and not self.prewarmed:
+            self.prewarmed = True
+            shared_loop().submit(self.pool.prewarm())
+
+    @property
+    def is_converting(self):
+        return self.state == AppState.CONVERTING
+
+    @property
+    def is_playing(self):
+        return self.state == AppState.PLAYING
+
+    @property
+    def is_paused(self):
+        return self.state == AppState.PAUSED
+
+    @property
+    def is_auditioning(self):
+        return bool(self.audition_thread and self.audition_thread.isRunning())
+
+    def set_state(self, state):
+        """切换界面状态并同步控件，不做任何阻塞操作"""
+        self.state = state
+        busy = state in (AppState.CONVERTING, AppState.CANCELLING, AppState.RENDERING, AppState.CLOSING)
+        # 转换期间转换按钮变为取消按钮
+        converting = state == AppState.CONVERTING
+        self.convert_btn.setEnabled(converting or not busy)
+        self.convert_btn.setIcon(QIcon(":/icons/stop.svg" if converting else ":/icons/convert.svg"))
+        self.convert_btn.setToolTip("取消转换" if converting else "转换为语音")
+        if self.convert_btn.property("active") != converting:
+            self.convert_btn.setProperty("active", converting)
+            self.convert_btn.style().unpolish(self.convert_btn)
+            self.convert_btn.style().polish(self.convert_btn)
+        # 转换期间只读，仍允许点击文本以调整合成顺序
+        self.text_edit.setReadOnly(busy)
+        self.voice_combo.setEnabled(not busy)
+        self.audition_btn.setEnabled(not busy and not self.is_auditioning)
+        self.update_play_button()
+
+    def update_play_button(self):
+        """转换期间播放位置所在的分块完成后即可播放"""
+        if self.state == AppState.CONVERTING:
+            partial = self.partial_chunk is not None
+            enabled = partial or self.playhead_chunk() in self.partial_paths
+            playing = partial and not self.partial_paused
+            paused = partial and self.partial_paused
+        else:
+            enabled = self.has_audio and self.state in (AppState.IDLE, AppState.PLAYING, AppState.PAUSED)
+            playing = self.state == AppState.PLAYING
+            paused = self.state == AppState.PAUSED
+        self.play_btn.setEnabled(enabled)
+        if playing:
+            self.play_btn.setIcon(QIcon(":/icons/pause.svg"))
+            self.play_btn.setToolTip("暂停")
+        else:
+            self.play_btn.setIcon(QIcon(":/icons/play.svg"))
+            self.play_btn.setToolTip("继续播放" if paused else "播放")
+
     def setup_ui(self, layout):
         # 文本输入区域
         text_container = QWidget()
@@ -163,6 +511,11 @@ class TTSWindow(QMainWindow):
         input_label.setStyleSheet("font-size: 16px; font-weight: 600;")
         header_layout.addWidget(input_label)
         header_layout.addStretch()
+
+        # 转换进度与预计剩余时间
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("font-size: 12px; color: #8E8E93;")
+        header_layout.addWidget(self.status_label)
         
         # 清除和导入按钮
         self.clear_btn = CustomButton(":/icons/clear.svg", "清除文本", is_import=True)
@@ -174,25 +527,26 @@ class TTSWindow(QMainWindow):
         header_layout.addWidget(self.import_btn)
         text_layout.addLayout(header_layout)
         
-        # 文本编辑区
-        self.text_edit = QTextEdit()
+        # 文本编辑区，纯文本按块排版，大文档时自动切换到大文档模式
+        self.text_edit = ChunkEditor()
         self.text_edit.setPlaceholderText("请输入要转换的文本...")
         self.text_edit.setMinimumHeight(400)
         self.text_edit.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: white;
                 border: 1px solid rgba(0, 0, 0, 0.1);
                 border-radius: 8px;
-                padding: 15px;
                 font-size: 14px;
-                line-height: 1.6;
             }
-            QTextEdit:focus {
+            QPlainTextEdit:focus {
                 border: 1px solid rgba(10, 132, 255, 0.3);
-                box-shadow: 0 0 5px rgba(10, 132, 255, 0.2);
             }
         """)
         self.text_edit.installEventFilter(self)
+        self.text_edit.cursorPositionChanged.connect(self.on_cursor_moved)
+        self.text_edit.textChanged.connect(self.on_text_changed)
+        # 鼠标事件由 viewport 接收，用于点击跳转播放位置
+        self.text_edit.viewport().installEventFilter(self)
         text_layout.addWidget(self.text_edit)
         
         layout.addWidget(text_container, stretch=1)
@@ -213,8 +567,14 @@ class TTSWindow(QMainWindow):
         self.voice_combo = QComboBox()
         self.setup_voice_options()
         self.voice_combo.setFixedWidth(150)
+        # 切换语音时立即播放已生成的试听
+        self.voice_combo.currentIndexChanged.connect(self.on_voice_changed)
         left_controls.addWidget(self.voice_combo)
 
+        self.audition_btn = CustomButton(":/icons/play.svg", "试听所有语音", is_import=True)
+        self.audition_btn.clicked.connect(self.start_audition)
+        left_controls.addWidget(self.audition_btn)
+
         # 语速控制
         rate_layout = QHBoxLayout()
         rate_label = QLabel("语速")
@@ -252,6 +612,9 @@ class TTSWindow(QMainWindow):
         # 连接滑块信号
         self.rate_slider.valueChanged.connect(self.update_rate_label)
         self.volume_slider.valueChanged.connect(self.update_volume_label)
+        # 松开滑块后在本地重新渲染已有音频
+        self.rate_slider.sliderReleased.connect(self.on_slider_released)
+        self.volume_slider.sliderReleased.connect(self.on_slider_released)
         
         left_controls.addLayout(rate_layout)
         left_controls.addLayout(volume_layout)
@@ -263,7 +626,7 @@ class TTSWindow(QMainWindow):
         button_layout.setSpacing(8)
         
         self.convert_btn = CustomButton(":/icons/convert.svg", "转换为语音", button_size=40)
-        self.convert_btn.clicked.connect(self.start_conversion)
+        self.convert_btn.clicked.connect(self.toggle_conversion)
         
         self.play_btn = CustomButton(":/icons/play.svg", "播放", button_size=40)
         self.play_btn.clicked.connect(self.play_audio)
@@ -284,22 +647,7 @@ class TTSWindow(QMainWindow):
         layout.addWidget(self.about_label)
 
     def setup_voice_options(self):
-        voice_options = {
-            '晓晓（女）': 'zh-CN-XiaoxiaoNeural',
-            '云希（男）': 'zh-CN-YunxiNeural',
-            '云扬（男）': 'zh-CN-YunyangNeural',
-            '云健（男）': 'zh-CN-YunjianNeural',
-            '晓忆（女）': 'zh-CN-XiaoyiNeural',
-            '云霞（女）': 'zh-CN-YunxiaNeural',
-            '晓北（女）': 'zh-CN-XiaobeiNeural',
-            '晓曼（女，香港）': 'zh-HK-HiuMaanNeural',
-            '云龙（男，香港）': 'zh-HK-WanLungNeural',
-            '晓佳（女，香港）': 'zh-HK-HiuGaaiNeural',
-            '晓晨（女，台湾）': 'zh-TW-HsiaoChenNeural',
-            '云哲（男，台湾）': 'zh-TW-YunJheNeural',
-            '晓宇（女，台湾）': 'zh-TW-HsiaoYuNeural'
-        }
-        for name, value in voice_options.items():
+        for name, value in VOICES.items():
             self.voice_combo.addItem(name, value)
 
     def setup_media_player(self):
@@ -308,24 +656,109 @@ class TTSWindow(QMainWindow):
         self.player.setAudioOutput(self.audio_output)
         self.audio_output.setVolume(self.volume_slider.value() / 100)
         self.player.playbackStateChanged.connect(self.on_playback_state_changed)
+        self.player.positionChanged.connect(self.on_position_changed)
+        self.player.mediaStatusChanged.connect(self.on_media_status_changed)
+        # 试听使用单独的播放器，不影响已转换音频的播放状态和位置
+        self.preview_player = QMediaPlayer()
+        self.preview_output = QAudioOutput()
+        self.preview_player.setAudioOutput(self.preview_output)
+        self.preview_output.setVolume(self.volume_slider.value() / 100)
 
     def eventFilter(self, obj, event):
         if obj == self.text_edit and event.type() == QEvent.Type.KeyPress:
             if (event.key() == Qt.Key.Key_Return and 
                 not event.modifiers() & Qt.KeyboardModifier.ShiftModifier):
                 if (self.text_edit.toPlainText().strip() and 
-                    not self.is_converting and 
-                    not self.is_busy):
+                    self.state in (AppState.IDLE, AppState.PLAYING, AppState.PAUSED)):
                     self.start_conversion()
                     return True
+        if (obj == self.text_edit.viewport() and
+                event.type() == QEvent.Type.MouseButtonRelease and
+                event.button() == Qt.MouseButton.LeftButton):
+            if self.state in (AppState.IDLE, AppState.PLAYING, AppState.PAUSED) and self.audio_index:
+                cursor = self.text_edit.cursorForPosition(event.position().toPoint())
+                self.seek_to_offset(cursor.position())
         return super().eventFilter(obj, event)
 
+    def on_cursor_moved(self):
+        """转换期间点击文本时，优先合成光标附近的分块；正在播放转换中的音频时跳到该分块"""
+        if self.is_converting and self.tts_thread:
+            self.tts_thread.seek(self.text_edit.textCursor().position())
+            index = self.playhead_chunk()
+            if self.partial_chunk is not None and index != self.partial_chunk:
+                self.play_partial(index)
+            self.update_play_button()
+
+    def on_text_changed(self):
+        """文本被修改后原有索引和分块标记失效"""
+        if self.is_converting:
+            return
+        self.prewarm_connections()
+        if self.audio_index:
+            self.audio_index = None
+            self.set_highlight(None)
+        self.text_edit.clear_chunks()
+
+    def load_audio_index(self):
+        """读取与当前文本匹配的音频索引"""
+        self.audio_index = None
+        if os.path.exists(self.output_path):
+            self.audio_index = AudioIndex.load(index_path(self.output_path), self.text_edit.toPlainText())
+        return self.audio_index
+
+    def seek_to_offset(self, offset):
+        """播放器跳转到字符偏移 offset 对应的音频位置"""
+        ms = self.audio_index.time_at(offset)
+        if self.is_playing or self.is_paused:
+            self.player.setPosition(ms)
+            if self.is_paused:
+                self.play_audio()
+        else:
+            # 媒体加载完成后再设置位置
+            self.pending_seek_ms = ms
+            self.play_audio()
+
+    def on_media_status_changed(self, status):
+        if status == QMediaPlayer.MediaStatus.EndOfMedia and self.partial_chunk is not None:
+            # 接着播放下一个分块，尚未完成时等待
+            if self.partial_chunk + 1 < len(self.tts_thread.chunks):
+                self.play_partial(self.partial_chunk + 1)
+            else:
+                self.stop_partial()
+            return
+        if (self.pending_seek_ms is not None and
+                status in (QMediaPlayer.MediaStatus.LoadedMedia, QMediaPlayer.MediaStatus.BufferedMedia)):
+            self.player.setPosition(self.pending_seek_ms)
+            self.pending_seek_ms = None
+
+    def on_position_changed(self, position):
+        """高亮当前正在播放的句子"""
+        if not self.audio_index or not (self.is_playing or self.is_paused):
+            return
+        span = self.audio_index.span_at(position)
+        if span != self.highlight_span:
+            self.set_highlight(span)
+
+    def set_highlight(self, span):
+        self.highlight_span = span
+        selections = []
+        if span:
+            selection = QTextEdit.ExtraSelection()
+            selection.format.setBackground(QColor(10, 132, 255, 40))
+            selection.cursor = self.text_edit.textCursor()
+            selection.cursor.setPosition(span[0])
+            selection.cursor.setPosition(min(span[1], self.text_edit.document().characterCount() - 1),
+                                         selection.cursor.MoveMode.KeepAnchor)
+            selections.append(selection)
+        self.text_edit.setExtraSelections(selections)
+
     def update_rate_label(self, value):
         self.rate_value_label.setText(f"{value}%")
 
     def update_volume_label(self, value):
         self.volume_value_label.setText(f"{value}%")
         self.audio_output.setVolume(value / 100)
+        self.preview_output.setVolume(value / 100)
 
     def clear_text(self):
         self.text_edit.clear()
@@ -337,66 +770,305 @@ class TTSWindow(QMainWindow):
         if file_path:
             try:
                 with open(file_path, 'r', encoding='utf-8') as file:
-                    self.text_edit.setText(file.read())
+                    self.text_edit.setPlainText(file.read())
+                # 已合成过的同一文本可直接点击跳转，无需重新合成
+                if self.load_audio_index():
+                    self.has_audio = True
+                    self.set_state(self.state)
             except Exception as e:
                 QMessageBox.warning(self, "错误", f"无法读取文件：{str(e)}")
 
+    def toggle_conversion(self):
+        if self.state == AppState.CONVERTING:
+            self.cancel_conversion()
+        else:
+            self.start_conversion()
+
     def start_conversion(self):
-        if self.is_converting:
+        if self.state not in (AppState.IDLE, AppState.PLAYING, AppState.PAUSED):
             return
 
-        text = self.text_edit.toPlainText().strip()
-        if not text:
+        # 保留原始文本，使分块偏移与编辑器中的光标位置一致
+        text = self.text_edit.toPlainText()
+        if not text.strip():
             QMessageBox.warning(self, "警告", "请输入要转换的文本！")
             return
 
+        voice = self.voice_combo.currentData()
+        rate = f"{self.rate_slider.value():+d}%"
+        volume = f"{self.volume_slider.value():+d}%"
+        # 文本和语音未变时优先在本地重新渲染
+        if self.start_local_render(text, voice, rate, volume):
+            return
+        self.start_synthesis(text, voice, rate, volume)
+
+    def start_synthesis(self, text, voice, rate, volume):
         try:
             # 停止当前播放
+            self.stop_preview()
             self.stop_audio()
-            QApplication.processEvents()
-
-            # 更新状态和UI
-            self.is_converting = True
-            self.convert_btn.setEnabled(False)
-            self.play_btn.setEnabled(False)
-            self.text_edit.setEnabled(False)
-            self.voice_combo.setEnabled(False)
+            self.has_audio = False
+            self.render_source = None
+            self.renderer = None
 
             # 创建转换线程
-            voice = self.voice_combo.currentData()
-            rate = f"{self.rate_slider.value():+d}%"
-            volume = f"{self.volume_slider.value():+d}%"
-
             self.tts_thread = TTSThread(text, voice, rate, volume, self.output_path)
+            if self.replaying:
+                self.tts_thread.cache = None
+            self.tts_thread.estimator = self.estimator
+            self.tts_thread.estimated.connect(self.on_estimated)
+            self.tts_thread.progress_changed.connect(self.on_progress)
             self.tts_thread.finished.connect(self.on_conversion_finished)
             self.tts_thread.error.connect(self.on_conversion_error)
+            self.tts_thread.cancelled.connect(self.on_conversion_cancelled)
+            self.tts_thread.chunks_ready.connect(self.text_edit.set_chunks)
+            self.tts_thread.chunk_started.connect(
+                lambda index: self.text_edit.set_chunk_status(index, ChunkStatus.RUNNING))
+            self.tts_thread.chunk_finished.connect(
+                lambda index: self.text_edit.set_chunk_status(index, ChunkStatus.DONE))
+            self.tts_thread.chunk_playable.connect(self.on_chunk_playable)
+            self.set_state(AppState.CONVERTING)
             self.tts_thread.start()
 
         except Exception as e:
             self.on_conversion_error(str(e))
 
+    def on_estimated(self, estimate):
+        self.conversion_estimate = estimate
+        self.conversion_started = time.monotonic()
+        self.last_progress = None
+        self.progress_timer.start()
+        self.update_status()
+
+    def on_progress(self, snapshot):
+        self.last_progress = snapshot
+        self.update_status()
+
+    def refresh_progress(self):
+        if self.state != AppState.CONVERTING:
+            self.progress_timer.stop()
+        elif self.tts_thread and self.tts_thread.progress:
+            self.last_progress = self.tts_thread.progress.snapshot()
+            self.update_status()
+
+    def update_status(self):
+        """显示转换进度；剩余时间先按模型估计，随完成的分块增多逐渐改用实际速度推算"""
+        estimate = self.conversion_estimate
+        if not estimate or self.state != AppState.CONVERTING:
+            return
+        progress = self.last_progress
+        elapsed = time.monotonic() - self.conversion_started
+        total = max(progress.chunks_total if progress else estimate.chunks, 1)
+        done = min(progress.chunks_done, total) if progress else 0
+        remaining = max(estimate.wall_s - elapsed, 0)
+        if done:
+            measured = elapsed / done * (total - done)
+            weight = done / total
+            remaining = weight * measured + (1 - weight) * remaining
+
+        parts = [f"{done}/{total} 块"]
+        if progress:
+            parts.append(f"已合成 {format_duration(progress.audio_s)} / 约 {format_duration(estimate.audio_s)}")
+            parts.append(f"{progress.bytes_received / 1e6:.1f} MB，{progress.bytes_per_s / 1e3:.0f} KB/s"
+                         f"（{progress.realtime_factor:.1f}x）")
+        else:
+            parts.append(f"音频约 {format_duration(estimate.audio_s)}")
+        parts.append(f"预计剩余 {format_duration(remaining)}")
+        if progress and progress.idle_s >= 10:
+            parts.append(f"已 {int(progress.idle_s)} 秒未收到数据")
+        self.status_label.setText("，".join(parts))
+
+    def cancel_conversion(self):
+        """请求取消转换，线程退出后由 on_conversion_cancelled 恢复界面"""
+        if self.state == AppState.CONVERTING and self.tts_thread:
+            self.stop_partial()
+            self.set_state(AppState.CANCELLING)
+            self.tts_thread.cancel()
+
     def on_conversion_finished(self, success):
-        self.is_converting = False
-        self.convert_btn.setEnabled(True)
-        self.text_edit.setEnabled(True)
-        self.voice_combo.setEnabled(True)
+        if self.state != AppState.CONVERTING:
+            # 已取消或正在关闭，忽略结果
+            return
+        # 正在播放转换中的音频时，换成完整的文件后从大致相同的位置继续
+        partial_chunk, partial_paused = self.partial_chunk, self.partial_paused
+        partial_ms = 0 if self.partial_waiting else self.player.position()
+        self.discard_partial()
+        self.has_audio = success and os.path.exists(self.output_path)
+        self.set_state(AppState.IDLE)
+        self.progress_timer.stop()
+        self.status_label.setText(
+            f"转换完成，用时 {format_duration(time.monotonic() - self.conversion_started)}" if success else "")
 
-        if success and os.path.exists(self.output_path):
-            self.play_btn.setEnabled(True)
+        if self.has_audio:
+            self.audio_index = self.tts_thread.audio_index
+            thread = self.tts_thread
+            self.render_source = (thread.text, thread.voice, thread.rate, thread.volume, thread.audio_index)
+            self.rendered_rate = thread.rate
+            if self.audio_index and partial_chunk is not None:
+                self.pending_seek_ms = self.audio_index.time_at(thread.chunks[partial_chunk].start) + partial_ms
+                if partial_paused:
+                    # 保持暂停，下次播放时从该位置开始
+                    return
+            elif self.audio_index and self.tts_thread.playhead_offset:
+                # 转换期间用户点击过的位置作为起始播放位置
+                self.pending_seek_ms = self.audio_index.time_at(self.tts_thread.playhead_offset)
             QTimer.singleShot(100, self.play_audio)
         else:
-            self.play_btn.setEnabled(False)
             QMessageBox.warning(self, "错误", "转换失败，请检查网络连接或稍后重试！")
 
+    def start_local_render(self, text, voice, rate, volume, resume_ms=None):
+        """语速或音量在容差内时启动本地渲染并返回 True，否则返回 False"""
+        source = self.render_source
+        if (not local_render.AVAILABLE or not source or not self.has_audio
+                or source[0] != text or source[1] != voice):
+            return False
+        renderer = self.renderer
+        if renderer is not None and not renderer.can_render(rate, volume):
+            return False
+
+        self.stop_audio()
+        self.render_resume_ms = resume_ms
+        self.render_thread = RenderThread(renderer, source, rate, volume, self.output_path)
+        self.render_thread.finished.connect(self.on_render_finished)
+        self.render_thread.declined.connect(lambda: self.on_render_declined(text, voice, rate, volume))
+        self.render_thread.error.connect(lambda error: self.on_render_declined(text, voice, rate, volume))
+        self.render_start = time.monotonic()
+        self.set_state(AppState.RENDERING)
+        self.status_label.setText("正在本地调整语速和音量…")
+        self.render_thread.start()
+        return True
+
+    def on_render_finished(self, success):
+        if self.state != AppState.RENDERING:
+            return
+        thread = self.render_thread
+        self.renderer = thread.renderer
+        self.audio_index = thread.audio_index
+        previous_rate, self.rendered_rate = self.rendered_rate, thread.rate
+        self.set_state(AppState.IDLE)
+        self.status_label.setText(f"已在本地重新渲染，用时 {(time.monotonic() - self.render_start) * 1000:.0f} ms")
+        if self.render_resume_ms is not None:
+            # 按新旧语速换算原来的播放位置
+            self.pending_seek_ms = int(self.render_resume_ms * self.renderer.tempo_factor(previous_rate)
+                                       / self.renderer.tempo_factor(thread.rate))
+            self.play_audio()
+
+    def on_render_declined(self, text, voice, rate, volume):
+        """超出本地渲染容差或渲染失败，改为联网重新合成"""
+        if self.state != AppState.RENDERING:
+            return
+        if self.render_thread.renderer:
+            self.renderer = self.render_thread.renderer
+        self.set_state(AppState.IDLE)
+        if self.render_resume_ms is None:
+            self.status_label.setText("")
+            self.start_synthesis(text, voice, rate, volume)
+        else:
+            # 拖动滑块时不自动联网合成，恢复原来的播放
+            self.status_label.setText("调整幅度超出本地渲染范围，点击转换重新合成")
+            self.pending_seek_ms = self.render_resume_ms
+            self.play_audio()
+
+    def on_slider_released(self):
+        if self.state not in (AppState.IDLE, AppState.PLAYING, AppState.PAUSED) or not self.has_audio:
+            return
+        resume_ms = self.player.position() if self.state in (AppState.PLAYING, AppState.PAUSED) else None
+        self.start_local_render(self.text_edit.toPlainText(), self.voice_combo.currentData(),
+                                f"{self.rate_slider.value():+d}%", f"{self.volume_slider.value():+d}%",
+                                resume_ms)
+
     def on_conversion_error(self, error_msg):
+        if self.state not in (AppState.CONVERTING, AppState.IDLE):
+            return
+        # 先切换状态，避免消息框期间到达的 finished 信号再次提示
+        self.discard_partial()
+        self.has_audio = False
+        self.set_state(AppState.IDLE)
+        self.progress_timer.stop()
+        self.status_label.setText("")
+        self.text_edit.mark_running_failed()
         QMessageBox.warning(self, "错误", error_msg)
-        self.is_converting = False
-        self.convert_btn.setEnabled(True)
-        self.text_edit.setEnabled(True)
-        self.voice_combo.setEnabled(True)
-        self.play_btn.setEnabled(False)
+
+    def on_conversion_cancelled(self):
+        if self.state == AppState.CANCELLING:
+            self.discard_partial()
+            self.set_state(AppState.IDLE)
+            self.progress_timer.stop()
+            self.status_label.setText("")
+
+    def playhead_chunk(self):
+        """转换中播放位置所在的分块"""
+        thread = self.tts_thread
+        if not thread or not thread.chunks:
+            return None
+        return chunk_index_at(thread.chunks, thread.playhead_offset)
+
+    def on_chunk_playable(self, index, path):
+        if self.state != AppState.CONVERTING:
+            return
+        self.partial_paths[index] = path
+        if self.partial_waiting and index == self.partial_chunk and not self.partial_paused:
+            self.play_partial(index)
+        self.update_play_button()
+
+    def play_partial(self, index):
+        """转换期间从第 index 块开始播放已完成的部分，该块尚未完成时等待"""
+        self.stop_preview()
+        thread = self.tts_thread
+        chunk = thread.chunks[index]
+        # 播放到哪里就优先合成哪里之后的分块
+        if self.playhead_chunk() != index:
+            thread.seek(chunk.start)
+        self.partial_chunk = index
+        self.partial_paused = False
+        path = self.partial_paths.get(index)
+        self.partial_waiting = path is None
+        if path:
+            self.player.setSource(QUrl.fromLocalFile(os.path.abspath(path)))
+            self.player.play()
+        self.set_highlight((chunk.start, chunk.end))
+        self.update_play_button()
+
+    def toggle_partial(self):
+        if self.partial_chunk is None:
+            index = self.playhead_chunk()
+            if index in self.partial_paths:
+                self.play_partial(index)
+            return
+        if self.partial_paused and self.partial_waiting:
+            self.play_partial(self.partial_chunk)
+            return
+        self.partial_paused = not self.partial_paused
+        if not self.partial_waiting:
+            if self.partial_paused:
+                self.player.pause()
+            else:
+                self.player.play()
+        self.update_play_button()
+
+    def stop_partial(self):
+        if self.partial_chunk is None:
+            return
+        self.partial_chunk = None
+        self.partial_paused = False
+        self.partial_waiting = False
+        self.player.stop()
+        self.player.setSource(QUrl())
+        self.set_highlight(None)
+
+    def discard_partial(self):
+        """停止播放转换中的音频并删除各分块的临时文件"""
+        self.stop_partial()
+        self.partial_paths = {}
+        thread = self.tts_thread
+        if thread and thread.partial_dir:
+            shutil.rmtree(thread.partial_dir, ignore_errors=True)
+            thread.partial_dir = None
 
     def play_audio(self):
+        if self.is_converting:
+            self.toggle_partial()
+            return
         if not os.path.exists(self.output_path):
             QMessageBox.warning(self, "错误", "音频文件不存在！")
             return
@@ -406,19 +1078,13 @@ class TTSWindow(QMainWindow):
                 self.pause_audio()
                 return
 
+            self.stop_preview()
             if self.is_paused:
                 self.player.play()
             else:
                 self.player.setSource(QUrl.fromLocalFile(os.path.abspath(self.output_path)))
                 self.player.play()
-
-            self.is_playing = True
-            self.is_paused = False
-            self.play_btn.setIcon(QIcon(":/icons/pause.svg"))
-            self.play_btn.setToolTip("暂停")
-
-            # 启动音频监控线程
-            self.start_audio_thread()
+            self.set_state(AppState.PLAYING)
 
         except Exception as e:
             QMessageBox.warning(self, "错误", f"播放失败: {str(e)}")
@@ -427,67 +1093,108 @@ class TTSWindow(QMainWindow):
     def pause_audio(self):
         if self.is_playing:
             self.player.pause()
-            self.is_playing = False
-            self.is_paused = True
-            self.play_btn.setIcon(QIcon(":/icons/play.svg"))
-            self.play_btn.setToolTip("继续播放")
+            self.set_state(AppState.PAUSED)
 
     def stop_audio(self):
         try:
-            # 停止音频监控线程
-            if self.audio_thread and self.audio_thread.isRunning():
-                self.audio_thread.cancel()
-                self.audio_thread.wait()
-
-            # 停止播放器
+            # 停止播放器，播放结束由 playbackStateChanged 信号通知，无需等待
             self.player.stop()
             self.player.setSource(QUrl())
-            
-            # 重置状态
-            self.is_playing = False
-            self.is_paused = False
-            self.play_btn.setIcon(QIcon(":/icons/play.svg"))
-            self.play_btn.setToolTip("播放")
-            
-            QApplication.processEvents()
-            
+            if self.state in (AppState.PLAYING, AppState.PAUSED):
+                self.set_state(AppState.IDLE)
+            self.set_highlight(None)
+
         except Exception as e:
             print(f"停止音频时出错: {str(e)}")
 
-    def start_audio_thread(self):
-        if self.audio_thread and self.audio_thread.isRunning():
-            self.audio_thread.cancel()
-            self.audio_thread.wait()
-        
-        self.audio_thread = AudioPlayThread(self.player)
-        self.audio_thread.finished.connect(self.on_audio_finished)
-        self.audio_thread.error.connect(self.on_audio_error)
-        self.audio_thread.start()
-
-    def on_audio_finished(self):
-        self.is_playing = False
-        self.is_paused = False
-        self.play_btn.setIcon(QIcon(":/icons/play.svg"))
-        self.play_btn.setToolTip("播放")
-
-    def on_audio_error(self, error_msg):
-        print(f"音频播放错误: {error_msg}")
-        self.stop_audio()
-
     def on_playback_state_changed(self, state):
-        if state == QMediaPlayer.PlaybackState.StoppedState:
-            self.is_playing = False
-            self.is_paused = False
-            self.play_btn.setIcon(QIcon(":/icons/play.svg"))
-            self.play_btn.setToolTip("播放")
+        if (state == QMediaPlayer.PlaybackState.StoppedState and
+                self.state in (AppState.PLAYING, AppState.PAUSED)):
+            self.set_state(AppState.IDLE)
+            self.set_highlight(None)
+
+    def preview_params(self):
+        """当前文本的试听文本、语速和音量"""
+        return (preview_text(self.text_edit.toPlainText()), f"{self.rate_slider.value():+d}%",
+                f"{self.volume_slider.value():+d}%")
+
+    def start_audition(self):
+        """用所有语音并发合成试听，之后切换语音即可立即播放"""
+        if self.is_auditioning or self.state not in (AppState.IDLE, AppState.PLAYING, AppState.PAUSED):
+            return
+        text, rate, volume = self.preview_params()
+        if not text:
+            QMessageBox.warning(self, "警告", "请输入要转换的文本！")
+            return
+        self.pause_audio()
+        self.audition_started = time.monotonic()
+        # 当前语音排在最前，最先合成
+        current = self.voice_combo.currentData()
+        voices = [current] + [voice for voice in VOICES.values() if voice != current]
+        self.audition_thread = AuditionThread(text, voices, rate, volume,
+                                              None if self.replaying else SentenceCache(), self.preview_dir)
+        self.audition_thread.preview_ready.connect(self.on_preview_ready)
+        self.audition_thread.finished.connect(self.on_audition_finished)
+        self.audition_thread.start()
+        self.audition_btn.setEnabled(False)
+        self.status_label.setText(f"正在合成 {len(VOICES)} 个语音的试听…")
+
+    def on_preview_ready(self, voice, path):
+        # 当前选中语音的试听一到就播放
+        if voice == self.voice_combo.currentData() and self.state in (AppState.IDLE, AppState.PAUSED):
+            self.play_preview(path)
+
+    def on_audition_finished(self, count):
+        # 信号在线程退出前发出，此时 isRunning() 仍为 True，直接恢复按钮
+        idle = self.state in (AppState.IDLE, AppState.PLAYING, AppState.PAUSED)
+        self.audition_btn.setEnabled(idle)
+        if idle and count:
+            self.status_label.setText(f"{count}/{len(VOICES)} 个语音的试听已就绪，用时 "
+                                      f"{time.monotonic() - self.audition_started:.1f} 秒，切换语音即可试听")
+
+    def on_voice_changed(self, index):
+        """切换语音时播放该语音已生成的试听，没有试听时不做任何事"""
+        if self.state not in (AppState.IDLE, AppState.PLAYING, AppState.PAUSED):
+            return
+        text, rate, volume = self.preview_params()
+        path = cached_preview(self.voice_combo.itemData(index), rate, volume, text, self.preview_dir)
+        if path:
+            self.pause_audio()
+            self.play_preview(path)
+        else:
+            self.stop_preview()
+
+    def play_preview(self, path):
+        self.preview_player.stop()
+        self.preview_player.setSource(QUrl.fromLocalFile(os.path.abspath(path)))
+        self.preview_player.play()
+
+    def stop_preview(self):
+        self.preview_player.stop()
+        self.preview_player.setSource(QUrl())
+
+    def running_threads(self):
+        return [thread for thread in (self.tts_thread, self.render_thread, self.audition_thread)
+                if thread and thread.isRunning()]
 
     def closeEvent(self, event):
-        # 停止所有操作
-        if self.is_converting and self.tts_thread:
-            self.tts_thread.cancel()
-            self.tts_thread.wait()
-        
+        # 后台线程仍在运行时先请求取消，线程全部退出后再关闭窗口
+        threads = self.running_threads()
+        if threads:
+            if self.state != AppState.CLOSING:
+                self.set_state(AppState.CLOSING)
+                for thread in threads:
+                    thread.cancel()
+                self.close_deadline = time.monotonic() + self.close_timeout_ms / 1000
+                QTimer.singleShot(20, self.finish_close)
+            event.ignore()
+            return
+
+        self.stop_preview()
         self.stop_audio()
+        self.discard_partial()
+        if self.pool:
+            shared_loop().submit(self.pool.close())
         
         # 关闭系统托盘图标
         if hasattr(self, 'tray_icon'):
@@ -495,9 +1202,26 @@ class TTSWindow(QMainWindow):
         
         event.accept()
 
+    def finish_close(self):
+        """轮询后台线程是否退出，超时后强制结束"""
+        threads = self.running_threads()
+        if threads:
+            if time.monotonic() < self.close_deadline:
+                QTimer.singleShot(20, self.finish_close)
+                return
+            print("后台线程未能及时退出，强制结束")
+            for thread in threads:
+                thread.terminate()
+                thread.wait(500)
+        self.close()
+
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     app = QApplication(sys.argv)
     app.setWindowIcon(QIcon(":/icons/main.ico"))
+    # 监视事件循环卡顿，超过阈值时记录 GUI 线程调用栈
+    watchdog = EventLoopWatchdog(threshold_ms=200)
+    watchdog.start()
     window = TTSWindow()
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
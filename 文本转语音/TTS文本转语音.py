@@ -46,5 +46,6 @@ async def main():
     # 将生成的语音保存到文件
     await communicate.save(filename)
 
-# 运行异步函数
-asyncio.run(main())
\ No newline at end of file
+# 运行异步函数（仅在直接执行时运行，导入本文件不会触发合成）
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
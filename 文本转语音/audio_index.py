@@ -0,0 +1,95 @@
+import os
+import json
+import hashlib
+from bisect import bisect_right
+from tts_core import boundary_offsets
+
+
+class AudioIndex:
+    """文本偏移与音频时间的双向索引
+
+    entries 为按字符偏移和时间同时递增的 (offset, ms) 列表，
+    两个方向的查找均为二分查找。
+    """
+
+    VERSION = 1
+
+    def __init__(self, entries, text_length, text_hash=None):
+        self.offsets = [offset for offset, _ in entries]
+        self.times = [ms for _, ms in entries]
+        self.text_length = text_length
+        self.text_hash = text_hash
+
+    @classmethod
+    def from_chunks(cls, text, chunks, results):
+        """根据各分块的音频时长和边界事件构建索引"""
+        entries = []
+        base_ms = 0
+        for chunk, result in zip(chunks, results):
+            chunk_entries = [(chunk.start, base_ms)]
+            chunk_entries += [(offset, base_ms + ms) for offset, ms in boundary_offsets(chunk, result.boundaries)]
+            for offset, ms in chunk_entries:
+                # 保证偏移和时间都单调递增
+                if entries and (offset <= entries[-1][0] or ms < entries[-1][1]):
+                    continue
+                entries.append((offset, ms))
+            base_ms += result.duration_ms
+        return cls(entries, len(text), text_digest(text))
+
+    def time_at(self, offset):
+        """字符偏移对应的音频时间（毫秒）"""
+        if not self.offsets:
+            return 0
+        i = max(bisect_right(self.offsets, offset) - 1, 0)
+        return int(self.times[i])
+
+    def offset_at(self, ms):
+        """音频时间对应的字符偏移"""
+        if not self.times:
+            return 0
+        i = max(bisect_right(self.times, ms) - 1, 0)
+        return self.offsets[i]
+
+    def span_at(self, ms):
+        """音频时间所在句子的 (start, end) 字符区间"""
+        if not self.times:
+            return (0, self.text_length)
+        i = max(bisect_right(self.times, ms) - 1, 0)
+        end = self.offsets[i + 1] if i + 1 < len(self.offsets) else self.text_length
+        return (self.offsets[i], end)
+
+    def save(self, path):
+        data = {
+            "version": self.VERSION,
+            "text_hash": self.text_hash,
+            "text_length": self.text_length,
+            "entries": list(zip(self.offsets, self.times)),
+        }
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+
+    @classmethod
+    def load(cls, path, text=None):
+        """读取索引文件；文件不存在、版本不符或与 text 不匹配时返回 None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            print(f"读取音频索引失败: {str(e)}")
+            return None
+        if data.get("version") != cls.VERSION:
+            return None
+        if text is not None and data.get("text_hash") != text_digest(text):
+            return None
+        return cls([tuple(entry) for entry in data["entries"]], data["text_length"], data.get("text_hash"))
+
+
+def text_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def index_path(audio_path):
+    """音频文件对应的索引文件路径"""
+    return audio_path + ".index.json"
@@ -0,0 +1,172 @@
+import os
+import re
+import sys
+import time
+import struct
+import asyncio
+import argparse
+from tts_core import audio_duration_ms, silence
+from tts_api import DEFAULT_VOICE, synthesize_many_async
+
+# 独占一行的章节标题，例如 "第十二章 归来"、"第3回"
+CHAPTER_PATTERN = re.compile(
+    r'^[ \t　]*(第[0-9０-９零〇一二两三四五六七八九十百千万]+[章回节卷集部篇][^\n]{0,40})[ \t　]*$',
+    re.M)
+
+# ID3v2.3 中 CTOC 每个目录最多记录 255 个子项
+MAX_TOC_ENTRIES = 255
+
+
+class Chapter:
+    def __init__(self, index, title, start, end, text):
+        self.index = index
+        self.title = title
+        self.start = start
+        self.end = end
+        self.text = text
+
+
+def split_chapters(text):
+    """按章节标题切分文本，标题之前的内容作为 "前言"；没有标题时整篇为一章"""
+    starts = [(match.start(), match.group(1).strip()) for match in CHAPTER_PATTERN.finditer(text)]
+    if not starts or text[:starts[0][0]].strip():
+        starts.insert(0, (0, "前言" if starts else "全文"))
+    chapters = []
+    for i, (start, title) in enumerate(starts):
+        end = starts[i + 1][0] if i + 1 < len(starts) else len(text)
+        if text[start:end].strip():
+            chapters.append(Chapter(len(chapters), title, start, end, text[start:end]))
+    return chapters
+
+
+def safe_filename(title):
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", title).strip("_") or "chapter"
+
+
+def syncsafe(size):
+    """ID3 标签头中的长度每字节只用低 7 位"""
+    return bytes(((size >> shift) & 0x7F) for shift in (21, 14, 7, 0))
+
+
+def id3_frame(frame_id, payload):
+    return frame_id.encode('ascii') + struct.pack(">IH", len(payload), 0) + payload
+
+
+def text_frame(frame_id, text):
+    """UTF-16 编码的文本帧，兼容不支持 UTF-8 的 ID3v2.3 播放器"""
+    return id3_frame(frame_id, b"\x01" + text.encode('utf-16') + b"\x00\x00")
+
+
+def id3_tag(frames):
+    body = b"".join(frames)
+    return b"ID3\x03\x00\x00" + syncsafe(len(body)) + body
+
+
+def chapter_tag(title, chapters, audio_offset=0):
+    """生成带章节索引的 ID3v2.3 标签
+
+    chapters 为 [(标题, 开始毫秒, 结束毫秒, 开始字节, 结束字节)]，字节位置相对音频数据起点，
+    写入时加上 audio_offset（标签自身的长度）。
+    """
+    frames = [text_frame("TIT2", title)]
+    chapter_ids = []
+    for i, (chapter_title, start_ms, end_ms, start_byte, end_byte) in enumerate(chapters):
+        element_id = f"ch{i}".encode('ascii')
+        chapter_ids.append(element_id)
+        frames.append(id3_frame("CHAP", element_id + b"\x00" + struct.pack(
+            ">IIII", int(start_ms), int(end_ms), start_byte + audio_offset, end_byte + audio_offset)
+            + text_frame("TIT2", chapter_title)))
+
+    # 超过 255 章时分成多个子目录，由顶层目录按顺序引用
+    groups = [chapter_ids[i:i + MAX_TOC_ENTRIES] for i in range(0, len(chapter_ids), MAX_TOC_ENTRIES)]
+    if len(groups) > 1:
+        group_ids = [f"toc{i}".encode('ascii') for i in range(len(groups))]
+        for group_id, children in zip(group_ids, groups):
+            frames.append(id3_frame("CTOC", group_id + b"\x00" + b"\x01" + bytes([len(children)])
+                                    + b"".join(child + b"\x00" for child in children)))
+        groups = [group_ids]
+    children = groups[0] if groups else []
+    # 标志 0x03：顶层目录、子项有序
+    frames.append(id3_frame("CTOC", b"toc\x00" + b"\x03" + bytes([len(children)])
+                            + b"".join(child + b"\x00" for child in children)
+                            + text_frame("TIT2", title)))
+    return id3_tag(frames)
+
+
+def build_combined(title, chapters, audios, gap_ms=1000):
+    """把各章音频按顺序拼接并写入章节索引，不重新编码"""
+    gap = silence(gap_ms) if gap_ms else b""
+    parts = []
+    entries = []
+    position_ms = 0
+    position_byte = 0
+    for i, (chapter, audio) in enumerate(zip(chapters, audios)):
+        if i + 1 < len(audios):
+            audio += gap
+        length_ms = audio_duration_ms(audio)
+        entries.append((chapter.title, position_ms, position_ms + length_ms,
+                        position_byte, position_byte + len(audio)))
+        parts.append(audio)
+        position_ms += length_ms
+        position_byte += len(audio)
+    # CHAP 帧定长，先用 0 偏移算出标签长度，再写入真实的字节位置
+    tag_length = len(chapter_tag(title, entries))
+    return [chapter_tag(title, entries, tag_length)] + parts, entries
+
+
+async def synthesize_book(text, output_dir, title="有声书", voice=DEFAULT_VOICE, rate="+0%", volume="+0%",
+                          concurrency=8, gap_ms=1000, cache=None):
+    """合成整本书，写出各章文件和带章节索引的合并文件，返回章节索引
+
+    所有章节的分块放入同一个调度器并发合成，总耗时取决于并发数而不是章节数。
+    """
+    chapters = split_chapters(text)
+    audios = await synthesize_many_async([chapter.text for chapter in chapters], voice, rate, volume,
+                                         concurrency=concurrency, cache=cache)
+
+    os.makedirs(output_dir, exist_ok=True)
+    width = len(str(len(chapters)))
+    for chapter, audio in zip(chapters, audios):
+        name = f"{chapter.index + 1:0{width}d}_{safe_filename(chapter.title)}.mp3"
+        with open(os.path.join(output_dir, name), 'wb') as file:
+            file.write(id3_tag([text_frame("TIT2", chapter.title),
+                                text_frame("TRCK", f"{chapter.index + 1}/{len(chapters)}")]))
+            file.write(audio)
+
+    parts, entries = build_combined(title, chapters, audios, gap_ms)
+    with open(os.path.join(output_dir, safe_filename(title) + ".mp3"), 'wb') as file:
+        for part in parts:
+            file.write(part)
+    return entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="有声书模式：按章节并行合成并生成章节索引")
+    parser.add_argument("input", help="文本文件")
+    parser.add_argument("-o", "--output-dir", help="输出目录，默认为文本文件同名目录")
+    parser.add_argument("--title", help="书名，默认为文件名")
+    parser.add_argument("--voice", default=DEFAULT_VOICE)
+    parser.add_argument("--rate", default="+10%")
+    parser.add_argument("--volume", default="+70%")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--gap", type=int, default=1000, help="章节之间的停顿（毫秒）")
+    args = parser.parse_args(argv)
+
+    with open(args.input, 'r', encoding='utf-8') as file:
+        text = file.read()
+    base = os.path.splitext(args.input)[0]
+    title = args.title or os.path.basename(base)
+    output_dir = args.output_dir or base
+
+    print(f"检测到 {len(split_chapters(text))} 个章节")
+    start = time.perf_counter()
+    entries = asyncio.run(synthesize_book(text, output_dir, title, args.voice, args.rate, args.volume,
+                                          args.concurrency, args.gap))
+    for chapter_title, start_ms, _, _, _ in entries:
+        print(f"{time.strftime('%H:%M:%S', time.gmtime(start_ms / 1000))}  {chapter_title}")
+    print(f"完成，用时 {time.perf_counter() - start:.1f}s，输出目录 {os.path.abspath(output_dir)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
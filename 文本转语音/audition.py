@@ -0,0 +1,155 @@
+"""多语音试听
+
+取文本开头的一两句，同时用所有语音各合成一份，保存为试听音频。
+选择语音时只需一次并发合成，之后在语音列表中切换即可立即播放对应的试听，
+不必用每个语音把全文重新合成一遍。
+
+传入句子缓存时试听经由缓存合成，选定语音后正式转换时开头的句子直接复用；
+首句过长、试听只取了其中一段时，这一段不是完整的句子，无法复用。
+
+    python audition.py input.txt -o previews --rate +10% --volume +70%
+"""
+import os
+import sys
+import time
+import asyncio
+import hashlib
+import argparse
+from tts_core import (TextChunk, split_sentences, soft_break, synthesize_chunk, synthesize_chunk_cached,
+                      atomic_write)
+from sentence_cache import SentenceCache
+from tts_api import VOICES
+
+DEFAULT_PREVIEW_DIR = os.path.join(os.path.expanduser("~"), ".text2voice", "previews")
+PREVIEW_SENTENCES = 2
+PREVIEW_MAX_CHARS = 120
+# 只保留最近的若干份试听音频
+MAX_PREVIEWS = 260
+
+
+def preview_text(text, sentences=PREVIEW_SENTENCES, max_chars=PREVIEW_MAX_CHARS):
+    """文本开头不超过 max_chars 个字符的前几句，用于试听
+
+    首句就超过 max_chars 时，在 max_chars 以内最后一个逗号或空白处截断。
+    """
+    # 只切分开头一段，大文档也不会遍历全文
+    head = text[:max_chars * 2]
+    spans = split_sentences(head)[:sentences]
+    if not spans:
+        return ""
+    end = spans[-1][1]
+    while len(spans) > 1 and end - spans[0][0] > max_chars:
+        spans.pop()
+        end = spans[-1][1]
+    start = spans[0][0]
+    if end - start > max_chars:
+        end = soft_break(head, start, start + max_chars) or start + max_chars
+    return head[start:end].strip()
+
+
+def preview_path(voice, rate, volume, text, cache_dir=DEFAULT_PREVIEW_DIR):
+    raw = "\n".join((voice, rate, volume, text))
+    return os.path.join(cache_dir, hashlib.sha1(raw.encode('utf-8')).hexdigest() + ".mp3")
+
+
+def cached_preview(voice, rate, volume, text, cache_dir=DEFAULT_PREVIEW_DIR):
+    """已生成的试听音频路径，没有时返回 None"""
+    if not text:
+        return None
+    path = preview_path(voice, rate, volume, text, cache_dir)
+    return path if os.path.exists(path) else None
+
+
+async def audition(text, voices, rate="+0%", volume="+0%", cache_dir=DEFAULT_PREVIEW_DIR, cache=None,
+                   on_ready=None, concurrency=None):
+    """用 voices 中的所有语音并发合成 text 的试听音频，返回 {语音: 路径}
+
+    已有试听的语音不再合成。cache 为 SentenceCache 时经由句子缓存合成，为 None 时不读写缓存。
+    on_ready(语音, 路径) 在每个语音的试听可用时调用，顺序与完成顺序一致。
+    单个语音合成失败只打印错误，不影响其他语音。concurrency 为 None 时所有语音同时合成，
+    否则最多同时合成 concurrency 个语音，按 voices 中的顺序开始，希望先听到的语音应排在前面。
+    """
+    if not text:
+        return {}
+    os.makedirs(cache_dir, exist_ok=True)
+    semaphore = asyncio.Semaphore(max(concurrency or len(voices), 1))
+    chunk = TextChunk(0, 0, len(text), text)
+    paths = {}
+
+    async def synthesize_one(voice):
+        path = preview_path(voice, rate, volume, text, cache_dir)
+        if not os.path.exists(path):
+            async with semaphore:
+                try:
+                    if cache is not None:
+                        result = await synthesize_chunk_cached(chunk, voice, rate, volume, cache)
+                    else:
+                        result = await synthesize_chunk(chunk, voice, rate, volume)
+                except Exception as e:
+                    print(f"试听 {voice} 合成失败: {str(e)}")
+                    return
+            if not result.audio:
+                return
+            atomic_write(path, (result.audio,))
+        else:
+            # 更新修改时间，清理时保留最近用过的试听
+            os.utime(path)
+        paths[voice] = path
+        if on_ready:
+            on_ready(voice, path)
+
+    await asyncio.gather(*(synthesize_one(voice) for voice in voices))
+    prune(cache_dir)
+    return paths
+
+
+def prune(cache_dir=DEFAULT_PREVIEW_DIR, keep=MAX_PREVIEWS):
+    """删除最久未用的试听音频，只保留 keep 个"""
+    try:
+        names = [name for name in os.listdir(cache_dir) if name.endswith(".mp3")]
+    except OSError:
+        return
+    if len(names) <= keep:
+        return
+    paths = sorted((os.path.join(cache_dir, name) for name in names), key=os.path.getmtime)
+    for path in paths[:len(paths) - keep]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用所有语音并发合成文本开头的试听音频")
+    parser.add_argument("input", help="文本文件")
+    parser.add_argument("-o", "--output", default="previews", help="试听音频的输出目录")
+    parser.add_argument("--voice", action="append", help="只试听指定的语音，可重复；默认为全部语音")
+    parser.add_argument("--rate", default="+10%")
+    parser.add_argument("--volume", default="+70%")
+    parser.add_argument("--sentences", type=int, default=PREVIEW_SENTENCES, help="试听的句数")
+    parser.add_argument("--concurrency", type=int, help="同时合成的语音数，默认为全部语音同时合成")
+    args = parser.parse_args(argv)
+
+    with open(args.input, 'r', encoding='utf-8') as file:
+        text = preview_text(file.read(), args.sentences)
+    if not text:
+        print("文本为空")
+        return 1
+    voices = args.voice or list(VOICES.values())
+    os.makedirs(args.output, exist_ok=True)
+    start = time.perf_counter()
+
+    def on_ready(voice, path):
+        with open(path, 'rb') as source:
+            atomic_write(os.path.join(args.output, voice + ".mp3"), (source.read(),))
+        print(f"{time.perf_counter() - start:6.2f}s {voice}")
+
+    paths = asyncio.run(audition(text, voices, args.rate, args.volume, cache=SentenceCache(), on_ready=on_ready,
+                                   concurrency=args.concurrency))
+    print(f"试听文本: {text}")
+    print(f"{len(paths)}/{len(voices)} 个语音已保存到 {args.output}，用时 {time.perf_counter() - start:.2f}s")
+    return 0 if paths else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import tts_core
+import silence_trim
+from tts_core import split_chunks, synthesize_scheduled, join_chunk_audio, atomic_write
+from chunk_scheduler import PlayheadScheduler
+from sentence_cache import SentenceCache
+from fake_backend import FakeBackend
+
+# 文本长度以字符计；测试文本几乎全是汉字，UTF-8 编码下每个字符约 3 字节
+DEFAULT_SIZES = [100, 10_000, 1_000_000, 10_000_000]
+
+SAMPLE_SENTENCES = [
+    "秋风轻拂过窗棂，带来了几丝凉意。",
+    "落叶如同一封封信件，从枝头飘落。",
+    "天空变得格外高远，云朵也似乎变得轻盈起来！",
+    "人们穿上了长袖，围巾和帽子开始出现在街头巷尾。",
+    "这是一个收获的季节吗？",
+    "煮上一壶热茶，翻阅着手中的书卷。\n",
+]
+
+
+def make_text(size):
+    """生成指定长度的确定性测试文本"""
+    parts = []
+    length = 0
+    i = 0
+    while length < size:
+        sentence = SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)]
+        parts.append(sentence)
+        length += len(sentence)
+        i += 1
+    return "".join(parts)[:size]
+
+
+async def measure_conversion(text, concurrency, max_retries):
+    """端到端转换：分块、合成、拼接，返回 (总耗时, 首段音频耗时, 分块, 各分块的合成结果)
+
+    首段音频耗时记录到收到第一份音频数据为止，而不是第一个分块合成完毕。
+    """
+    start = time.perf_counter()
+    first_audio = []
+    chunks = split_chunks(text)
+    results = await synthesize_scheduled(
+        chunks, PlayheadScheduler(len(chunks)), "zh-CN-XiaoxiaoNeural", "+0%", "+0%",
+        concurrency=concurrency, max_retries=max_retries, retry_delay=0,
+        on_audio=lambda index, size: first_audio or first_audio.append(time.perf_counter()))
+    b"".join(result.audio for result in results)
+    end = time.perf_counter()
+    return end - start, first_audio[0] - start, chunks, results
+
+
+def measure_chunking(text, repeat=3):
+    """分块吞吐（字符/秒）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        split_chunks(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(text) / best if best else 0
+
+
+def measure_stitching(chunks, results, repeat=3):
+    """拼接吞吐（合成音频 MB/秒）
+
+    与转换完成时的处理相同：修剪各分块的静音（silence_trim 可用时），拼接音频和边界事件，
+    再原子地写入输出文件。
+    """
+    total_bytes = sum(len(result.audio) for result in results)
+    directory = tempfile.mkdtemp(prefix="tts_bench_stitch_")
+    path = os.path.join(directory, "output.mp3")
+    best = None
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            trimmed = silence_trim.trim_results(chunks, results)
+            atomic_write(path, (join_chunk_audio(trimmed).audio,))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return total_bytes / 1e6 / best if best else 0
+
+
+def measure_cache_hit(samples=1000):
+    """句子缓存命中的平均耗时（微秒）"""
+    cache_dir = tempfile.mkdtemp(prefix="tts_bench_cache_")
+    try:
+        cache = SentenceCache(cache_dir)
+        for sentence in SAMPLE_SENTENCES:
+            cache.put("v", "+0%", "+0%", sentence, bytes(7200))
+        # 测量从磁盘读取的命中，而不是尚未写入的句子
+        cache.flush()
+        start = time.perf_counter()
+        for i in range(samples):
+            cache.get("v", "+0%", "+0%", SAMPLE_SENTENCES[i % len(SAMPLE_SENTENCES)])
+        return (time.perf_counter() - start) / samples * 1e6
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def run_benchmark(sizes, backend, concurrency=8, max_retries=3):
+    results = []
+    tts_core.set_backend(backend)
+    try:
+        cache_hit_us = measure_cache_hit()
+        for size in sizes:
+            text = make_text(size)
+            requests_before, errors_before = backend.requests, backend.errors
+
+            tracemalloc.start()
+            try:
+                elapsed, ttfa, chunks, chunk_results = asyncio.run(
+                    measure_conversion(text, concurrency, max_retries))
+                error = None
+            except Exception as e:
+                elapsed = ttfa = None
+                chunks, chunk_results = [], []
+                error = str(e)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            result = {
+                "size": size,
+                "text_mb": len(text.encode('utf-8')) / 1e6,
+                "chunks": len(split_chunks(text)),
+                "end_to_end_s": elapsed,
+                "time_to_first_audio_s": ttfa,
+                "audio_bytes": sum(len(result.audio) for result in chunk_results),
+                "chunking_chars_per_s": measure_chunking(text),
+                "stitching_mb_per_s": measure_stitching(chunks, chunk_results) if chunk_results else None,
+                "silence_trim": silence_trim.AVAILABLE,
+                "cache_hit_us": cache_hit_us,
+                "peak_memory_mb": peak / 1e6,
+                "requests": backend.requests - requests_before,
+                "injected_errors": backend.errors - errors_before,
+                "error": error,
+            }
+            results.append(result)
+            print(f"{size:>10} 字符（{result['text_mb']:.2f} MB）: 总耗时 {format_seconds(elapsed)}，首段音频 {format_seconds(ttfa)}，"
+                  f"峰值内存 {result['peak_memory_mb']:.1f} MB")
+    finally:
+        tts_core.set_backend(None)
+    return results
+
+
+def format_seconds(value):
+    return "失败" if value is None else f"{value:.3f}s"
+
+
+def compare(baseline_path, results):
+    """与历史结果对比，打印各指标的变化比例"""
+    with open(baseline_path, 'r', encoding='utf-8') as file:
+        baseline = {item["size"]: item for item in json.load(file)["results"]}
+    keys = ("end_to_end_s", "time_to_first_audio_s", "chunking_chars_per_s",
+            "stitching_mb_per_s", "cache_hit_us", "peak_memory_mb")
+    for item in results:
+        old = baseline.get(item["size"])
+        if not old:
+            continue
+        changes = []
+        for key in keys:
+            if old.get(key) and item.get(key) is not None:
+                changes.append(f"{key} {(item[key] - old[key]) / old[key]:+.1%}")
+        print(f"{item['size']:>10} 字符: " + "，".join(changes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线性能基准测试（使用本地替身后端）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="文本长度（字符）")
+    parser.add_argument("--latency", type=float, default=0.01, help="替身首包延迟（秒）")
+    parser.add_argument("--throughput", type=float, default=0, help="替身下发速率（字节/秒），0 不限速")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="请求失败概率")
+    parser.add_argument("--ms-per-char", type=float, default=1, help="每个字符生成的音频时长（毫秒）")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark.json", help="结果保存路径")
+    parser.add_argument("--compare", help="用于对比的历史结果文件")
+    args = parser.parse_args(argv)
+
+    backend = FakeBackend(latency=args.latency, throughput=args.throughput, error_rate=args.error_rate,
+                          ms_per_char=args.ms_per_char, seed=args.seed)
+    results = run_benchmark(args.sizes, backend, args.concurrency)
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {os.path.abspath(args.output)}")
+
+    if args.compare:
+        compare(args.compare, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
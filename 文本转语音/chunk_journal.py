@@ -0,0 +1,197 @@
+"""长文本转换的分块日志（断点续传）
+
+每完成一个分块，先把音频追加写入数据文件并落盘，再向日志追加一条记录：
+分块序号、文本区间、音频在数据文件中的位置、长度和 SHA-256，以及边界事件。
+写入和落盘在专用的写入线程中进行，不会阻塞调用 append 的事件循环。
+程序崩溃或网络中断后，对同一文档以相同参数重新转换时，校验通过的分块直接从数据文件恢复，
+只合成其余分块。全部完成后由调用方用 tts_core.atomic_write 发布输出文件，然后删除日志。
+"""
+import os
+import json
+import time
+import queue
+import shutil
+import hashlib
+import threading
+from tts_core import ChunkAudio
+from audio_index import text_digest
+
+VERSION = 1
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.expanduser("~"), ".text2voice", "journal")
+JOURNAL_NAME = "journal.jsonl"
+DATA_NAME = "chunks.dat"
+# 超过该天数未更新的日志视为已放弃，打开新日志时清理
+MAX_AGE_DAYS = 7
+
+
+def job_id(text, voice, rate, volume):
+    key = json.dumps([VERSION, text_digest(text), voice, rate, volume], ensure_ascii=False)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+class ChunkJournal:
+    """单个转换任务（文本 + 语音参数）的分块日志"""
+
+    def __init__(self, text, voice, rate, volume, chunks, root=DEFAULT_JOURNAL_DIR):
+        self.directory = os.path.join(root, job_id(text, voice, rate, volume))
+        self.journal_path = os.path.join(self.directory, JOURNAL_NAME)
+        self.data_path = os.path.join(self.directory, DATA_NAME)
+        self.header = {
+            "version": VERSION,
+            "text_hash": text_digest(text),
+            "voice": voice,
+            "rate": rate,
+            "volume": volume,
+            "chunks": [[chunk.start, chunk.end] for chunk in chunks],
+        }
+        self.chunks = chunks
+        self.restored = {}
+        self._journal = None
+        self._data = None
+        # 分块在后台事件循环中提交，由写入线程依次落盘；关闭则在转换线程中进行
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        prune(root, exclude=self.directory)
+        self._open()
+        self._writer = threading.Thread(target=self._write_loop, name="ChunkJournalWriter", daemon=True)
+        self._writer.start()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        data_end = self._recover() if os.path.exists(self.journal_path) else None
+        if data_end is None:
+            # 没有日志或日志与当前任务不符，重新开始
+            self.restored = {}
+            with open(self.journal_path, 'w', encoding='utf-8') as file:
+                file.write(json.dumps(self.header, ensure_ascii=False) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            data_end = 0
+        self._data = open(self.data_path, 'ab' if os.path.exists(self.data_path) else 'wb')
+        # 丢弃最后一条有效记录之后写了一半的数据
+        self._data.truncate(data_end)
+        self._data.seek(data_end)
+        with open(self.journal_path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            torn = file.read(1) != b"\n"
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        if torn:
+            # 写了一半的记录单独占一行，不影响之后追加的记录
+            self._journal.write("\n")
+
+    def _recover(self):
+        """读取已有日志并校验各分块，返回有效数据的结尾位置；日志不可用时返回 None"""
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as file:
+                lines = file.read().split("\n")
+            if json.loads(lines[0]) != self.header:
+                return None
+        except (OSError, ValueError):
+            return None
+
+        data_end = 0
+        try:
+            data = open(self.data_path, 'rb')
+        except OSError:
+            return 0
+        with data:
+            size = os.fstat(data.fileno()).st_size
+            for line in lines[1:]:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 崩溃时写了一半的记录
+                    continue
+                index, offset, length = record["index"], record["offset"], record["length"]
+                if not 0 <= index < len(self.chunks) or offset + length > size:
+                    continue
+                if [record["start"], record["end"]] != self.header["chunks"][index]:
+                    continue
+                data.seek(offset)
+                audio = data.read(length)
+                if hashlib.sha256(audio).hexdigest() != record["sha256"]:
+                    continue
+                self.restored[index] = ChunkAudio(audio, [tuple(item) for item in record["boundaries"]])
+                data_end = max(data_end, offset + length)
+        return data_end
+
+    def append(self, index, result):
+        """提交一个已完成的分块，由写入线程记录，调用方不等待落盘"""
+        with self._lock:
+            if self._writer is None:
+                # 已关闭（转换失败后仍在收尾的分块），不再记录
+                return
+            self._queue.put((index, result))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._data is None:
+                # 写入失败后不再记录，已写入的分块仍可恢复
+                continue
+            try:
+                self._write(*item)
+            except OSError as e:
+                print(f"写入分块日志失败，之后的分块不再记录: {str(e)}")
+                self._close_files()
+
+    def _write(self, index, result):
+        """数据落盘后才写日志，日志中的记录总能找到完整的数据"""
+        chunk = self.chunks[index]
+        offset = self._data.tell()
+        self._data.write(result.audio)
+        self._data.flush()
+        os.fsync(self._data.fileno())
+        record = {
+            "index": index,
+            "start": chunk.start,
+            "end": chunk.end,
+            "offset": offset,
+            "length": len(result.audio),
+            "sha256": hashlib.sha256(result.audio).hexdigest(),
+            "boundaries": result.boundaries,
+        }
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _close_files(self):
+        for file in (self._journal, self._data):
+            if file:
+                file.close()
+        self._journal = self._data = None
+
+    def close(self):
+        """写完已提交的分块后关闭日志"""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer:
+            self._queue.put(None)
+            writer.join()
+        self._close_files()
+
+    def discard(self):
+        """转换完成并发布后删除日志"""
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def prune(root=DEFAULT_JOURNAL_DIR, max_age_days=MAX_AGE_DAYS, exclude=None):
+    """删除长时间未更新的日志"""
+    if not os.path.isdir(root):
+        return
+    deadline = time.time() - max_age_days * 86400
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if path == exclude or not os.path.isdir(path):
+            continue
+        journal = os.path.join(path, JOURNAL_NAME)
+        try:
+            modified = os.path.getmtime(journal if os.path.exists(journal) else path)
+        except OSError:
+            continue
+        if modified < deadline:
+            shutil.rmtree(path, ignore_errors=True)
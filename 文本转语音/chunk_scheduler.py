@@ -0,0 +1,74 @@
+import heapq
+import threading
+
+
+class PlayheadScheduler:
+    """以播放位置为中心的分块调度器
+
+    播放位置及其后 lookahead 个分块优先合成，其后的分块按距离排序，
+    播放位置之前的分块最后合成。用户跳转时重新排列待合成的分块。
+    """
+
+    def __init__(self, chunk_count, lookahead=3):
+        self.chunk_count = chunk_count
+        self.lookahead = lookahead
+        self.playhead = 0
+        self.pending = set(range(chunk_count))
+        self.running = set()
+        self.done = set()
+        self._heap = []
+        self._lock = threading.Lock()
+        self._rebuild()
+
+    def priority(self, index):
+        """优先级越小越先合成"""
+        distance = index - self.playhead
+        if 0 <= distance <= self.lookahead:
+            return (0, distance)
+        if distance > 0:
+            return (1, distance)
+        # 已经播放过的位置，距离越近越先合成
+        return (2, -distance)
+
+    def _rebuild(self):
+        self._heap = [(self.priority(index), index) for index in self.pending]
+        heapq.heapify(self._heap)
+
+    def seek(self, index):
+        """移动播放位置并重新排列待合成分块"""
+        with self._lock:
+            index = min(max(index, 0), max(self.chunk_count - 1, 0))
+            if index == self.playhead:
+                return
+            self.playhead = index
+            self._rebuild()
+
+    def next_chunk(self):
+        """取出下一个要合成的分块序号，全部分配完毕时返回 None"""
+        with self._lock:
+            while self._heap:
+                _, index = heapq.heappop(self._heap)
+                if index in self.pending:
+                    self.pending.discard(index)
+                    self.running.add(index)
+                    return index
+            return None
+
+    def mark_done(self, index):
+        """标记分块已完成；也可在开始前标记已有结果的分块（如断点续传恢复的分块），使其不再被分配"""
+        with self._lock:
+            self.pending.discard(index)
+            self.running.discard(index)
+            self.done.add(index)
+
+    def requeue(self, index):
+        """合成失败的分块放回队列"""
+        with self._lock:
+            self.running.discard(index)
+            if index not in self.done:
+                self.pending.add(index)
+                heapq.heappush(self._heap, (self.priority(index), index))
+
+    def is_finished(self):
+        with self._lock:
+            return len(self.done) == self.chunk_count
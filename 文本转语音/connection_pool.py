@@ -0,0 +1,267 @@
+import ssl
+import json
+import time
+import asyncio
+import threading
+from xml.sax.saxutils import escape, unescape
+import aiohttp
+
+try:
+    import certifi
+    from edge_tts.communicate import (connect_id, date_to_string, get_headers_and_data, mkssml,
+                                      remove_incompatible_characters, split_text_by_byte_length,
+                                      ssml_headers_plus_data)
+    from edge_tts.constants import SEC_MS_GEC_VERSION, WSS_HEADERS, WSS_URL
+    from edge_tts.data_classes import TTSConfig
+    from edge_tts.drm import DRM
+    from edge_tts.exceptions import NoAudioReceived, WebSocketError
+except ImportError:
+    # 旧版本 edge-tts 没有这些内部接口，此时无法复用连接
+    TTSConfig = None
+
+from tts_core import TICKS_PER_MS, BYTES_PER_MS
+
+
+class StaleConnection(Exception):
+    """复用的连接在收到任何响应前失效"""
+
+
+class PooledConnection:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.configured = False
+        self.turns = 0
+        # 是否是从空闲连接中取出的（可能已被服务端关闭）
+        self.reused = False
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """edge-tts websocket 连接池
+
+    服务端协议允许在同一个 websocket 上依次发送多次合成请求（每次以 turn.end 结束），
+    因此连接可以跨分块、跨任务复用，省去 DNS 查询、TLS 握手和 websocket 升级。
+    连接只能串行使用，并发请求各占一个连接；空闲超过 max_idle 秒的连接会被丢弃。
+    复用的连接若在 stale_timeout 秒内没有任何响应，则改用新连接重试。
+    url 可指向本地替身服务用于测试，为 None 时连接 edge-tts 服务。
+    """
+
+    def __init__(self, url=None, size=3, max_idle=30, stale_timeout=3,
+                 connect_timeout=10, receive_timeout=60, proxy=None):
+        if TTSConfig is None:
+            raise RuntimeError("当前 edge-tts 版本不支持连接复用，请升级 edge-tts")
+        self.url = url
+        self.size = size
+        self.max_idle = max_idle
+        self.stale_timeout = stale_timeout
+        self.connect_timeout = connect_timeout
+        self.receive_timeout = receive_timeout
+        self.proxy = proxy
+        self.opened = 0
+        self.reused = 0
+        self._idle = []
+        self._session = None
+        self._ssl = ssl.create_default_context(cafile=certifi.where())
+
+    def _session_for_loop(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(ttl_dns_cache=300, limit=0)
+            self._session = aiohttp.ClientSession(
+                connector=connector, trust_env=True,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.connect_timeout))
+        return self._session
+
+    def _connect_url(self):
+        if self.url:
+            return self.url
+        return (f"{WSS_URL}&ConnectionId={connect_id()}"
+                f"&Sec-MS-GEC={DRM.generate_sec_ms_gec()}"
+                f"&Sec-MS-GEC-Version={SEC_MS_GEC_VERSION}")
+
+    async def _ws_connect(self):
+        return await self._session_for_loop().ws_connect(
+            self._connect_url(), compress=15, proxy=self.proxy,
+            headers=DRM.headers_with_muid(WSS_HEADERS),
+            # 明文 ws:// 不使用 TLS，ssl=True 只表示默认校验，不会产生影响
+            ssl=self._ssl if not self.url or self.url.startswith("wss:") else True)
+
+    async def open(self):
+        """新建一个连接"""
+        try:
+            websocket = await self._ws_connect()
+        except aiohttp.ClientResponseError as e:
+            if e.status != 403 or self.url:
+                raise
+            # 与 edge-tts 相同：时钟偏差导致 403 时校正后重试一次
+            DRM.handle_client_response_error(e)
+            websocket = await self._ws_connect()
+        self.opened += 1
+        return PooledConnection(websocket)
+
+    async def acquire(self):
+        """取出一个空闲连接，没有可用连接时新建"""
+        now = time.monotonic()
+        while self._idle:
+            connection = self._idle.pop()
+            if connection.websocket.closed or now - connection.last_used > self.max_idle:
+                await connection.websocket.close()
+                continue
+            self.reused += 1
+            connection.reused = True
+            return connection
+        return await self.open()
+
+    async def release(self, connection, reusable=True):
+        """归还连接；请求异常结束或空闲连接已满时关闭该连接"""
+        if reusable and not connection.websocket.closed and len(self._idle) < self.size:
+            connection.last_used = time.monotonic()
+            self._idle.append(connection)
+        else:
+            await connection.websocket.close()
+
+    async def prewarm(self, count=None):
+        """预先建立连接，返回当前空闲连接数"""
+        count = self.size if count is None else min(count, self.size)
+        missing = count - len(self._idle)
+        if missing > 0:
+            results = await asyncio.gather(*(self.open() for _ in range(missing)), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"预建连接失败: {str(result)}")
+                else:
+                    await self.release(result)
+        return len(self._idle)
+
+    async def close(self):
+        while self._idle:
+            await self._idle.pop().websocket.close()
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def communicate(self, text, voice, rate="+0%", volume="+0%", pitch="+0Hz", **kwargs):
+        """与 edge_tts.Communicate 接口一致的工厂，可传给 tts_core.set_backend"""
+        return PooledCommunicate(self, text, voice, rate=rate, volume=volume, pitch=pitch)
+
+
+class PooledCommunicate:
+    """使用连接池中的连接完成一次合成，stream() 的输出与 edge_tts.Communicate 相同"""
+
+    def __init__(self, pool, text, voice, rate="+0%", volume="+0%", pitch="+0Hz"):
+        self.pool = pool
+        self.tts_config = TTSConfig(voice, rate, volume, pitch, "SentenceBoundary")
+        self.texts = list(split_text_by_byte_length(escape(remove_incompatible_characters(text)), 4096))
+
+    async def stream(self):
+        audio_bytes = 0
+        for part in self.texts:
+            # 超长文本分多次请求，边界事件的时间按之前的音频时长顺延
+            offset_ticks = int(audio_bytes / BYTES_PER_MS * TICKS_PER_MS)
+            audio_received = False
+            while True:
+                connection = await self.pool.acquire()
+                try:
+                    async for message in self._turn(connection, part):
+                        if message["type"] == "audio":
+                            audio_received = True
+                            audio_bytes += len(message["data"])
+                        else:
+                            message["offset"] += offset_ticks
+                        yield message
+                except StaleConnection:
+                    await self.pool.release(connection, reusable=False)
+                    continue
+                except BaseException:
+                    await self.pool.release(connection, reusable=False)
+                    raise
+                await self.pool.release(connection)
+                break
+            if not audio_received:
+                raise NoAudioReceived("No audio was received. Please verify that your parameters are correct.")
+
+    async def _turn(self, connection, part):
+        websocket = connection.websocket
+        reused = connection.reused
+        if not connection.configured:
+            await websocket.send_str(
+                f"X-Timestamp:{date_to_string()}\r\n"
+                "Content-Type:application/json; charset=utf-8\r\n"
+                "Path:speech.config\r\n\r\n"
+                '{"context":{"synthesis":{"audio":{"metadataoptions":{'
+                '"sentenceBoundaryEnabled":"true","wordBoundaryEnabled":"false"},'
+                '"outputFormat":"audio-24khz-48kbitrate-mono-mp3"}}}}\r\n')
+            connection.configured = True
+        await websocket.send_str(ssml_headers_plus_data(connect_id(), date_to_string(),
+                                                        mkssml(self.tts_config, part)))
+
+        first = True
+        while True:
+            timeout = self.pool.stale_timeout if first and reused else self.pool.receive_timeout
+            try:
+                received = await asyncio.wait_for(websocket.receive(), timeout)
+            except asyncio.TimeoutError:
+                if first and reused:
+                    raise StaleConnection()
+                raise
+            if received.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING, aiohttp.WSMsgType.CLOSED):
+                if first and reused:
+                    raise StaleConnection()
+                raise WebSocketError("连接被服务端关闭")
+            if received.type == aiohttp.WSMsgType.ERROR:
+                raise WebSocketError(str(received.data) if received.data else "Unknown error")
+            first = False
+
+            if received.type == aiohttp.WSMsgType.TEXT:
+                encoded = received.data.encode("utf-8")
+                parameters, data = get_headers_and_data(encoded, encoded.find(b"\r\n\r\n"))
+                path = parameters.get(b"Path")
+                if path == b"turn.end":
+                    connection.turns += 1
+                    return
+                if path == b"audio.metadata":
+                    for meta in json.loads(data)["Metadata"]:
+                        if meta["Type"] in ("WordBoundary", "SentenceBoundary"):
+                            yield {
+                                "type": meta["Type"],
+                                "offset": meta["Data"]["Offset"],
+                                "duration": meta["Data"]["Duration"],
+                                "text": unescape(meta["Data"]["text"]["Text"]),
+                            }
+            elif received.type == aiohttp.WSMsgType.BINARY:
+                header_length = int.from_bytes(received.data[:2], "big")
+                parameters, data = get_headers_and_data(received.data, header_length)
+                if parameters.get(b"Path") == b"audio" and data:
+                    yield {"type": "audio", "data": data}
+
+
+class BackgroundLoop:
+    """在后台线程中常驻的事件循环，连接池依附于它以便跨任务复用连接"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="TTSBackgroundLoop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """提交协程，返回 concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_shared_loop = None
+_shared_loop_lock = threading.Lock()
+
+
+def shared_loop():
+    """进程内共享的后台事件循环"""
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None:
+            _shared_loop = BackgroundLoop()
+        return _shared_loop
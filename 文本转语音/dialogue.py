@@ -0,0 +1,147 @@
+"""多角色对话脚本
+
+脚本每行一句台词，格式为 "角色: 台词"（也可用全角冒号），没有角色名的行由旁白朗读，
+空行表示段落间的较长停顿。指定了角色语音时只有这些角色名被识别为角色，
+"10:30 开会"、网址这类行整行由旁白朗读：
+
+    张三：你今天怎么来得这么早？
+    李四: 路上不堵车。
+
+    旁白：两人相视一笑。
+"""
+import re
+import sys
+import asyncio
+import argparse
+import tts_core
+from tts_core import silence
+from tts_api import DEFAULT_VOICE, synthesize_async
+from connection_pool import ConnectionPool
+
+LINE_PATTERN = re.compile(r'^\s*([^\s:：]{1,20})\s*[:：]\s*(.+?)\s*$')
+NARRATOR = "旁白"
+
+
+class DialogueLine:
+    def __init__(self, index, speaker, text, paragraph_break=False):
+        self.index = index
+        self.speaker = speaker
+        self.text = text
+        # 该行之前是否有空行
+        self.paragraph_break = paragraph_break
+
+
+def is_speaker(name, text, speakers=None):
+    """冒号前的 name 是否为角色名，speakers 为已知角色名的集合"""
+    if speakers is not None:
+        return name in speakers
+    # 时间、比分（10:30）和网址（http://）不是角色
+    return not name.isdigit() and not text.startswith("//")
+
+
+def parse_script(script, speakers=None):
+    """解析对话脚本，speakers 不为 None 时只把其中的名字识别为角色"""
+    lines = []
+    blank = False
+    for raw in script.splitlines():
+        if not raw.strip():
+            blank = bool(lines)
+            continue
+        match = LINE_PATTERN.match(raw)
+        if match and is_speaker(match.group(1), match.group(2), speakers):
+            speaker, text = match.group(1), match.group(2)
+        else:
+            speaker, text = NARRATOR, raw.strip()
+        lines.append(DialogueLine(len(lines), speaker, text, blank))
+        blank = False
+    return lines
+
+
+async def synthesize_dialogue(lines, voices, default_voice=DEFAULT_VOICE, rate="+0%", volume="+0%",
+                              concurrency=6, pause_ms=400, paragraph_pause_ms=1000, cache=None):
+    """并发合成各行台词，再按脚本顺序拼接，返回 MP3 数据
+
+    voices 为 {角色: 语音}，未指定的角色使用 default_voice。
+    所有台词共用一个信号量，不论有多少种语音，同时进行的请求都不超过 concurrency 个。
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def synthesize_line(line):
+        async with semaphore:
+            return await synthesize_async(line.text, voices.get(line.speaker, default_voice), rate, volume,
+                                          concurrency=1, cache=cache)
+
+    audios = await asyncio.gather(*(synthesize_line(line) for line in lines))
+
+    parts = []
+    for line, audio in zip(lines, audios):
+        if parts:
+            parts.append(silence(paragraph_pause_ms if line.paragraph_break else pause_ms))
+        parts.append(audio)
+    return b"".join(parts)
+
+
+def parse_voice_mapping(items):
+    """解析 "角色=语音" 形式的参数"""
+    voices = {}
+    for item in items:
+        speaker, _, voice = item.partition("=")
+        if not voice:
+            raise ValueError(f"角色语音格式应为 角色=语音: {item}")
+        voices[speaker.strip()] = voice.strip()
+    return voices
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="按角色使用不同语音合成对话脚本")
+    parser.add_argument("script", help="对话脚本文件")
+    parser.add_argument("-o", "--output", default="dialogue.mp3")
+    parser.add_argument("--voice", action="append", default=[], metavar="角色=语音",
+                        help="角色使用的语音，可多次指定")
+    parser.add_argument("--default-voice", default=DEFAULT_VOICE, help="未指定语音的角色和旁白使用的语音")
+    parser.add_argument("--rate", default="+10%")
+    parser.add_argument("--volume", default="+70%")
+    parser.add_argument("--concurrency", type=int, default=6)
+    parser.add_argument("--pause", type=int, default=400, help="台词之间的停顿（毫秒）")
+    parser.add_argument("--paragraph-pause", type=int, default=1000, help="空行处的停顿（毫秒）")
+    args = parser.parse_args(argv)
+
+    try:
+        voices = parse_voice_mapping(args.voice)
+    except ValueError as e:
+        parser.error(str(e))
+    with open(args.script, 'r', encoding='utf-8') as file:
+        lines = parse_script(file.read(), set(voices) | {NARRATOR} if voices else None)
+    if not lines:
+        print("脚本中没有台词")
+        return 1
+
+    unmapped = sorted({line.speaker for line in lines} - set(voices) - {NARRATOR})
+    if unmapped:
+        print(f"以下角色未指定语音，使用 {args.default_voice}: {'、'.join(unmapped)}")
+
+    async def run():
+        # 各行台词依次复用连接池中的 websocket，省去每行的握手
+        pool = None
+        try:
+            pool = ConnectionPool(size=args.concurrency)
+            tts_core.set_backend(pool.communicate)
+        except RuntimeError as e:
+            print(f"连接池不可用，每次合成将新建连接: {str(e)}")
+        try:
+            return await synthesize_dialogue(lines, voices, args.default_voice, args.rate, args.volume,
+                                             args.concurrency, args.pause, args.paragraph_pause)
+        finally:
+            if pool:
+                await pool.close()
+                tts_core.set_backend(None)
+
+    audio = asyncio.run(run())
+    with open(args.output, 'wb') as file:
+        file.write(audio)
+    print(f"已合成 {len(lines)} 行台词，保存到 {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
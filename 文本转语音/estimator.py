@@ -0,0 +1,138 @@
+import os
+import re
+import json
+import threading
+from tts_core import MAX_CHUNK_CHARS, atomic_write
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.expanduser("~"), ".text2voice", "estimator.json")
+
+CJK_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af]')
+WORD_PATTERN = re.compile(r'[A-Za-z0-9]+(?:[\'.-][A-Za-z0-9]+)*')
+
+# 一个英文单词的朗读时长约相当于 1.5 个汉字
+WORD_UNITS = 1.5
+# 未校准时的默认值：语速 0% 时每个单位约 230 毫秒，合成耗时约为音频时长的 1/8
+DEFAULT_MS_PER_UNIT = 230.0
+DEFAULT_WALL_RATIO = 0.125
+# 指数加权平均的权重，越大越偏向最近的任务
+SMOOTHING = 0.3
+
+
+def text_units(text):
+    """返回 (朗读单位数, 文字类型)，汉字每字一个单位，英文按单词计"""
+    cjk = len(CJK_PATTERN.findall(text))
+    words = len(WORD_PATTERN.findall(text))
+    return cjk + words * WORD_UNITS, "cjk" if cjk >= words else "latin"
+
+
+def rate_factor(rate):
+    """语速参数（如 "+10%" 或 10）对应的时长系数"""
+    if isinstance(rate, str):
+        rate = float(rate.strip().rstrip("%") or 0)
+    return 1 / max(1 + rate / 100, 0.1)
+
+
+class Estimate:
+    def __init__(self, audio_s, wall_s, chunks):
+        self.audio_s = audio_s
+        self.wall_s = wall_s
+        self.chunks = chunks
+
+
+class DurationEstimator:
+    """音频时长与合成耗时估计
+
+    每个 (语音, 文字类型) 维护两个参数：语速 0% 时每单位的音频毫秒数，
+    以及单路并发下合成耗时与音频时长之比。任务完成后用实际结果做指数加权平均并保存，
+    估计会随使用逐渐贴近本机网络和所选语音的真实情况。
+    """
+
+    def __init__(self, path=DEFAULT_MODEL_PATH):
+        self.path = path
+        self.models = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.models = json.load(file).get("models", {})
+        except (OSError, ValueError):
+            self.models = {}
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with self._lock:
+                data = json.dumps({"models": self.models}, ensure_ascii=False, indent=2)
+            atomic_write(self.path, (data.encode('utf-8'),))
+        except OSError as e:
+            print(f"保存估计模型失败: {str(e)}")
+
+    @staticmethod
+    def key(voice, script):
+        return f"{voice}|{script}"
+
+    def model(self, voice, script):
+        """返回 (每单位毫秒数, 耗时比)；该语音未校准时使用同类文字其他语音的平均值"""
+        with self._lock:
+            model = self.models.get(self.key(voice, script))
+            if model:
+                return model["ms_per_unit"], model["wall_ratio"]
+            similar = [m for k, m in self.models.items() if k.endswith("|" + script)]
+        if similar:
+            return (sum(m["ms_per_unit"] for m in similar) / len(similar),
+                    sum(m["wall_ratio"] for m in similar) / len(similar))
+        return DEFAULT_MS_PER_UNIT, DEFAULT_WALL_RATIO
+
+    def estimate(self, text, voice, rate="+0%", concurrency=1):
+        units, script = text_units(text)
+        ms_per_unit, wall_ratio = self.model(voice, script)
+        audio_s = units * ms_per_unit * rate_factor(rate) / 1000
+        chunks = max(-(-len(text) // MAX_CHUNK_CHARS), 1)
+        wall_s = audio_s * wall_ratio / max(min(concurrency, chunks), 1)
+        return Estimate(audio_s, wall_s, chunks)
+
+    def observe(self, text, voice, rate, audio_s, wall_s=None, concurrency=1):
+        """用一次任务的实际结果校准；wall_s 为 None 时（例如大量命中缓存）只校准音频时长"""
+        units, script = text_units(text)
+        if units <= 0 or audio_s <= 0:
+            return
+        chunks = max(-(-len(text) // MAX_CHUNK_CHARS), 1)
+        ms_per_unit = audio_s * 1000 / rate_factor(rate) / units
+        with self._lock:
+            model = self.models.get(self.key(voice, script))
+            if model is None:
+                model = {"ms_per_unit": ms_per_unit, "wall_ratio": DEFAULT_WALL_RATIO,
+                         "samples": 0, "wall_samples": 0}
+                self.models[self.key(voice, script)] = model
+            else:
+                model["ms_per_unit"] += SMOOTHING * (ms_per_unit - model["ms_per_unit"])
+            model["samples"] += 1
+            if wall_s is not None:
+                wall_ratio = wall_s * max(min(concurrency, chunks), 1) / audio_s
+                if model["wall_samples"] == 0:
+                    model["wall_ratio"] = wall_ratio
+                else:
+                    model["wall_ratio"] += SMOOTHING * (wall_ratio - model["wall_ratio"])
+                model["wall_samples"] += 1
+
+
+def order_jobs(texts, estimator, voice, rate="+0%", policy="sjf"):
+    """按估计耗时排列任务，返回下标列表
+
+    sjf（最短优先）让更多任务尽早完成，ljf（最长优先）缩短整批任务的总耗时。
+    """
+    if policy not in ("sjf", "ljf"):
+        raise ValueError(f"未知的排序策略: {policy}")
+    costs = [estimator.estimate(text, voice, rate).wall_s for text in texts]
+    return sorted(range(len(texts)), key=lambda i: costs[i], reverse=policy == "ljf")
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
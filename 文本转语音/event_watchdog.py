@@ -0,0 +1,66 @@
+import sys
+import time
+import logging
+import threading
+import traceback
+from PySide6.QtCore import QObject, QTimer
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopWatchdog(QObject):
+    """Qt 事件循环卡顿监视器
+
+    GUI 线程中的定时器按固定间隔刷新心跳并统计事件循环延迟；
+    后台线程发现心跳超过 threshold_ms 未刷新时，记录 GUI 线程当前的调用栈，
+    卡顿结束后再记录总时长。
+    """
+
+    def __init__(self, threshold_ms=200, interval_ms=50, parent=None):
+        super().__init__(parent)
+        self.threshold_ms = threshold_ms
+        self.interval_ms = interval_ms
+        self.max_lag_ms = 0
+        self.stall_count = 0
+        self._last_beat = time.monotonic()
+        self._stall_reported = False
+        self._gui_thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._monitor = None
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._beat)
+
+    def start(self):
+        self._last_beat = time.monotonic()
+        self._gui_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._timer.start()
+        self._monitor = threading.Thread(target=self._watch, name="EventLoopWatchdog", daemon=True)
+        self._monitor.start()
+
+    def stop(self):
+        self._timer.stop()
+        self._stopped.set()
+
+    def _beat(self):
+        """GUI 线程中执行：刷新心跳并统计延迟"""
+        now = time.monotonic()
+        lag_ms = (now - self._last_beat) * 1000 - self.interval_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if self._stall_reported:
+            logger.warning("事件循环卡顿结束，持续 %.0f ms", lag_ms + self.interval_ms)
+            self._stall_reported = False
+        self._last_beat = now
+
+    def _watch(self):
+        """后台线程中执行：检测心跳超时并记录 GUI 线程调用栈"""
+        while not self._stopped.wait(self.interval_ms / 2000):
+            stalled_ms = (time.monotonic() - self._last_beat) * 1000
+            if stalled_ms > self.threshold_ms and not self._stall_reported:
+                self._stall_reported = True
+                self.stall_count += 1
+                frame = sys._current_frames().get(self._gui_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame else "（无法获取调用栈）\n"
+                logger.warning("事件循环卡顿超过 %d ms，GUI 线程调用栈:\n%s", self.threshold_ms, stack)
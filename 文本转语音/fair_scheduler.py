@@ -0,0 +1,295 @@
+"""多客户端共享合成服务的加权公平调度
+
+每个客户端一个分块队列，按起始时间公平排队（SFQ）以分块为单位轮流派发：
+分块入队时得到起始标签 max(虚拟时间, 该客户端上一分块的结束标签)，结束标签再加上 字符数/权重，
+空闲的工作协程总是取起始标签最小、且未超出配额的分块。提交整本书的客户端只会占用自己那一份，
+新来的小请求的标签接近当前虚拟时间，会被优先派发。
+
+    python fair_scheduler.py --port 8080 --concurrency 8 --quotas quotas.json
+
+quotas.json 形如 {"batch": {"weight": 1, "chars_per_minute": 200000, "max_concurrency": 4},
+"web": {"weight": 4}}，未列出的客户端使用 "*" 项或默认配额。
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import deque
+from tts_core import split_chunks, synthesize_chunk
+from tts_api import DEFAULT_VOICE
+import tts_core
+from connection_pool import ConnectionPool
+
+LATENCY_SAMPLES = 1000
+
+
+class ClientQuota:
+    def __init__(self, weight=1.0, chars_per_minute=None, max_concurrency=None):
+        self.weight = weight
+        # 每分钟最多合成的字符数，None 表示不限
+        self.chars_per_minute = chars_per_minute
+        # 同时进行的分块请求数上限，None 表示不限
+        self.max_concurrency = max_concurrency
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Job:
+    def __init__(self, client, chunks, voice, rate, volume, future):
+        self.client = client
+        self.chunks = chunks
+        self.voice = voice
+        self.rate = rate
+        self.volume = volume
+        self.future = future
+        self.results = [None] * len(chunks)
+        self.remaining = len(chunks)
+        self.submitted = time.monotonic()
+        self.first_chunk = None
+
+
+class ClientState:
+    def __init__(self, name, quota):
+        self.name = name
+        self.quota = quota
+        # (起始标签, 结束标签, 任务, 分块下标)
+        self.queue = deque()
+        self.last_finish = 0.0
+        self.in_flight = 0
+        self.tokens = quota.chars_per_minute or 0
+        self.refilled = time.monotonic()
+        self.chars_served = 0
+        self.jobs_done = 0
+        self.jobs_failed = 0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.first_chunk_latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def refill(self, now):
+        rate = self.quota.chars_per_minute
+        if rate:
+            self.tokens = min(rate, self.tokens + (now - self.refilled) * rate / 60)
+        self.refilled = now
+
+    def wait_time(self, cost, now):
+        """距离配额允许派发下一个分块还需等待的秒数，0 表示可以立即派发"""
+        if self.quota.max_concurrency and self.in_flight >= self.quota.max_concurrency:
+            return None
+        rate = self.quota.chars_per_minute
+        if not rate:
+            return 0
+        self.refill(now)
+        # 单个分块超过每分钟配额时，攒满一分钟的额度即可派发
+        need = min(cost, rate)
+        return 0 if self.tokens >= need else (need - self.tokens) * 60 / rate
+
+
+class FairScheduler:
+    def __init__(self, concurrency=8, quotas=None, default_quota=None, max_retries=3, retry_delay=1):
+        self.concurrency = concurrency
+        self.quotas = quotas or {}
+        self.default_quota = default_quota or self.quotas.get("*") or ClientQuota()
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.clients = {}
+        self.virtual_time = 0.0
+        self._wakeup = None
+        self._workers = []
+
+    def client(self, name):
+        state = self.clients.get(name)
+        if state is None:
+            state = self.clients[name] = ClientState(name, self.quotas.get(name, self.default_quota))
+        return state
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def synthesize(self, client, text, voice=DEFAULT_VOICE, rate="+0%", volume="+0%"):
+        """以 client 的身份提交一段文本，返回 MP3 数据"""
+        chunks = split_chunks(text)
+        if not chunks:
+            return b""
+        if not self._workers:
+            self.start()
+        state = self.client(client)
+        job = Job(client, chunks, voice, rate, volume, asyncio.get_running_loop().create_future())
+        for i, chunk in enumerate(chunks):
+            start = max(self.virtual_time, state.last_finish)
+            state.last_finish = start + len(chunk.text) / state.quota.weight
+            state.queue.append((start, state.last_finish, job, i))
+        self._wakeup.set()
+        try:
+            return await job.future
+        finally:
+            if not job.future.done():
+                # 调用方取消时丢弃尚未派发的分块
+                job.future.cancel()
+                state.queue = deque(item for item in state.queue if item[2] is not job)
+
+    def _next(self):
+        """返回 (客户端, 队首分块) 或 (None, 最短等待秒数)"""
+        now = time.monotonic()
+        best = None
+        delay = None
+        for state in self.clients.values():
+            while state.queue and state.queue[0][2].future.done():
+                state.queue.popleft()
+            if not state.queue:
+                continue
+            start, _, job, index = state.queue[0]
+            wait = state.wait_time(len(job.chunks[index].text), now)
+            if wait == 0:
+                if best is None or start < best[1][0]:
+                    best = (state, state.queue[0])
+            elif wait is not None:
+                delay = wait if delay is None else min(delay, wait)
+        return best if best else (None, delay)
+
+    async def _worker(self):
+        while True:
+            state, item = self._next()
+            if state is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), item)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            state.queue.popleft()
+            start, _, job, index = item
+            self.virtual_time = max(self.virtual_time, start)
+            chunk = job.chunks[index]
+            if state.quota.chars_per_minute:
+                state.tokens -= len(chunk.text)
+            state.in_flight += 1
+            try:
+                job.results[index] = await self._synthesize_chunk(job, chunk)
+            except Exception as e:
+                if not job.future.done():
+                    state.jobs_failed += 1
+                    job.future.set_exception(e)
+                continue
+            finally:
+                state.in_flight -= 1
+                self._wakeup.set()
+
+            state.chars_served += len(chunk.text)
+            if job.first_chunk is None:
+                job.first_chunk = time.monotonic()
+                state.first_chunk_latencies.append(job.first_chunk - job.submitted)
+            job.remaining -= 1
+            if job.remaining == 0 and not job.future.done():
+                state.jobs_done += 1
+                state.latencies.append(time.monotonic() - job.submitted)
+                job.future.set_result(b"".join(result.audio for result in job.results))
+
+    async def _synthesize_chunk(self, job, chunk):
+        retries = 0
+        while True:
+            try:
+                return await synthesize_chunk(chunk, job.voice, job.rate, job.volume)
+            except Exception as e:
+                retries += 1
+                if retries >= self.max_retries or job.future.done():
+                    raise
+                print(f"客户端 {job.client} 的分块 {chunk.index} 转换失败，正在重试 ({retries}/{self.max_retries}): {str(e)}")
+                await asyncio.sleep(self.retry_delay)
+
+    def stats(self):
+        """各客户端的排队情况和延迟分位数（秒）"""
+        report = {}
+        for name, state in self.clients.items():
+            report[name] = {
+                "queued_chunks": len(state.queue),
+                "in_flight": state.in_flight,
+                "jobs_done": state.jobs_done,
+                "jobs_failed": state.jobs_failed,
+                "chars_served": state.chars_served,
+                "latency_p50": percentile(state.latencies, 0.5),
+                "latency_p95": percentile(state.latencies, 0.95),
+                "latency_p99": percentile(state.latencies, 0.99),
+                "first_chunk_p50": percentile(state.first_chunk_latencies, 0.5),
+                "first_chunk_p95": percentile(state.first_chunk_latencies, 0.95),
+            }
+        return report
+
+
+def load_quotas(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        data = json.load(file)
+    return {name: ClientQuota(item.get("weight", 1.0), item.get("chars_per_minute"), item.get("max_concurrency"))
+            for name, item in data.items()}
+
+
+def create_app(scheduler):
+    """HTTP 接口：POST /synthesize 返回 MP3，GET /stats 返回各客户端统计"""
+    from aiohttp import web
+
+    async def synthesize(request):
+        data = await request.json()
+        client = request.headers.get("X-Client-Id") or request.remote or "anonymous"
+        text = data.get("text", "")
+        if not text.strip():
+            return web.json_response({"error": "text 不能为空"}, status=400)
+        try:
+            audio = await scheduler.synthesize(client, text, data.get("voice", DEFAULT_VOICE),
+                                               data.get("rate", "+0%"), data.get("volume", "+0%"))
+        except Exception as e:
+            return web.json_response({"error": str(e)}, status=502)
+        return web.Response(body=audio, content_type="audio/mpeg")
+
+    async def stats(request):
+        return web.json_response(scheduler.stats())
+
+    async def on_startup(app):
+        # 工作协程与服务共用一个事件循环，连接池可直接在其中复用连接
+        try:
+            app["pool"] = ConnectionPool(size=scheduler.concurrency)
+            tts_core.set_backend(app["pool"].communicate)
+        except RuntimeError as e:
+            print(f"连接池不可用，每次合成将新建连接: {str(e)}")
+        scheduler.start()
+
+    async def on_cleanup(app):
+        await scheduler.stop()
+        if "pool" in app:
+            await app["pool"].close()
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.router.add_post("/synthesize", synthesize)
+    app.router.add_get("/stats", stats)
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="多客户端共享的文本转语音服务（加权公平调度）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=8, help="同时进行的分块请求总数")
+    parser.add_argument("--quotas", help="客户端配额 JSON 文件")
+    args = parser.parse_args(argv)
+
+    from aiohttp import web
+    quotas = load_quotas(args.quotas) if args.quotas else {}
+    web.run_app(create_app(FairScheduler(args.concurrency, quotas)), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
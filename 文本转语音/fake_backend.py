@@ -0,0 +1,181 @@
+import re
+import json
+import uuid
+import asyncio
+import random
+import threading
+from xml.sax.saxutils import unescape
+from tts_core import (split_sentences, silence, FRAME_MS, FRAME_BYTES, TICKS_PER_MS)
+
+
+class FakeBackendError(Exception):
+    """替身后端注入的错误"""
+
+
+class FakeBackend:
+    """可确定复现的本地合成后端，用于替换 edge_tts.Communicate
+
+    latency 为首包延迟（秒），throughput 为音频下发速率（字节/秒，0 表示不限速），
+    error_rate 为每次请求失败的概率，ms_per_char 决定生成音频的时长。
+    同一文本第 n 次请求是否失败只由 seed、文本和 n 决定，与并发调度顺序无关。
+    """
+
+    def __init__(self, latency=0.05, throughput=0, error_rate=0.0, ms_per_char=200,
+                 message_bytes=FRAME_BYTES * 30, seed=0):
+        self.latency = latency
+        self.throughput = throughput
+        self.error_rate = error_rate
+        self.ms_per_char = ms_per_char
+        self.message_bytes = message_bytes
+        self.seed = seed
+        self.requests = 0
+        self.errors = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, text, voice, rate="+0%", volume="+0%", **kwargs):
+        with self._lock:
+            attempt = self._attempts.get(text, 0)
+            self._attempts[text] = attempt + 1
+            self.requests += 1
+        return FakeCommunicate(self, text, attempt)
+
+    def should_fail(self, text, attempt):
+        if self.error_rate <= 0:
+            return False
+        failed = random.Random(f"{self.seed}:{attempt}:{text}").random() < self.error_rate
+        if failed:
+            with self._lock:
+                self.errors += 1
+        return failed
+
+
+class FakeCommunicate:
+    """单次合成会话，按句子生成静音音频和 SentenceBoundary 事件"""
+
+    def __init__(self, backend, text, attempt):
+        self.backend = backend
+        self.text = text
+        self.attempt = attempt
+
+    def events(self):
+        """返回 (边界事件列表, 音频数据)"""
+        boundaries = []
+        audio = bytearray()
+        for start, end in split_sentences(self.text):
+            sentence = self.text[start:end].strip()
+            ms = len(audio) / FRAME_BYTES * FRAME_MS
+            boundaries.append({
+                "type": "SentenceBoundary",
+                "offset": int(ms * TICKS_PER_MS),
+                "duration": int(len(sentence) * self.backend.ms_per_char * TICKS_PER_MS),
+                "text": sentence,
+            })
+            audio.extend(silence(len(sentence) * self.backend.ms_per_char) or silence(FRAME_MS))
+        return boundaries, bytes(audio)
+
+    async def stream(self):
+        backend = self.backend
+        if backend.latency:
+            await asyncio.sleep(backend.latency)
+        if backend.should_fail(self.text, self.attempt):
+            raise FakeBackendError(f"injected failure (attempt {self.attempt})")
+
+        boundaries, audio = self.events()
+        for boundary in boundaries:
+            yield boundary
+        step = backend.message_bytes
+        for position in range(0, len(audio), step):
+            data = audio[position:position + step]
+            if backend.throughput:
+                await asyncio.sleep(len(data) / backend.throughput)
+            yield {"type": "audio", "data": data}
+
+    async def save(self, audio_fname, metadata_fname=None):
+        with open(audio_fname, 'wb') as audio:
+            async for message in self.stream():
+                if message["type"] == "audio":
+                    audio.write(message["data"])
+
+
+class FakeServer:
+    """本地 websocket 替身服务，按 edge-tts 协议应答，用于测试连接复用
+
+    每个连接可以连续处理多次请求；close_after_turn 为 True 时每次请求后关闭连接，
+    模拟不支持复用的服务端。backend.error_rate 决定的失败请求在 turn.start 之后断开连接。
+    """
+
+    def __init__(self, backend, close_after_turn=False):
+        self.backend = backend
+        self.close_after_turn = close_after_turn
+        self.connections = 0
+        self.turns = 0
+        self.url = None
+        self._runner = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get("/", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"ws://{host}:{port}/"
+        return self.url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def handle(self, request):
+        from aiohttp import web, WSMsgType
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+        self.connections += 1
+        async for message in websocket:
+            if message.type != WSMsgType.TEXT or "Path:ssml" not in message.data:
+                continue
+            request_id = re.search(r"X-RequestId:(\w+)", message.data).group(1)
+            match = re.search(r"<prosody[^>]*>(.*)</prosody>", message.data, re.S)
+            text = unescape(match.group(1)) if match else ""
+            if not await self.reply(websocket, request_id, text):
+                break
+            self.turns += 1
+            if self.close_after_turn:
+                await websocket.close()
+        return websocket
+
+    async def reply(self, websocket, request_id, text):
+        """应答一次请求，注入失败时断开连接并返回 False"""
+        def text_message(path, body):
+            return (f"X-RequestId:{request_id}\r\nContent-Type:application/json; charset=utf-8\r\n"
+                    f"Path:{path}\r\n\r\n{body}")
+
+        session = self.backend(text, "")
+        if self.backend.latency:
+            await asyncio.sleep(self.backend.latency)
+        await websocket.send_str(text_message("turn.start", "{}"))
+        # 已开始应答后才断开，客户端不会把它当作失效的空闲连接而静默重试
+        if self.backend.should_fail(text, session.attempt):
+            await websocket.close(code=1011, message=b"injected failure")
+            return False
+        boundaries, audio = session.events()
+        for boundary in boundaries:
+            metadata = {"Metadata": [{"Type": boundary["type"], "Data": {
+                "Offset": boundary["offset"], "Duration": boundary["duration"],
+                "text": {"Text": boundary["text"], "Length": len(boundary["text"]),
+                         "BoundaryType": boundary["type"]}}}]}
+            await websocket.send_str(text_message("audio.metadata", json.dumps(metadata, ensure_ascii=False)))
+        header = (f"X-RequestId:{request_id}\r\nContent-Type:audio/mpeg\r\n"
+                  f"X-StreamId:{uuid.uuid4().hex}\r\nPath:audio\r\n").encode()
+        step = self.backend.message_bytes
+        for position in range(0, len(audio), step):
+            data = audio[position:position + step]
+            if self.backend.throughput:
+                await asyncio.sleep(len(data) / self.backend.throughput)
+            await websocket.send_bytes(len(header).to_bytes(2, "big") + header + data)
+        await websocket.send_str(text_message("turn.end", "{}"))
+        return True
@@ -0,0 +1,291 @@
+"""热文件夹守护进程
+
+监视目录中的 .txt 文件，文件写入完成后自动合成同名 .mp3（以及点击跳转用的索引文件）。
+Linux 下通过 inotify 获取文件事件，其他平台退化为定时扫描。
+每个目录中的清单文件记录已完成的文本摘要和合成参数，重启后不会重复转换。
+"""
+import os
+import sys
+import json
+import time
+import ctypes
+import signal
+import struct
+import asyncio
+import argparse
+import ctypes.util
+from tts_core import split_chunks, synthesize_scheduled, atomic_write
+from chunk_scheduler import PlayheadScheduler
+from audio_index import AudioIndex, index_path, text_digest
+from sentence_cache import SentenceCache
+from tts_api import DEFAULT_VOICE
+
+MANIFEST_NAME = ".text2voice_hotfolder.json"
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """通过 ctypes 调用 libc 的 inotify 接口"""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("当前系统不支持 inotify")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.paths = {}
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"无法监视目录 {path}")
+        self.paths[wd] = path
+        return wd
+
+    def read_events(self):
+        """读取当前所有事件，返回 [(目录, 事件掩码, 文件名)]"""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            position = 0
+            while position < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, position)
+                position += EVENT_HEADER.size
+                name = os.fsdecode(data[position:position + length].rstrip(b"\0"))
+                position += length
+                events.append((self.paths.get(wd), mask, name))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Manifest:
+    """目录中已完成转换的记录：{文件名: {"digest", "settings", "output"}}"""
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_done(self, name, digest, settings, output):
+        entry = self.entries.get(name)
+        return (entry is not None and entry["digest"] == digest and entry["settings"] == settings
+                and os.path.exists(output))
+
+    def record(self, name, digest, settings, output):
+        self.entries[name] = {"digest": digest, "settings": settings, "output": os.path.basename(output),
+                              "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        atomic_write(self.path, (json.dumps(self.entries, ensure_ascii=False, indent=2).encode('utf-8'),))
+
+
+class HotFolder:
+    def __init__(self, directories, voice=DEFAULT_VOICE, rate="+0%", volume="+0%", jobs=2,
+                 debounce=2.0, chunk_concurrency=3, poll_interval=None, cache=None):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.voice = voice
+        self.rate = rate
+        self.volume = volume
+        self.debounce = debounce
+        self.chunk_concurrency = chunk_concurrency
+        # 为 None 时使用 inotify，不可用时自动改为定时扫描
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self.manifests = {directory: Manifest(directory) for directory in self.directories}
+        self.converted = 0
+        self.failed = 0
+        self._jobs = asyncio.Semaphore(jobs)
+        self._timers = {}
+        self._active = set()
+        self._dirty = set()
+        self._tasks = set()
+        self._stopped = None
+
+    @property
+    def settings(self):
+        return {"voice": self.voice, "rate": self.rate, "volume": self.volume}
+
+    @staticmethod
+    def is_source(name):
+        return name.lower().endswith(".txt") and not name.startswith(".")
+
+    def schedule(self, path):
+        """文件每次变化都重新计时，静默 debounce 秒后才开始转换"""
+        loop = asyncio.get_running_loop()
+        timer = self._timers.pop(path, None)
+        if timer:
+            timer.cancel()
+        self._timers[path] = loop.call_later(self.debounce, self._start, path)
+
+    def _start(self, path):
+        self._timers.pop(path, None)
+        if path in self._active:
+            # 转换期间文件又被修改，完成后再转换一次
+            self._dirty.add(path)
+            return
+        task = asyncio.ensure_future(self.convert(path))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def convert(self, path):
+        directory, name = os.path.split(path)
+        output = os.path.splitext(path)[0] + ".mp3"
+        self._active.add(path)
+        try:
+            async with self._jobs:
+                try:
+                    with open(path, 'r', encoding='utf-8') as file:
+                        text = file.read()
+                except (OSError, UnicodeDecodeError) as e:
+                    print(f"无法读取 {path}: {str(e)}")
+                    return
+                digest = text_digest(text)
+                manifest = self.manifests[directory]
+                if not text.strip() or manifest.is_done(name, digest, self.settings, output):
+                    return
+
+                start = time.monotonic()
+                chunks = split_chunks(text)
+                try:
+                    results = await synthesize_scheduled(chunks, PlayheadScheduler(len(chunks)), self.voice,
+                                                         self.rate, self.volume, self.chunk_concurrency,
+                                                         cache=self.cache)
+                except Exception as e:
+                    self.failed += 1
+                    print(f"转换失败 {path}: {str(e)}")
+                    return
+                atomic_write(output, (result.audio for result in results))
+                AudioIndex.from_chunks(text, chunks, results).save(index_path(output))
+                manifest.record(name, digest, self.settings, output)
+                self.converted += 1
+                print(f"已转换 {path} -> {os.path.basename(output)}，用时 {time.monotonic() - start:.1f}s")
+        finally:
+            self._active.discard(path)
+            if path in self._dirty:
+                self._dirty.discard(path)
+                self.schedule(path)
+
+    def scan(self):
+        """检查所有目录中的文本文件，启动时补上停机期间新增或修改的文件"""
+        for directory in self.directories:
+            for name in sorted(os.listdir(directory)):
+                path = os.path.join(directory, name)
+                if self.is_source(name) and os.path.isfile(path):
+                    self.schedule(path)
+
+    def on_events(self, inotify):
+        for directory, mask, name in inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出时可能漏掉了文件，重新扫描
+                self.scan()
+            elif directory and self.is_source(name):
+                self.schedule(os.path.join(directory, name))
+
+    async def poll(self):
+        """不支持 inotify 时按修改时间和大小检测变化"""
+        seen = {}
+        while True:
+            for directory in self.directories:
+                for name in os.listdir(directory):
+                    path = os.path.join(directory, name)
+                    if not self.is_source(name):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if seen.get(path) != (stat.st_mtime_ns, stat.st_size):
+                        seen[path] = (stat.st_mtime_ns, stat.st_size)
+                        self.schedule(path)
+            await asyncio.sleep(self.poll_interval)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        inotify = None
+        poller = None
+        if self.poll_interval is None:
+            try:
+                inotify = Inotify()
+                for directory in self.directories:
+                    inotify.add_watch(directory)
+            except OSError as e:
+                print(f"inotify 不可用，改为定时扫描: {str(e)}")
+                inotify = None
+                self.poll_interval = self.debounce
+        if inotify:
+            loop.add_reader(inotify.fd, self.on_events, inotify)
+            self.scan()
+        else:
+            poller = asyncio.ensure_future(self.poll())
+
+        print(f"正在监视: {', '.join(self.directories)}")
+        try:
+            await self._stopped.wait()
+        finally:
+            if inotify:
+                loop.remove_reader(inotify.fd)
+                inotify.close()
+            if poller:
+                poller.cancel()
+            for timer in self._timers.values():
+                timer.cancel()
+            # 等待进行中的转换结束，不留下半成品
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stop(self):
+        if self._stopped:
+            self._stopped.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="监视目录并自动将新增的文本文件转换为语音")
+    parser.add_argument("directories", nargs="+", help="要监视的目录")
+    parser.add_argument("--voice", default=DEFAULT_VOICE)
+    parser.add_argument("--rate", default="+10%")
+    parser.add_argument("--volume", default="+70%")
+    parser.add_argument("--jobs", type=int, default=2, help="同时转换的文件数")
+    parser.add_argument("--concurrency", type=int, default=3, help="每个文件的并发请求数")
+    parser.add_argument("--debounce", type=float, default=2.0, help="文件停止变化多少秒后开始转换")
+    parser.add_argument("--poll", type=float, help="使用定时扫描代替 inotify（秒）")
+    parser.add_argument("--no-cache", action="store_true", help="不使用句子缓存")
+    args = parser.parse_args(argv)
+
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            parser.error(f"目录不存在: {directory}")
+
+    async def run():
+        folder = HotFolder(args.directories, args.voice, args.rate, args.volume, args.jobs, args.debounce,
+                           args.concurrency, args.poll, None if args.no_cache else SentenceCache())
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, folder.stop)
+            except NotImplementedError:
+                pass
+        await folder.run()
+        print(f"已停止，共转换 {folder.converted} 个文件，失败 {folder.failed} 个")
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+from bisect import bisect_left, bisect_right
+from PySide6.QtWidgets import QPlainTextEdit, QWidget
+from PySide6.QtCore import QRect, QSize
+from PySide6.QtGui import QColor, QPainter, QTextCursor
+
+# 超过该字符数时自动进入大文档模式
+LARGE_DOCUMENT_CHARS = 200_000
+
+
+class ChunkStatus:
+    PENDING = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+
+
+STATUS_COLORS = {
+    ChunkStatus.PENDING: QColor("#E5E5EA"),
+    ChunkStatus.RUNNING: QColor("#FF9F0A"),
+    ChunkStatus.DONE: QColor("#30D158"),
+    ChunkStatus.FAILED: QColor("#FF3B30"),
+}
+
+
+class ChunkStatusArea(QWidget):
+    """编辑器左侧的分块状态栏"""
+
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+
+    def sizeHint(self):
+        return QSize(self.editor.status_area_width(), 0)
+
+    def paintEvent(self, event):
+        self.editor.paint_status_area(event)
+
+
+class ChunkEditor(QPlainTextEdit):
+    """基于 QPlainTextEdit 的纯文本编辑器
+
+    QPlainTextEdit 按文本块惰性排版，只绘制可见区域，内存和重绘开销与文档大小无关。
+    大文档模式下在左侧显示每个分块的合成状态，并在正文中标出分块和句子边界；
+    所有绘制都只遍历可见范围内的边界。
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.large_mode = False
+        self.auto_large_mode = True
+        self.chunk_starts = []
+        self.chunk_ends = []
+        self.chunk_status = []
+        self.sentence_ends = []
+
+        self.status_area = ChunkStatusArea(self)
+        self.status_area.hide()
+        self.updateRequest.connect(self.on_update_request)
+        self.textChanged.connect(self.check_document_size)
+
+    def set_large_mode(self, enabled):
+        if enabled == self.large_mode:
+            return
+        self.large_mode = enabled
+        self.status_area.setVisible(enabled)
+        # 大文档的撤销栈会占用与文档同量级的内存
+        self.setUndoRedoEnabled(not enabled)
+        self.setViewportMargins(self.status_area_width(), 0, 0, 0)
+        self.update_status_area_geometry()
+        self.viewport().update()
+
+    def check_document_size(self):
+        if self.auto_large_mode:
+            self.set_large_mode(self.document().characterCount() > LARGE_DOCUMENT_CHARS)
+
+    def set_chunks(self, chunk_spans, sentence_ends=()):
+        """设置分块区间 [(start, end)] 和句子结束位置，全部标记为待合成"""
+        self.chunk_starts = [start for start, _ in chunk_spans]
+        self.chunk_ends = [end for _, end in chunk_spans]
+        self.chunk_status = [ChunkStatus.PENDING] * len(chunk_spans)
+        self.sentence_ends = list(sentence_ends)
+        self.status_area.update()
+        self.viewport().update()
+
+    def clear_chunks(self):
+        if self.chunk_starts or self.sentence_ends:
+            self.set_chunks([])
+
+    def set_chunk_status(self, index, status):
+        if 0 <= index < len(self.chunk_status) and self.chunk_status[index] != status:
+            self.chunk_status[index] = status
+            if self.large_mode:
+                self.status_area.update()
+
+    def mark_running_failed(self):
+        """转换失败时，把仍在合成的分块标记为失败"""
+        self.chunk_status = [ChunkStatus.FAILED if status == ChunkStatus.RUNNING else status
+                             for status in self.chunk_status]
+        self.status_area.update()
+
+    def status_area_width(self):
+        return 8 if self.large_mode else 0
+
+    def on_update_request(self, rect, dy):
+        if dy:
+            self.status_area.scroll(0, dy)
+        else:
+            self.status_area.update(0, rect.y(), self.status_area.width(), rect.height())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_status_area_geometry()
+
+    def update_status_area_geometry(self):
+        rect = self.contentsRect()
+        self.status_area.setGeometry(QRect(rect.left(), rect.top(), self.status_area_width(), rect.height()))
+
+    def visible_blocks(self):
+        """依次返回可见文本块及其在视口中的顶部坐标"""
+        block = self.firstVisibleBlock()
+        top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
+        height = self.viewport().height()
+        while block.isValid() and top <= height:
+            if block.isVisible():
+                yield block, top
+            top += self.blockBoundingRect(block).height()
+            block = block.next()
+
+    def line_y(self, block, top, position):
+        """文本位置所在行的顶部和底部坐标"""
+        line = block.layout().lineForTextPosition(position - block.position())
+        if not line.isValid():
+            return top, top + self.blockBoundingRect(block).height()
+        return top + line.y(), top + line.y() + line.height()
+
+    def paint_status_area(self, event):
+        painter = QPainter(self.status_area)
+        painter.fillRect(event.rect(), QColor("#F5F5F7"))
+        if not self.chunk_starts:
+            return
+        width = self.status_area.width()
+        for block, top in self.visible_blocks():
+            block_start = block.position()
+            block_end = block_start + block.length()
+            first = max(bisect_right(self.chunk_starts, block_start) - 1, 0)
+            last = bisect_left(self.chunk_starts, block_end)
+            for index in range(first, last):
+                start = max(self.chunk_starts[index], block_start)
+                end = min(self.chunk_ends[index], block_end - 1)
+                if end < start:
+                    continue
+                y1, _ = self.line_y(block, top, start)
+                _, y2 = self.line_y(block, top, max(end - 1, start))
+                painter.fillRect(1, int(y1) + 1, width - 2, max(int(y2 - y1) - 2, 1),
+                                 STATUS_COLORS[self.chunk_status[index]])
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.large_mode or not (self.chunk_starts or self.sentence_ends):
+            return
+        blocks = list(self.visible_blocks())
+        if not blocks:
+            return
+        first = blocks[0][0].position()
+        last_block = blocks[-1][0]
+        last = last_block.position() + last_block.length()
+
+        painter = QPainter(self.viewport())
+        cursor = QTextCursor(self.document())
+        # 句子结束处画浅色竖线，分块起点画蓝色竖线
+        for positions, color, height in ((self.sentence_ends, QColor(0, 0, 0, 50), 0.5),
+                                         (self.chunk_starts, QColor("#0A84FF"), 1.0)):
+            painter.setPen(color)
+            for i in range(bisect_left(positions, first), bisect_right(positions, last)):
+                cursor.setPosition(min(positions[i], self.document().characterCount() - 1))
+                rect = self.cursorRect(cursor)
+                bottom = rect.bottom()
+                painter.drawLine(rect.left(), int(bottom - rect.height() * height), rect.left(), bottom)
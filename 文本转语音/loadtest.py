@@ -0,0 +1,324 @@
+"""合成链路压力测试
+
+模拟 N 个客户端同时转换文本：按接近实际的长度分布和语音组合生成任务，经分块、调度、合成到拼接的完整链路，
+后端使用本地替身（可配置延迟、吞吐和错误率）。统计吞吐、延迟与首段音频耗时的分位数、错误率，
+以及运行期间的内存和事件循环延迟，结果保存为 JSON，可与历史结果对比。
+
+    python loadtest.py --clients 1 4 16 64 --duration 30 --latency 0.3 --output after.json --compare before.json
+
+加上 --server 时经由连接池和本地 websocket 替身服务合成，同时测量连接复用的开销；
+加上 --replay 时改为按比例回放录制的线上会话（见 session_replay.py），复现真实的首包延迟和传输停顿。
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import tracemalloc
+import tts_core
+from tts_core import split_chunks, synthesize_scheduled
+from chunk_scheduler import PlayheadScheduler
+from fake_backend import FakeBackend, FakeServer
+from benchmark import SAMPLE_SENTENCES
+from fair_scheduler import percentile
+from session_replay import ReplayBackend
+
+# 任务组合：(名称, 权重, 最短字符数, 最长字符数)
+DEFAULT_MIX = [
+    ("prompt", 0.6, 10, 60),
+    ("paragraph", 0.3, 200, 1500),
+    ("document", 0.1, 5000, 20000),
+]
+DEFAULT_VOICES = ["zh-CN-XiaoxiaoNeural", "zh-CN-YunxiNeural", "zh-CN-YunyangNeural", "zh-CN-XiaoyiNeural"]
+
+
+def load_mix(path):
+    """读取任务组合：[{"name", "weight", "min_chars", "max_chars"}]"""
+    with open(path, 'r', encoding='utf-8') as file:
+        return [(item["name"], item["weight"], item["min_chars"], item["max_chars"]) for item in json.load(file)]
+
+
+def rss_mb():
+    """当前进程的常驻内存（MB），不支持的平台返回 None"""
+    try:
+        with open("/proc/self/statm", 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class Workload:
+    """按组合权重生成确定性的任务序列，同一 seed 每次运行的任务相同"""
+
+    def __init__(self, mix=None, voices=None, seed=0):
+        self.mix = mix or DEFAULT_MIX
+        self.voices = voices or DEFAULT_VOICES
+        self.seed = seed
+
+    def jobs(self, client):
+        """第 client 个客户端的任务迭代器，产出 (类别, 语音, 文本)"""
+        rng = random.Random(f"{self.seed}:{client}")
+        weights = [weight for _, weight, _, _ in self.mix]
+        while True:
+            name, _, min_chars, max_chars = rng.choices(self.mix, weights)[0]
+            length = rng.randint(min_chars, max_chars)
+            parts = []
+            size = 0
+            while size < length:
+                sentence = rng.choice(SAMPLE_SENTENCES)
+                parts.append(sentence)
+                size += len(sentence)
+            yield name, rng.choice(self.voices), "".join(parts)[:length]
+
+
+class RequestRecord:
+    def __init__(self, client, category, voice, chars):
+        self.client = client
+        self.category = category
+        self.voice = voice
+        self.chars = chars
+        self.latency = None
+        # 从提交到收到第一个分块的首段音频数据
+        self.first_audio = None
+        self.audio_bytes = 0
+        self.error = None
+
+
+class LoadRun:
+    """以固定客户端数运行一轮压力测试"""
+
+    def __init__(self, clients, workload, duration=30, requests_per_client=None, chunk_concurrency=3,
+                 max_retries=3, retry_delay=1, think_time=0, sample_interval=0.5):
+        self.clients = clients
+        self.workload = workload
+        self.duration = duration
+        self.requests_per_client = requests_per_client
+        self.chunk_concurrency = chunk_concurrency
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.think_time = think_time
+        self.sample_interval = sample_interval
+        self.records = []
+        self.samples = []
+        self.in_flight = 0
+        self._deadline = None
+
+    async def run(self):
+        start = time.perf_counter()
+        self._deadline = start + self.duration
+        sampler = asyncio.ensure_future(self._sample(start))
+        try:
+            await asyncio.gather(*(self._client(i) for i in range(self.clients)))
+        finally:
+            sampler.cancel()
+        return self.report(time.perf_counter() - start)
+
+    async def _client(self, index):
+        jobs = self.workload.jobs(index)
+        count = 0
+        while time.perf_counter() < self._deadline:
+            if self.requests_per_client is not None and count >= self.requests_per_client:
+                return
+            category, voice, text = next(jobs)
+            self.records.append(await self._request(index, category, voice, text))
+            count += 1
+            if self.think_time:
+                await asyncio.sleep(self.think_time)
+
+    async def _request(self, client, category, voice, text):
+        record = RequestRecord(client, category, voice, len(text))
+        start = time.perf_counter()
+
+        def on_audio(index, size):
+            if index == 0 and record.first_audio is None:
+                record.first_audio = time.perf_counter() - start
+
+        self.in_flight += 1
+        try:
+            chunks = split_chunks(text)
+            results = await synthesize_scheduled(
+                chunks, PlayheadScheduler(len(chunks)), voice, "+0%", "+0%",
+                concurrency=self.chunk_concurrency, max_retries=self.max_retries,
+                retry_delay=self.retry_delay, on_audio=on_audio)
+            record.audio_bytes = len(b"".join(result.audio for result in results))
+        except Exception as e:
+            record.error = str(e)
+        finally:
+            self.in_flight -= 1
+        record.latency = time.perf_counter() - start
+        return record
+
+    async def _sample(self, start):
+        """定时记录内存、进行中的请求数和事件循环延迟"""
+        while True:
+            expected = time.perf_counter() + self.sample_interval
+            await asyncio.sleep(self.sample_interval)
+            now = time.perf_counter()
+            self.samples.append({
+                "t": round(now - start, 3),
+                "rss_mb": rss_mb(),
+                "traced_mb": tracemalloc.get_traced_memory()[0] / 1e6 if tracemalloc.is_tracing() else None,
+                "in_flight": self.in_flight,
+                "completed": len(self.records),
+                "loop_lag_ms": max(now - expected, 0) * 1000,
+            })
+
+    def report(self, elapsed):
+        done = [record for record in self.records if record.error is None]
+        latencies = [record.latency for record in done]
+        first_audio = [record.first_audio for record in done if record.first_audio is not None]
+        categories = {}
+        for category in sorted({record.category for record in self.records}):
+            records = [record for record in done if record.category == category]
+            categories[category] = {
+                "requests": sum(1 for record in self.records if record.category == category),
+                "latency_p50_s": percentile([record.latency for record in records], 0.5),
+                "latency_p95_s": percentile([record.latency for record in records], 0.95),
+            }
+        memory = [sample["rss_mb"] for sample in self.samples if sample["rss_mb"] is not None]
+        return {
+            "clients": self.clients,
+            "elapsed_s": elapsed,
+            "requests": len(self.records),
+            "errors": len(self.records) - len(done),
+            "error_rate": (len(self.records) - len(done)) / len(self.records) if self.records else 0,
+            "requests_per_s": len(done) / elapsed if elapsed else 0,
+            "chars_per_s": sum(record.chars for record in done) / elapsed if elapsed else 0,
+            "audio_mb_per_s": sum(record.audio_bytes for record in done) / 1e6 / elapsed if elapsed else 0,
+            "latency_p50_s": percentile(latencies, 0.5),
+            "latency_p95_s": percentile(latencies, 0.95),
+            "latency_p99_s": percentile(latencies, 0.99),
+            "first_audio_p50_s": percentile(first_audio, 0.5),
+            "first_audio_p95_s": percentile(first_audio, 0.95),
+            "first_audio_p99_s": percentile(first_audio, 0.99),
+            "rss_start_mb": memory[0] if memory else None,
+            "rss_peak_mb": max(memory) if memory else None,
+            "rss_end_mb": memory[-1] if memory else None,
+            "loop_lag_max_ms": max((sample["loop_lag_ms"] for sample in self.samples), default=None),
+            "categories": categories,
+            "samples": self.samples,
+        }
+
+
+async def run_levels(levels, workload, backend, server=False, pool_size=None, **options):
+    """依次以每个客户端数运行一轮，返回各轮的报告"""
+    fake_server = pool = None
+    if server:
+        from connection_pool import ConnectionPool
+        fake_server = FakeServer(backend)
+        url = await fake_server.start()
+        pool = ConnectionPool(url, size=pool_size or max(levels) * options.get("chunk_concurrency", 3))
+        tts_core.set_backend(pool.communicate)
+    else:
+        tts_core.set_backend(backend)
+    results = []
+    try:
+        for clients in levels:
+            requests_before, errors_before = backend.requests, backend.errors
+            result = await LoadRun(clients, workload, **options).run()
+            result["backend_requests"] = backend.requests - requests_before
+            result["injected_errors"] = backend.errors - errors_before
+            results.append(result)
+            print(f"{clients:>4} 个客户端: {result['requests']} 个请求，{result['requests_per_s']:.2f} 请求/秒，"
+                  f"延迟 p50/p95/p99 {format_seconds(result['latency_p50_s'])}/"
+                  f"{format_seconds(result['latency_p95_s'])}/{format_seconds(result['latency_p99_s'])}，"
+                  f"首段音频 p95 {format_seconds(result['first_audio_p95_s'])}，"
+                  f"错误率 {result['error_rate']:.1%}，内存峰值 {format_mb(result['rss_peak_mb'])}")
+    finally:
+        tts_core.set_backend(None)
+        if pool:
+            await pool.close()
+        if fake_server:
+            await fake_server.stop()
+    return results
+
+
+def format_seconds(value):
+    return "-" if value is None else f"{value:.3f}s"
+
+
+def format_mb(value):
+    return "-" if value is None else f"{value:.1f} MB"
+
+
+def compare(baseline_path, results):
+    """与历史结果中相同客户端数的一轮对比，打印各指标的变化比例"""
+    with open(baseline_path, 'r', encoding='utf-8') as file:
+        baseline = {item["clients"]: item for item in json.load(file)["results"]}
+    keys = ("requests_per_s", "latency_p50_s", "latency_p95_s", "latency_p99_s",
+            "first_audio_p95_s", "error_rate", "rss_peak_mb")
+    for item in results:
+        old = baseline.get(item["clients"])
+        if not old:
+            continue
+        changes = []
+        for key in keys:
+            if old.get(key) and item.get(key) is not None:
+                changes.append(f"{key} {(item[key] - old[key]) / old[key]:+.1%}")
+        print(f"{item['clients']:>4} 个客户端: " + "，".join(changes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="合成链路压力测试（使用本地替身后端）")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16], help="同时转换的客户端数，可给出多个")
+    parser.add_argument("--duration", type=float, default=30, help="每轮持续时间（秒）")
+    parser.add_argument("--requests", type=int, help="每个客户端最多发出的请求数")
+    parser.add_argument("--think-time", type=float, default=0, help="客户端两次请求之间的间隔（秒）")
+    parser.add_argument("--mix", help="任务组合 JSON 文件")
+    parser.add_argument("--voices", nargs="+", default=DEFAULT_VOICES)
+    parser.add_argument("--concurrency", type=int, default=3, help="每个请求的并发分块数")
+    parser.add_argument("--retry-delay", type=float, default=1)
+    parser.add_argument("--latency", type=float, default=0.3, help="替身首包延迟（秒）")
+    parser.add_argument("--throughput", type=float, default=0, help="替身下发速率（字节/秒），0 不限速")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="请求失败概率")
+    parser.add_argument("--ms-per-char", type=float, default=200, help="每个字符生成的音频时长（毫秒）")
+    parser.add_argument("--replay", help="回放录制的会话文件，代替替身后端")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="回放速度倍数，0 为不等待")
+    parser.add_argument("--server", action="store_true", help="经由连接池和本地 websocket 替身服务合成")
+    parser.add_argument("--pool-size", type=int, help="连接池大小，默认为最大客户端数 × 并发分块数")
+    parser.add_argument("--tracemalloc", action="store_true", help="同时记录 Python 分配的内存（会降低吞吐）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadtest.json", help="结果保存路径")
+    parser.add_argument("--compare", help="用于对比的历史结果文件")
+    args = parser.parse_args(argv)
+    if args.replay and args.server:
+        parser.error("--replay 不能与 --server 同时使用")
+
+    if args.replay:
+        backend = ReplayBackend(args.replay, args.replay_speed)
+    else:
+        backend = FakeBackend(latency=args.latency, throughput=args.throughput, error_rate=args.error_rate,
+                              ms_per_char=args.ms_per_char, seed=args.seed)
+    workload = Workload(load_mix(args.mix) if args.mix else None, args.voices, args.seed)
+    if args.tracemalloc:
+        tracemalloc.start()
+    try:
+        results = asyncio.run(run_levels(
+            args.clients, workload, backend, args.server, args.pool_size, duration=args.duration,
+            requests_per_client=args.requests, chunk_concurrency=args.concurrency,
+            retry_delay=args.retry_delay, think_time=args.think_time))
+    finally:
+        if args.tracemalloc:
+            tracemalloc.stop()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {os.path.abspath(args.output)}")
+
+    if args.compare:
+        compare(args.compare, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
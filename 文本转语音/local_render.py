@@ -0,0 +1,246 @@
+"""本地重新渲染语速和音量
+
+转换完成后只调整语速或音量时，保留已有的 MP3 数据，每次渲染时分块解码，
+用向量化的相位声码器变速（不变调）并调整增益后逐块重新编码，无需再次联网合成。
+内存占用只取决于块大小，与音频总长无关，整本书也可以在本地调整。
+变化超出质量容差时返回 False，由调用方改为重新合成。
+
+依赖 numpy 和 soundfile（libsndfile 1.1 以上才支持 MP3），未安装时本地渲染不可用。
+"""
+import io
+try:
+    import numpy as np
+    import soundfile
+    AVAILABLE = "MP3" in soundfile.available_formats()
+except (ImportError, OSError):
+    AVAILABLE = False
+
+from audio_index import AudioIndex, text_digest
+
+# 变速比例超过该范围时相位声码器的音质下降明显，改为重新合成
+MAX_TEMPO_FACTOR = 1.25
+# 增益下限（约 -40 dB），以及放大时允许的最大峰值
+MIN_GAIN = 0.01
+MAX_PEAK = 0.99
+
+N_FFT = 1024
+HOP = N_FFT // 4
+# 每次解码和变速处理的采样数（24kHz 下约 11 秒）
+BLOCK_SAMPLES = HOP * 1024
+
+
+def parse_percent(value):
+    """"+10%" 或 10 转为数值 10"""
+    if isinstance(value, str):
+        return float(value.strip().rstrip("%") or 0)
+    return float(value)
+
+
+def decode_mp3(audio):
+    """解码为 float32 单声道采样，返回 (采样, 采样率)"""
+    samples, samplerate = soundfile.read(io.BytesIO(audio), dtype='float32', always_2d=True)
+    return samples.mean(axis=1), samplerate
+
+
+def encode_mp3(samples, samplerate):
+    buffer = io.BytesIO()
+    soundfile.write(buffer, samples, samplerate, format='MP3')
+    return buffer.getvalue()
+
+
+def decode_blocks(audio, block_samples=BLOCK_SAMPLES):
+    """逐块解码为 float32 单声道采样，返回 (采样率, 采样块迭代器)"""
+    file = soundfile.SoundFile(io.BytesIO(audio))
+
+    def blocks():
+        with file:
+            for block in file.blocks(blocksize=block_samples, dtype='float32', always_2d=True):
+                yield block.mean(axis=1)
+    return file.samplerate, blocks()
+
+
+class TimeStretcher:
+    """分块进行的相位声码器变速不变调，factor > 1 时变快
+
+    feed() 接收任意长度的采样块，返回已经可以确定的输出；finish() 返回剩余输出。
+    只保留当前块和帧重叠部分的数据，结果与一次处理整段音频相同。
+    """
+
+    def __init__(self, factor):
+        self.factor = factor
+        self.bypass = abs(factor - 1) < 1e-3
+        self.window = np.hanning(N_FFT).astype(np.float32)
+        self.squared = self.window ** 2
+        self.expected = 2 * np.pi * HOP / N_FFT * np.arange(N_FFT // 2 + 1)
+        # 输入：开头补 N_FFT/2 个零，buffer[0] 对应第 first_frame 帧的起点
+        self.buffer = np.zeros(N_FFT // 2, dtype=np.float32)
+        self.first_frame = 0
+        self.received = 0
+        # 下一个输出帧的序号及其相位
+        self.step = 0
+        self.phase = None
+        # 输出：尚未确定的重叠相加结果，pending[0] 对应第 output_start 个输出采样
+        self.pending = np.zeros(N_FFT, dtype=np.float32)
+        self.norm = np.zeros(N_FFT, dtype=np.float32)
+        self.output_start = 0
+        self.emitted = 0
+
+    def feed(self, samples):
+        self.received += len(samples)
+        if self.bypass:
+            return samples
+        self.buffer = np.concatenate([self.buffer, samples.astype(np.float32, copy=False)])
+        # 已经能取到完整数据的帧数
+        available = self.first_frame + max((len(self.buffer) - N_FFT) // HOP + 1, 0)
+        return self._process(available - 1, None)
+
+    def finish(self):
+        if self.bypass:
+            return np.zeros(0, dtype=np.float32)
+        self.buffer = np.concatenate([self.buffer, np.zeros(N_FFT // 2 + HOP, dtype=np.float32)])
+        count = self.first_frame + (len(self.buffer) - N_FFT) // HOP + 1
+        length = int(round(self.received / self.factor))
+        return self._process(count - 1, length)
+
+    def _process(self, limit, length):
+        """合成所有插值位置小于 limit 的输出帧；length 不为 None 时为最后一次，输出剩余全部采样"""
+        steps = np.arange(self.step, int(np.ceil(limit / self.factor)) + 1) * self.factor
+        steps = steps[steps < limit]
+        if len(steps):
+            self._synthesize(steps)
+        if length is None:
+            # 第 step 帧之前的采样不会再有帧叠加上来
+            ready = self.step * HOP - self.output_start
+        else:
+            ready = len(self.pending)
+        return self._emit(ready, length)
+
+    def _synthesize(self, steps):
+        base = steps.astype(int)
+        fraction = (steps - base)[:, None].astype(np.float32)
+        low = base[0]
+        high = base[-1] + 1
+        start = (low - self.first_frame) * HOP
+        segment = self.buffer[start:start + (high - low) * HOP + N_FFT]
+        frames = np.lib.stride_tricks.as_strided(
+            segment, shape=(high - low + 1, N_FFT), strides=(segment.strides[0] * HOP, segment.strides[0]))
+        spectrum = np.fft.rfft(frames * self.window, axis=1)
+        magnitude = np.abs(spectrum).astype(np.float32)
+        # 相位用双精度累加，分块处理时结果不受块边界影响
+        phase = np.angle(spectrum).astype(np.float64)
+        index = base - low
+        stretched_magnitude = (1 - fraction) * magnitude[index] + fraction * magnitude[index + 1]
+
+        # 每帧的相位增量减去各频点的期望增量后折回 [-π, π]，再累加得到新的相位
+        delta = phase[index + 1] - phase[index] - self.expected
+        delta -= 2 * np.pi * np.round(delta / (2 * np.pi))
+        if self.phase is None:
+            self.phase = phase[0]
+        increments = np.cumsum(delta + self.expected, axis=0)
+        accumulated = np.concatenate([self.phase[None], self.phase + increments[:-1]])
+        self.phase = np.mod(self.phase + increments[-1], 2 * np.pi)
+
+        output = np.fft.irfft(stretched_magnitude * (np.cos(accumulated) + 1j * np.sin(accumulated)),
+                              n=N_FFT, axis=1).astype(np.float32) * self.window
+        self._overlap_add(output)
+
+        self.step += len(steps)
+        # 丢弃之后的帧不再用到的输入
+        drop = int(self.step * self.factor) - self.first_frame
+        if drop > 0:
+            self.buffer = self.buffer[drop * HOP:]
+            self.first_frame += drop
+
+    def _overlap_add(self, frames):
+        """帧移整除帧长，按相位分组后用 reshape 一次累加"""
+        count = len(frames)
+        offset = (self.step * HOP) - self.output_start
+        size = offset + (count + N_FFT // HOP) * HOP
+        if size > len(self.pending):
+            self.pending = np.concatenate([self.pending, np.zeros(size - len(self.pending), dtype=np.float32)])
+            self.norm = np.concatenate([self.norm, np.zeros(size - len(self.norm), dtype=np.float32)])
+        for part in range(N_FFT // HOP):
+            # 第 part 段：各帧的 [part*HOP, (part+1)*HOP) 依次落在输出的第 i+part 个帧移上
+            section = slice(part * HOP, (part + 1) * HOP)
+            target = slice(offset + part * HOP, offset + (part + count) * HOP)
+            self.pending[target] += frames[:, section].reshape(-1)
+            self.norm[target] += np.tile(self.squared[section], count)
+
+    def _emit(self, ready, length):
+        ready = max(ready, 0)
+        output = self.pending[:ready] / np.maximum(self.norm[:ready], 1e-6)
+        self.pending = self.pending[ready:]
+        self.norm = self.norm[ready:]
+        start = self.output_start
+        self.output_start += ready
+        # 输出的开头 N_FFT/2 个采样对应输入开头补的零
+        output = output[max(N_FFT // 2 - start, 0):]
+        if length is not None:
+            output = output[:max(length - self.emitted, 0)]
+            if len(output) < length - self.emitted:
+                output = np.concatenate([output, np.zeros(length - self.emitted - len(output), dtype=np.float32)])
+        self.emitted += len(output)
+        return output
+
+
+def time_stretch(samples, factor):
+    """相位声码器变速不变调，factor > 1 时变快"""
+    stretcher = TimeStretcher(factor)
+    return np.concatenate([stretcher.feed(samples), stretcher.finish()])
+
+
+class LocalRenderer:
+    """以某次合成结果为原始素材，按新的语速和音量重新渲染
+
+    始终从原始合成的 MP3 出发，多次调整不会累积失真。
+    """
+
+    def __init__(self, text, voice, rate, volume, audio, audio_index=None):
+        if not AVAILABLE:
+            raise RuntimeError("本地渲染需要安装 numpy 和 soundfile")
+        self.text_hash = text_digest(text)
+        self.voice = voice
+        self.rate = parse_percent(rate)
+        self.volume = parse_percent(volume)
+        self.audio_index = audio_index
+        self.audio = audio
+        self.samplerate, blocks = decode_blocks(audio)
+        self.peak = max((float(np.abs(block).max()) for block in blocks if len(block)), default=0.0)
+
+    def matches(self, text, voice):
+        return voice == self.voice and text_digest(text) == self.text_hash
+
+    def tempo_factor(self, rate):
+        return (100 + parse_percent(rate)) / (100 + self.rate)
+
+    def gain(self, volume):
+        return max(100 + parse_percent(volume), 0) / max(100 + self.volume, 1)
+
+    def can_render(self, rate, volume):
+        """变化是否在本地渲染的质量容差内"""
+        tempo = self.tempo_factor(rate)
+        gain = self.gain(volume)
+        return (1 / MAX_TEMPO_FACTOR <= tempo <= MAX_TEMPO_FACTOR and gain >= MIN_GAIN
+                and self.peak * gain <= MAX_PEAK)
+
+    def render(self, rate, volume, is_cancelled=None):
+        """返回 (MP3 数据, 按新语速缩放的 AudioIndex 或 None)；is_cancelled() 为真时返回 (None, None)"""
+        tempo = self.tempo_factor(rate)
+        gain = np.float32(self.gain(volume))
+        stretcher = TimeStretcher(tempo)
+        buffer = io.BytesIO()
+        _, blocks = decode_blocks(self.audio)
+        with soundfile.SoundFile(buffer, 'w', self.samplerate, 1, format='MP3') as output:
+            for block in blocks:
+                if is_cancelled and is_cancelled():
+                    return None, None
+                output.write(np.clip(stretcher.feed(block) * gain, -1, 1))
+            output.write(np.clip(stretcher.finish() * gain, -1, 1))
+        audio = buffer.getvalue()
+
+        index = None
+        if self.audio_index:
+            old = self.audio_index
+            index = AudioIndex(list(zip(old.offsets, [ms / tempo for ms in old.times])),
+                               old.text_length, old.text_hash)
+        return audio, index
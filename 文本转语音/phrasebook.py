@@ -0,0 +1,204 @@
+"""固定提示语音频包
+
+把一组固定提示语预先合成后打包成一个带索引的只读文件，运行时用 mmap 映射，
+查找只需一次哈希和二分查找，返回的音频是映射区上的 memoryview，不复制数据。
+
+文件布局（小端）：
+    文件头   MAGIC, 版本, 条目数, 合成参数 JSON 长度, 合成参数 JSON
+    哈希表   条目数 × u64，按键的哈希升序排列
+    记录表   条目数 × (键偏移 u64, 键长度 u32, 音频偏移 u64, 音频长度 u32)
+    键数据   UTF-8 编码的提示语
+    音频数据 各提示语的 MP3，依次拼接
+
+    python phrasebook.py build prompts.txt -o phrasebook.t2vp
+    python phrasebook.py get phrasebook.t2vp "请按1号键" -o prompt.mp3
+"""
+import os
+import sys
+import mmap
+import json
+import struct
+import asyncio
+import hashlib
+import argparse
+from bisect import bisect_left
+from tts_core import atomic_write
+from tts_api import DEFAULT_VOICE, synthesize_many_async
+
+MAGIC = b"T2VPHRB\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sIII")
+RECORD = struct.Struct("<QIQI")
+DEFAULT_NAME = "phrasebook.t2vp"
+
+
+def normalize(prompt):
+    return prompt.strip()
+
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+
+def resource_path(name):
+    """随程序发布的只读资源路径；PyInstaller 打包后位于解压目录 sys._MEIPASS 中"""
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, name)
+
+
+def write_phrasebook(path, entries, settings=None):
+    """把 [(提示语, MP3 数据)] 写成音频包，先写临时文件再替换"""
+    items = {}
+    for prompt, audio in entries:
+        items[normalize(prompt).encode('utf-8')] = audio
+    keys = sorted(items, key=key_hash)
+    settings_data = json.dumps(settings or {}, ensure_ascii=False).encode('utf-8')
+
+    hashes_offset = HEADER.size + len(settings_data)
+    records_offset = hashes_offset + 8 * len(keys)
+    keys_offset = records_offset + RECORD.size * len(keys)
+    audio_offset = keys_offset + sum(len(key) for key in keys)
+
+    def parts():
+        yield HEADER.pack(MAGIC, VERSION, len(keys), len(settings_data))
+        yield settings_data
+        yield struct.pack(f"<{len(keys)}Q", *(key_hash(key) for key in keys))
+        key_position = keys_offset
+        audio_position = audio_offset
+        for key in keys:
+            yield RECORD.pack(key_position, len(key), audio_position, len(items[key]))
+            key_position += len(key)
+            audio_position += len(items[key])
+        yield from keys
+        for key in keys:
+            yield items[key]
+
+    atomic_write(path, parts())
+    return len(keys)
+
+
+class Phrasebook:
+    """只读的提示语音频包
+
+    get() 返回映射区上的 memoryview，在 close() 之前需要释放这些 memoryview（或复制为 bytes）。
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._hashes = None
+        magic, version, count, settings_length = HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"不是有效的提示语音频包: {path}")
+        self.count = count
+        self.settings = json.loads(bytes(self._view[HEADER.size:HEADER.size + settings_length]) or b"{}")
+        hashes_offset = HEADER.size + settings_length
+        self._hashes = self._view[hashes_offset:hashes_offset + 8 * count].cast('Q')
+        self._records_offset = hashes_offset + 8 * count
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, prompt):
+        return self._find(normalize(prompt).encode('utf-8')) is not None
+
+    def _record(self, i):
+        return RECORD.unpack_from(self._view, self._records_offset + i * RECORD.size)
+
+    def _find(self, key):
+        target = key_hash(key)
+        i = bisect_left(self._hashes, target)
+        # 哈希相同的条目相邻，逐个比较键
+        while i < self.count and self._hashes[i] == target:
+            key_offset, key_length, audio_offset, audio_length = self._record(i)
+            if self._view[key_offset:key_offset + key_length] == key:
+                return audio_offset, audio_length
+            i += 1
+        return None
+
+    def get(self, prompt):
+        """返回提示语的 MP3 数据（memoryview），不存在时返回 None"""
+        found = self._find(normalize(prompt).encode('utf-8'))
+        if found is None:
+            return None
+        offset, length = found
+        return self._view[offset:offset + length]
+
+    def prompts(self):
+        for i in range(self.count):
+            key_offset, key_length, _, _ = self._record(i)
+            yield bytes(self._view[key_offset:key_offset + key_length]).decode('utf-8')
+
+    def close(self):
+        if self._mmap is None:
+            return
+        if self._hashes is not None:
+            self._hashes.release()
+        self._view.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+async def build(prompts, path, voice=DEFAULT_VOICE, rate="+0%", volume="+0%", concurrency=8, cache=None):
+    """合成全部提示语并写成音频包，返回条目数"""
+    prompts = list(dict.fromkeys(normalize(prompt) for prompt in prompts if prompt.strip()))
+    audios = await synthesize_many_async(prompts, voice, rate, volume, concurrency=concurrency, cache=cache)
+    settings = {"voice": voice, "rate": rate, "volume": volume}
+    return write_phrasebook(path, zip(prompts, audios), settings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="固定提示语音频包")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="合成提示语列表（每行一条）并打包")
+    build_parser.add_argument("prompts", help="提示语文本文件")
+    build_parser.add_argument("-o", "--output", default=DEFAULT_NAME)
+    build_parser.add_argument("--voice", default=DEFAULT_VOICE)
+    build_parser.add_argument("--rate", default="+0%")
+    build_parser.add_argument("--volume", default="+0%")
+    build_parser.add_argument("--concurrency", type=int, default=8)
+
+    get_parser = commands.add_parser("get", help="导出一条提示语的音频")
+    get_parser.add_argument("phrasebook")
+    get_parser.add_argument("prompt")
+    get_parser.add_argument("-o", "--output", default="prompt.mp3")
+
+    list_parser = commands.add_parser("list", help="列出音频包中的提示语")
+    list_parser.add_argument("phrasebook")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        with open(args.prompts, 'r', encoding='utf-8') as file:
+            prompts = file.read().splitlines()
+        count = asyncio.run(build(prompts, args.output, args.voice, args.rate, args.volume, args.concurrency))
+        print(f"已打包 {count} 条提示语，保存到 {args.output}")
+        return 0
+
+    with Phrasebook(args.phrasebook) as book:
+        if args.command == "list":
+            for prompt in book.prompts():
+                print(prompt)
+            return 0
+        audio = book.get(args.prompt)
+        if audio is None:
+            print(f"音频包中没有该提示语: {args.prompt}")
+            return 1
+        with open(args.output, 'wb') as file:
+            file.write(audio)
+        audio.release()
+    print(f"已导出到 {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+import time
+import threading
+from tts_core import BYTES_PER_MS
+
+
+class ProgressSnapshot:
+    def __init__(self, chunks_done, chunks_total, bytes_received, audio_s, bytes_per_s, elapsed_s, idle_s):
+        self.chunks_done = chunks_done
+        self.chunks_total = chunks_total
+        self.bytes_received = bytes_received
+        # 已完成分块的音频时长
+        self.audio_s = audio_s
+        # 最近一段时间的接收速度
+        self.bytes_per_s = bytes_per_s
+        self.elapsed_s = elapsed_s
+        # 距上次收到音频数据的时间，持续增大说明任务可能卡住
+        self.idle_s = idle_s
+
+    @property
+    def realtime_factor(self):
+        """每秒合成的音频秒数"""
+        return self.bytes_per_s / BYTES_PER_MS / 1000
+
+
+class ConversionProgress:
+    """合成进度统计
+
+    各回调在后台事件循环线程中频繁调用，只累加计数；
+    快照最多每 interval 秒发出一次，多次更新合并为一次，避免信号挤占 Qt 事件循环。
+    """
+
+    def __init__(self, chunks_total, emit=None, interval=0.25, smoothing=0.5):
+        self.chunks_total = chunks_total
+        self.emit = emit
+        self.interval = interval
+        self.smoothing = smoothing
+        self.chunks_done = 0
+        self.bytes_received = 0
+        self.audio_bytes = 0
+        self.bytes_per_s = 0.0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._last_data = self._start
+        self._last_emit = self._start
+        self._last_emit_bytes = 0
+
+    def chunk_started(self, index):
+        with self._lock:
+            # 重试时丢弃上一次尝试收到的音频
+            self._pending[index] = 0
+        self._maybe_emit()
+
+    def audio_received(self, index, size):
+        with self._lock:
+            self.bytes_received += size
+            self._pending[index] = self._pending.get(index, 0) + size
+            self._last_data = time.monotonic()
+        self._maybe_emit()
+
+    def chunk_done(self, index):
+        with self._lock:
+            self.chunks_done += 1
+            self.audio_bytes += self._pending.pop(index, 0)
+        self._maybe_emit()
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            return ProgressSnapshot(self.chunks_done, self.chunks_total, self.bytes_received,
+                                    self.audio_bytes / BYTES_PER_MS / 1000, self.bytes_per_s,
+                                    now - self._start, now - self._last_data)
+
+    def _maybe_emit(self):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_emit < self.interval:
+                return
+            self._update_rate(now)
+        self.flush()
+
+    def _update_rate(self, now):
+        rate = (self.bytes_received - self._last_emit_bytes) / max(now - self._last_emit, 1e-6)
+        self.bytes_per_s += self.smoothing * (rate - self.bytes_per_s)
+        self._last_emit = now
+        self._last_emit_bytes = self.bytes_received
+
+    def flush(self):
+        """立即发出当前快照"""
+        if self.emit:
+            self.emit(self.snapshot())
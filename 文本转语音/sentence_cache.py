@@ -0,0 +1,241 @@
+import os
+import sys
+import asyncio
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from tts_core import TextChunk, split_sentences, synthesize_chunk, atomic_write
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".text2voice", "sentence_cache")
+# 缓存总大小上限，超出后删除最久未用的句子，删到上限的 90%
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+PRUNE_RATIO = 0.9
+
+
+class SentenceCache:
+    """跨文档的句子级音频缓存
+
+    以 (语音, 语速, 音量, 句子) 为键，每句音频单独保存为一个 MP3 文件，
+    不同文档中重复出现的句子可直接复用。命中时更新文件的修改时间，
+    总大小超过 max_bytes 时按修改时间删除最久未用的句子；max_bytes 为 None 时不限制。
+
+    put() 在事件循环中调用，只把音频交给写入线程，写文件、统计大小和清理都在写入线程中进行；
+    尚未写完的句子同样可以读取。
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # 缓存目录的总字节数，写入线程第一次写入时统计，之后按每次写入的增量更新
+        self._size = None
+        # 等待写入的 {路径: 音频}，按提交顺序写入；写入线程在没有待写入的句子时退出
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._writer = None
+
+    @staticmethod
+    def key(voice, rate, volume, sentence):
+        raw = "\n".join((voice, rate, volume, sentence.strip()))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".mp3")
+
+    def get(self, voice, rate, volume, sentence):
+        """返回缓存的句子音频，未命中时返回 None"""
+        path = self.path(self.key(voice, rate, volume, sentence))
+        with self._lock:
+            audio = self._pending.get(path)
+        if audio is not None:
+            self.hits += 1
+            return audio
+        try:
+            with open(path, 'rb') as file:
+                audio = file.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return audio
+
+    def contains(self, voice, rate, volume, sentence):
+        path = self.path(self.key(voice, rate, volume, sentence))
+        with self._lock:
+            if path in self._pending:
+                return True
+        return os.path.exists(path)
+
+    def put(self, voice, rate, volume, sentence, audio):
+        """提交句子音频，由写入线程落盘，调用方不等待"""
+        path = self.path(self.key(voice, rate, volume, sentence))
+        with self._lock:
+            self._pending[path] = audio
+            if self._writer is None:
+                # 不设为守护线程，程序退出前会写完已提交的句子
+                self._writer = threading.Thread(target=self._write_loop, name="SentenceCacheWriter")
+                self._writer.start()
+
+    def flush(self):
+        """等待已提交的句子全部写入"""
+        while True:
+            with self._lock:
+                writer = self._writer
+            if writer is None:
+                return
+            writer.join()
+
+    def _write_loop(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._writer = None
+                    return
+                path, audio = next(iter(self._pending.items()))
+            self._write(path, audio)
+            with self._lock:
+                # 写入期间同一句子又被提交时保留新的音频，下一轮再写
+                if self._pending.get(path) is audio:
+                    del self._pending[path]
+
+    def _write(self, path, audio):
+        if self.max_bytes is not None and self._size is None:
+            self._size = sum(size for _, size, _ in self._files())
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再替换，避免并发读取到不完整的音频
+            atomic_write(path, (audio,))
+        except OSError as e:
+            print(f"写入句子缓存失败: {str(e)}")
+            return
+        if self.max_bytes is not None:
+            self._size += len(audio) - previous
+            if self._size > self.max_bytes:
+                self.prune(int(self.max_bytes * PRUNE_RATIO))
+
+    def _files(self):
+        """[(路径, 字节数, 修改时间)]"""
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                if name.endswith(".mp3"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def prune(self, max_bytes):
+        """删除最久未用的句子，直到总大小不超过 max_bytes，返回删除的文件数"""
+        files = sorted(self._files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for path, size, _ in files:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._size = total
+        return removed
+
+    def clear(self):
+        """删除全部缓存文件，返回删除的文件数"""
+        self.flush()
+        removed = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".mp3"):
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        self._size = 0
+        return removed
+
+
+def frequent_sentences(texts, top=500, min_count=2):
+    """统计语料中出现次数最多的句子"""
+    counter = Counter()
+    for text in texts:
+        for start, end in split_sentences(text):
+            sentence = text[start:end].strip()
+            if sentence:
+                counter[sentence] += 1
+    return [(sentence, count) for sentence, count in counter.most_common(top) if count >= min_count]
+
+
+async def warm(cache, sentences, voice, rate, volume, concurrency=4):
+    """预先合成缓存中还没有的句子，返回新合成的句子数"""
+    missing = [sentence for sentence in sentences if not cache.contains(voice, rate, volume, sentence)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def synthesize(sentence):
+        async with semaphore:
+            try:
+                result = await synthesize_chunk(TextChunk(0, 0, len(sentence), sentence), voice, rate, volume)
+            except Exception as e:
+                print(f"预热失败: {sentence[:20]}... {str(e)}")
+                return 0
+            cache.put(voice, rate, volume, sentence, result.audio)
+            return 1
+
+    done = await asyncio.gather(*(synthesize(sentence) for sentence in missing))
+    return sum(done)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="句子音频缓存管理")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    warm_parser = commands.add_parser("warm", help="从语料中预合成高频句子")
+    warm_parser.add_argument("corpus", nargs="+", help="语料文本文件")
+    warm_parser.add_argument("--voice", default="zh-CN-XiaoxiaoNeural")
+    warm_parser.add_argument("--rate", default="+10%")
+    warm_parser.add_argument("--volume", default="+70%")
+    warm_parser.add_argument("--top", type=int, default=500, help="最多预热的句子数")
+    warm_parser.add_argument("--min-count", type=int, default=2, help="句子至少出现的次数")
+    warm_parser.add_argument("--concurrency", type=int, default=4)
+
+    commands.add_parser("clear", help="清空缓存")
+    prune_parser = commands.add_parser("prune", help="删除最久未用的句子，直到不超过指定大小")
+    prune_parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024)
+
+    args = parser.parse_args(argv)
+    cache = SentenceCache(args.cache_dir)
+
+    if args.command == "clear":
+        print(f"已删除 {cache.clear()} 个缓存文件")
+        return 0
+    if args.command == "prune":
+        removed = cache.prune(int(args.max_mb * 1024 * 1024))
+        print(f"已删除 {removed} 个缓存文件，剩余 {cache._size / 1024 / 1024:.1f} MB")
+        return 0
+
+    texts = []
+    for path in args.corpus:
+        with open(path, 'r', encoding='utf-8') as file:
+            texts.append(file.read())
+    sentences = [sentence for sentence, _ in frequent_sentences(texts, args.top, args.min_count)]
+    count = asyncio.run(warm(cache, sentences, args.voice, args.rate, args.volume, args.concurrency))
+    cache.flush()
+    print(f"高频句子 {len(sentences)} 条，新合成 {count} 条")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
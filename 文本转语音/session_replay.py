@@ -0,0 +1,309 @@
+"""合成会话的录制与回放
+
+RecordingBackend 包装当前的合成后端，把每次会话的请求参数、收到的每条消息（音频数据和边界事件）
+及其相对时间、出错的时间和原因逐行写入 JSONL 文件。ReplayBackend 读取这些记录，
+按原始速度或按比例加速回放，无需联网即可复现线上的首包慢、传输停顿等问题并反复测量。
+
+    python session_replay.py record input.txt -o sessions.jsonl
+    python session_replay.py inspect sessions.jsonl
+    python session_replay.py replay sessions.jsonl input.txt --speed 2
+
+界面程序在设置环境变量 TEXT2VOICE_RECORD=sessions.jsonl 时录制所有会话，
+设置 TEXT2VOICE_REPLAY=sessions.jsonl（以及可选的 TEXT2VOICE_REPLAY_SPEED）时离线回放。
+界面回放默认严格匹配请求，没有录制的请求直接报错；设置 TEXT2VOICE_REPLAY_STRICT=0 时改为轮流取用录制的会话。
+"""
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import argparse
+import threading
+import tts_core
+from tts_core import split_chunks, synthesize_scheduled
+from chunk_scheduler import PlayheadScheduler
+from tts_api import DEFAULT_VOICE
+
+VERSION = 1
+RECORD_ENV = "TEXT2VOICE_RECORD"
+REPLAY_ENV = "TEXT2VOICE_REPLAY"
+REPLAY_SPEED_ENV = "TEXT2VOICE_REPLAY_SPEED"
+REPLAY_STRICT_ENV = "TEXT2VOICE_REPLAY_STRICT"
+
+
+class ReplayedError(Exception):
+    """回放录制时发生的错误"""
+
+
+class ReplayMiss(KeyError):
+    """严格模式下没有与请求匹配的录制会话"""
+
+
+def encode_message(message):
+    if message.get("type") == "audio":
+        return {"type": "audio", "data": base64.b64encode(message["data"]).decode('ascii')}
+    return dict(message)
+
+
+def decode_message(message):
+    if message.get("type") == "audio":
+        return {"type": "audio", "data": base64.b64decode(message["data"])}
+    return dict(message)
+
+
+def load_sessions(path):
+    """读取录制文件，跳过写了一半的末行"""
+    sessions = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                session = json.loads(line)
+            except ValueError:
+                continue
+            if session.get("version") == VERSION:
+                sessions.append(session)
+    return sessions
+
+
+class RecordingBackend:
+    """透传给 inner 后端，同时把每次会话追加写入 path"""
+
+    def __init__(self, path, inner=None):
+        self.path = path
+        self.inner = inner or tts_core.get_backend()
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text, voice, rate="+0%", volume="+0%", **kwargs):
+        return RecordingCommunicate(self, self.inner(text, voice, rate=rate, volume=volume, **kwargs),
+                                    {"text": text, "voice": voice, "rate": rate, "volume": volume})
+
+    def write(self, session):
+        line = json.dumps(session, ensure_ascii=False) + "\n"
+        # 会话可能来自不同线程的事件循环，整行加锁写入
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as file:
+                file.write(line)
+            self.sessions += 1
+
+
+class RecordingCommunicate:
+    def __init__(self, backend, communicate, request):
+        self.backend = backend
+        self.communicate = communicate
+        self.request = request
+
+    async def stream(self):
+        session = dict(self.request, version=VERSION, started=time.time(), events=[], error=None)
+        start = time.monotonic()
+        completed = False
+        try:
+            async for message in self.communicate.stream():
+                session["events"].append([round(time.monotonic() - start, 6), encode_message(message)])
+                yield message
+            completed = True
+        except Exception as e:
+            session["error"] = {"t": round(time.monotonic() - start, 6), "type": type(e).__name__,
+                                "message": str(e)}
+            completed = True
+            raise
+        finally:
+            # 调用方中途取消的会话不完整，不写入
+            if completed:
+                session["duration"] = round(time.monotonic() - start, 6)
+                self.backend.write(session)
+
+    async def save(self, audio_fname, metadata_fname=None):
+        with open(audio_fname, 'wb') as audio:
+            async for message in self.stream():
+                if message["type"] == "audio":
+                    audio.write(message["data"])
+
+
+class ReplayBackend:
+    """按录制的时序回放会话，接口与 edge_tts.Communicate 一致
+
+    请求按 (文本, 语音, 语速, 音量) 匹配录制的会话，同一请求录制了多次时依次轮换。
+    没有匹配时，strict 为 True 则抛出 ReplayMiss，否则按录制顺序轮流取用会话，
+    只复现时序而不关心文本（适合在压力测试中回放线上的流量形态）。
+    speed 为回放速度倍数，0 表示不等待、尽快回放。
+    """
+
+    def __init__(self, path, speed=1.0, strict=False):
+        self.sessions = load_sessions(path)
+        if not self.sessions:
+            raise ValueError(f"录制文件中没有会话: {path}")
+        self.speed = speed
+        self.strict = strict
+        self.requests = 0
+        self.errors = 0
+        self.misses = 0
+        self._by_request = {}
+        for session in self.sessions:
+            self._by_request.setdefault(self.key(session["text"], session["voice"], session["rate"],
+                                                 session["volume"]), []).append(session)
+        self._turns = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text, voice, rate, volume):
+        return text, voice, rate, volume
+
+    def __call__(self, text, voice, rate="+0%", volume="+0%", **kwargs):
+        key = self.key(text, voice, rate, volume)
+        with self._lock:
+            self.requests += 1
+            matches = self._by_request.get(key)
+            if matches:
+                turn = self._turns.get(key, 0)
+                self._turns[key] = turn + 1
+                session = matches[turn % len(matches)]
+            elif self.strict:
+                self.misses += 1
+                raise ReplayMiss(f"没有录制该请求: {text[:20]}")
+            else:
+                self.misses += 1
+                session = self.sessions[self._next % len(self.sessions)]
+                self._next += 1
+        return ReplayCommunicate(self, session)
+
+
+class ReplayCommunicate:
+    def __init__(self, backend, session):
+        self.backend = backend
+        self.session = session
+
+    async def _wait_until(self, start, t):
+        if self.backend.speed:
+            # 按录制时间点对齐，处理消息的耗时不会累积成额外的延迟
+            delay = start + t / self.backend.speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def stream(self):
+        start = time.monotonic()
+        for t, message in self.session["events"]:
+            await self._wait_until(start, t)
+            yield decode_message(message)
+        error = self.session.get("error")
+        if error:
+            await self._wait_until(start, error["t"])
+            with self.backend._lock:
+                self.backend.errors += 1
+            raise ReplayedError(f"{error['type']}: {error['message']}")
+
+    async def save(self, audio_fname, metadata_fname=None):
+        with open(audio_fname, 'wb') as audio:
+            async for message in self.stream():
+                if message["type"] == "audio":
+                    audio.write(message["data"])
+
+
+def replay_from_environment():
+    """设置了 TEXT2VOICE_REPLAY 时返回对应的回放后端，否则返回 None
+
+    默认严格匹配：没有录制的请求抛出 ReplayMiss，而不是拿其他会话的音频冒充。
+    """
+    path = os.environ.get(REPLAY_ENV)
+    if not path:
+        return None
+    return ReplayBackend(path, float(os.environ.get(REPLAY_SPEED_ENV) or 1),
+                         strict=os.environ.get(REPLAY_STRICT_ENV, "1") != "0")
+
+
+def recorder_from_environment(inner):
+    """设置了 TEXT2VOICE_RECORD 时返回包装 inner 的录制后端，否则返回 None"""
+    path = os.environ.get(RECORD_ENV)
+    return RecordingBackend(path, inner) if path else None
+
+
+def session_stats(session):
+    """单个会话的首包耗时、总耗时、音频消息之间的最长间隔（秒）和音频字节数"""
+    audio_times = [t for t, message in session["events"] if message["type"] == "audio"]
+    gaps = [later - earlier for earlier, later in zip(audio_times, audio_times[1:])]
+    return {
+        "first_audio_s": audio_times[0] if audio_times else None,
+        "duration_s": session.get("duration"),
+        "max_gap_s": max(gaps, default=0),
+        "audio_bytes": sum(len(base64.b64decode(message["data"])) for _, message in session["events"]
+                           if message["type"] == "audio"),
+        "error": session["error"]["type"] if session.get("error") else None,
+    }
+
+
+async def convert(text, voice, rate, volume, concurrency):
+    """与界面相同的分块合成流程，返回 (音频, 总耗时, 首段音频耗时)"""
+    start = time.perf_counter()
+    first_audio = []
+    chunks = split_chunks(text)
+    results = await synthesize_scheduled(
+        chunks, PlayheadScheduler(len(chunks)), voice, rate, volume, concurrency=concurrency,
+        on_audio=lambda index, size: index == 0 and not first_audio and first_audio.append(time.perf_counter()))
+    return (b"".join(result.audio for result in results), time.perf_counter() - start,
+            first_audio[0] - start if first_audio else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="录制与回放合成会话")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = commands.add_parser("record", help="联网合成文本并录制所有会话")
+    record_parser.add_argument("input", help="文本文件")
+    record_parser.add_argument("-o", "--output", default="sessions.jsonl", help="录制文件（追加写入）")
+    record_parser.add_argument("--audio", help="同时保存合成的音频")
+
+    replay_parser = commands.add_parser("replay", help="用录制的会话离线重放转换流程")
+    replay_parser.add_argument("sessions", help="录制文件")
+    replay_parser.add_argument("input", help="文本文件")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="回放速度倍数，0 为不等待")
+    replay_parser.add_argument("--strict", action="store_true", help="请求与录制不一致时报错")
+    replay_parser.add_argument("--audio", help="保存回放得到的音频")
+
+    for sub in (record_parser, replay_parser):
+        sub.add_argument("--voice", default=DEFAULT_VOICE)
+        sub.add_argument("--rate", default="+10%")
+        sub.add_argument("--volume", default="+70%")
+        sub.add_argument("--concurrency", type=int, default=3)
+
+    inspect_parser = commands.add_parser("inspect", help="列出录制的会话及其时序")
+    inspect_parser.add_argument("sessions")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "inspect":
+        for i, session in enumerate(load_sessions(args.sessions)):
+            stats = session_stats(session)
+            first = "-" if stats["first_audio_s"] is None else f"{stats['first_audio_s']:.3f}s"
+            print(f"{i:>4} {session['voice']} {len(session['text']):>5} 字符 首包 {first} "
+                  f"总耗时 {stats['duration_s']:.3f}s 最长停顿 {stats['max_gap_s']:.3f}s "
+                  f"{stats['audio_bytes'] / 1024:.0f} KB{' 错误 ' + stats['error'] if stats['error'] else ''}")
+        return 0
+
+    with open(args.input, 'r', encoding='utf-8') as file:
+        text = file.read()
+    if args.command == "record":
+        backend = RecordingBackend(args.output)
+    else:
+        backend = ReplayBackend(args.sessions, args.speed, args.strict)
+    tts_core.set_backend(backend)
+    try:
+        audio, elapsed, first_audio = asyncio.run(convert(text, args.voice, args.rate, args.volume,
+                                                          args.concurrency))
+    finally:
+        tts_core.set_backend(None)
+    if args.audio:
+        with open(args.audio, 'wb') as file:
+            file.write(audio)
+
+    first = "-" if first_audio is None else f"{first_audio:.3f}s"
+    if args.command == "record":
+        print(f"已录制 {backend.sessions} 个会话到 {args.output}，总耗时 {elapsed:.3f}s，首段音频 {first}")
+    else:
+        print(f"回放 {backend.requests} 个请求（未匹配 {backend.misses} 个），总耗时 {elapsed:.3f}s，首段音频 {first}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
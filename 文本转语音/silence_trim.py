@@ -0,0 +1,210 @@
+"""静音修剪与停顿规整
+
+分块合成的每段音频都带有各自的首尾静音，直接拼接会拉长总时长，停顿也忽长忽短。
+这里把每段解码为 PCM，用 numpy 一次算出所有 MP3 帧的能量并找出静音段：
+去掉开头多余的静音，句子和段落边界处的停顿统一为设定的时长，句内过长的停顿截短。
+
+修剪以 MP3 帧为单位直接拼接原始帧，不重新编码，音质不变，处理速度远快于实时。
+依赖 numpy 和 soundfile（与本地渲染相同），未安装时不做处理。
+
+    python silence_trim.py input.mp3 -o output.mp3 --sentence-pause 400
+"""
+import sys
+import argparse
+from bisect import bisect_right
+from tts_core import (FRAME_BYTES, FRAME_MS, TICKS_PER_MS, SILENT_FRAME, ChunkAudio, TextChunk,
+                      boundary_offsets, detach_reservoir, split_sentences)
+from local_render import AVAILABLE, decode_mp3
+
+if AVAILABLE:
+    import numpy as np
+
+# 每帧 576 个采样
+SAMPLES_PER_FRAME = 576
+# RMS 电平低于该值（dBFS）的帧视为静音
+SILENCE_DB = -50
+# 语音前后各保留的原始静音帧数，衔接更自然，也能容纳解码延迟造成的半帧左右的对齐误差
+MARGIN_FRAMES = 2
+SENTENCE_PAUSE_MS = 400
+PARAGRAPH_PAUSE_MS = 900
+
+
+def ends_paragraph(text):
+    """文本末尾的空白中含有换行时视为段落结束"""
+    return "\n" in text[len(text.rstrip()):]
+
+
+def is_frame_aligned(audio):
+    """音频是否由等长的 48kbps 帧组成，只有这样才能直接按帧切分"""
+    if not audio or len(audio) % FRAME_BYTES:
+        return False
+    headers = np.frombuffer(audio, dtype=np.uint8).reshape(-1, FRAME_BYTES)[:, :4]
+    # 第三个字节的末两位是填充位和私有位，不参与比较；第四个字节的高两位为声道模式（单声道）
+    return bool((headers[:, 0] == SILENT_FRAME[0]).all() and (headers[:, 1] == SILENT_FRAME[1]).all()
+                and ((headers[:, 2] & 0xFC) == SILENT_FRAME[2]).all()
+                and ((headers[:, 3] >> 6) == SILENT_FRAME[3] >> 6).all())
+
+
+def frame_levels(audio):
+    """解码后计算每个 MP3 帧的 RMS 电平（dBFS）"""
+    count = len(audio) // FRAME_BYTES
+    samples, _ = decode_mp3(audio)
+    frames = np.zeros(count * SAMPLES_PER_FRAME, dtype=np.float32)
+    length = min(len(samples), len(frames))
+    frames[:length] = samples[:length]
+    power = np.square(frames.reshape(count, SAMPLES_PER_FRAME)).mean(axis=1)
+    return 10 * np.log10(np.maximum(power, 1e-10))
+
+
+def silent_runs(silent):
+    """布尔数组中连续为 True 的区间 [(start, end)]"""
+    edges = np.diff(np.concatenate(([0], silent.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def sentence_starts(chunk, result):
+    """分块内第二句起各句开头所在的帧号 -> 该句之前是否为段落边界"""
+    spans = split_sentences(chunk.text)
+    times = dict(boundary_offsets(chunk, result.boundaries))
+    starts = {}
+    for previous, (start, end) in zip(spans, spans[1:]):
+        sentence = chunk.text[start:end]
+        ms = times.get(chunk.start + start + len(sentence) - len(sentence.lstrip()))
+        if ms is not None:
+            # 只有换行的片段不算句子，换行落在前一句结尾和这一句开头之间
+            starts[int(ms // FRAME_MS)] = ends_paragraph(chunk.text[previous[0]:start])
+    return starts
+
+
+def trim_chunk(chunk, result, trailing_ms, sentence_pause_ms=SENTENCE_PAUSE_MS,
+               paragraph_pause_ms=PARAGRAPH_PAUSE_MS, threshold_db=SILENCE_DB, margin=MARGIN_FRAMES):
+    """修剪单个分块的音频
+
+    开头只保留 margin 帧静音，句间停顿规整为设定时长，句内长于句间停顿的静音截短，
+    结尾静音换成 trailing_ms 的停顿（连同下一段开头保留的帧）。
+    返回新的 ChunkAudio，边界事件时间按修剪后的音频重新计算；无法按帧处理时原样返回。
+    """
+    audio = result.audio
+    if not is_frame_aligned(audio):
+        return result
+    count = len(audio) // FRAME_BYTES
+    silent = frame_levels(audio) < threshold_db
+    if silent.all():
+        return result
+
+    starts = sentence_starts(chunk, result)
+    sentence_frames = round(sentence_pause_ms / FRAME_MS)
+    paragraph_frames = round(paragraph_pause_ms / FRAME_MS)
+    runs = silent_runs(silent)
+    if not runs or runs[-1][1] < count:
+        # 结尾没有静音时也要补上停顿
+        runs.append((count, count))
+
+    # 每个静音段替换为：左侧保留的原始帧 + 若干静音帧 + 右侧保留的原始帧
+    edits = []
+    for start, end in runs:
+        length = end - start
+        if start == 0:
+            keep = min(margin, length)
+            edits.append((start, end, 0, keep, 0))
+        elif end == count:
+            keep = min(margin, length)
+            target = round(trailing_ms / FRAME_MS) - margin if trailing_ms else 0
+            edits.append((start, end, keep, 0, max(target - keep, 1 if trailing_ms else 0)))
+        else:
+            paragraph = next((starts[frame] for frame in range(start, end + margin + 1) if frame in starts), None)
+            if paragraph is None:
+                target = min(length, sentence_frames)
+            else:
+                target = paragraph_frames if paragraph else sentence_frames
+            if target == length:
+                continue
+            keep = min(margin, length // 2)
+            edits.append((start, end, keep, keep, max(target - 2 * keep, 1)))
+
+    pieces = []
+    # (原始起始帧, 原始结束帧, 新起始帧)，用于换算边界事件的时间
+    segments = []
+    position = 0
+    new_position = 0
+
+    def keep_frames(start, end):
+        nonlocal new_position
+        if end > start:
+            pieces.append(detach_reservoir(bytearray(audio[start * FRAME_BYTES:end * FRAME_BYTES])))
+            segments.append((start, end, new_position))
+            new_position += end - start
+
+    for start, end, left, right, fill in edits:
+        keep_frames(position, start + left)
+        pieces.append(SILENT_FRAME * fill)
+        new_position += fill
+        position = end - right
+    keep_frames(position, count)
+
+    segment_ends = [segment[1] for segment in segments]
+    boundaries = []
+    for ticks, text in result.boundaries:
+        frame = ticks / TICKS_PER_MS / FRAME_MS
+        i = bisect_right(segment_ends, frame)
+        if i == len(segments):
+            frame = new_position
+        elif frame >= segments[i][0]:
+            frame = segments[i][2] + frame - segments[i][0]
+        else:
+            # 落在被删除的静音中的事件归到其后的语音开头
+            frame = segments[i][2]
+        boundaries.append((int(frame * FRAME_MS * TICKS_PER_MS), text))
+    return ChunkAudio(b"".join(pieces), boundaries)
+
+
+def trim_results(chunks, results, sentence_pause_ms=SENTENCE_PAUSE_MS, paragraph_pause_ms=PARAGRAPH_PAUSE_MS,
+                 threshold_db=SILENCE_DB):
+    """修剪按文档顺序排列的各分块合成结果，分块之间按句子或段落插入停顿"""
+    if not AVAILABLE:
+        return results
+    trimmed = []
+    for i, (chunk, result) in enumerate(zip(chunks, results)):
+        if i == len(chunks) - 1:
+            trailing_ms = 0
+        else:
+            # 分块之间只隔着换行时，换行不属于任何一个分块，两者之间留有空隙
+            paragraph = ends_paragraph(chunk.text) or chunks[i + 1].start > chunk.end
+            trailing_ms = paragraph_pause_ms if paragraph else sentence_pause_ms
+        try:
+            trimmed.append(trim_chunk(chunk, result, trailing_ms, sentence_pause_ms, paragraph_pause_ms,
+                                      threshold_db))
+        except Exception as e:
+            print(f"分块 {chunk.index} 修剪静音失败，保留原始音频: {str(e)}")
+            trimmed.append(result)
+    return trimmed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="去除 MP3 中多余的静音并规整停顿")
+    parser.add_argument("input")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--sentence-pause", type=int, default=SENTENCE_PAUSE_MS, help="停顿的最大时长（毫秒）")
+    parser.add_argument("--threshold", type=float, default=SILENCE_DB, help="静音电平阈值（dBFS）")
+    args = parser.parse_args(argv)
+
+    if not AVAILABLE:
+        print("需要安装 numpy 和 soundfile（libsndfile 1.1 以上）")
+        return 1
+    with open(args.input, 'rb') as file:
+        audio = file.read()
+    if not is_frame_aligned(audio):
+        print("不是 24kHz、48kbps 的 CBR MP3，无法按帧修剪")
+        return 1
+    # 没有文本时整段视为一个分块，只去掉首尾静音并截短过长的停顿
+    result = trim_chunk(TextChunk(0, 0, 0, ""), ChunkAudio(audio, []), 0, args.sentence_pause,
+                        threshold_db=args.threshold)
+    with open(args.output, 'wb') as file:
+        file.write(result.audio)
+    print(f"时长 {len(audio) / FRAME_BYTES * FRAME_MS / 1000:.1f}s -> "
+          f"{len(result.audio) / FRAME_BYTES * FRAME_MS / 1000:.1f}s，已保存到 {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""流式文本输入
+
+从标准输入、管道或异步迭代器中读取仍在生成的文本，每凑满一句就立即合成并播放，
+后续句子在播放前一句时并发合成。端到端延迟约为一句话，而不是整段文本。
+上游暂时没有新文本时，缓冲中未结束的半句在 --idle-flush 秒后也会读出。
+
+    upstream_generator | python stream_input.py --player "mpv --no-video -"
+"""
+import os
+import re
+import sys
+import codecs
+import shlex
+import shutil
+import asyncio
+import argparse
+from tts_core import TextChunk, split_sentences, soft_break, synthesize_chunk, synthesize_chunk_cached
+from tts_api import DEFAULT_VOICE
+
+# 一直没有句末标点时，缓冲超过该长度就在逗号等位置提前切分
+MAX_PENDING_CHARS = 200
+# 缓冲以换行或中文句末标点（及其后的引号、括号）结尾时，最后一句不会再有后续，立即输出；
+# 英文标点、省略号可能还有后续（"?!"、"……"、"3.14"），等下一段文本再判断
+TERMINAL = re.compile(r'(\n|[。！？；][”’」』）)"\']*)$')
+# 只有标点、没有可朗读文字的片段不合成
+SPEAKABLE = re.compile(r'\w')
+# 上游超过该秒数没有新文本时，输出缓冲中未结束的半句
+IDLE_FLUSH_S = 1.5
+
+# 按顺序尝试的播放器，均可从标准输入读取 MP3 流
+PLAYERS = (
+    ["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet", "-"],
+    ["mpv", "--no-video", "--really-quiet", "-"],
+    ["mpg123", "-q", "-"],
+)
+
+
+class SentenceSegmenter:
+    """增量切分句子：feed() 返回已经完整的句子，flush() 返回剩余部分"""
+
+    def __init__(self, max_pending=MAX_PENDING_CHARS):
+        self.max_pending = max_pending
+        self.buffer = ""
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        spans = split_sentences(self.buffer)
+        consumed = 0
+        terminal = TERMINAL.search(self.buffer) is not None
+        for start, end in spans:
+            # 恰好结束在缓冲末尾的句子可能还有后续的标点或引号，除非已明确结束，暂不输出
+            if end >= len(self.buffer) and not terminal:
+                break
+            sentences.append(self.buffer[start:end].strip())
+            consumed = end
+        self.buffer = self.buffer[consumed:]
+
+        while len(self.buffer) > self.max_pending:
+            cut = soft_break(self.buffer, 0, self.max_pending) or self.max_pending
+            sentences.append(self.buffer[:cut].strip())
+            self.buffer = self.buffer[cut:]
+        return [sentence for sentence in sentences if SPEAKABLE.search(sentence)]
+
+    def flush(self):
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return [rest] if SPEAKABLE.search(rest) else []
+
+
+async def read_file(file, size=4096):
+    """以异步迭代器的形式逐块读取文件（标准输入或管道），有数据就立即返回"""
+    loop = asyncio.get_running_loop()
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    fd = file.fileno()
+    while True:
+        data = await loop.run_in_executor(None, os.read, fd, size)
+        text = decoder.decode(data, final=not data)
+        if text:
+            yield text
+        if not data:
+            return
+
+
+class PlayerSink:
+    """把 MP3 数据写入播放器进程的标准输入"""
+
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+
+    async def write(self, audio):
+        if self.process is None:
+            self.process = await asyncio.create_subprocess_exec(*self.command, stdin=asyncio.subprocess.PIPE)
+        self.process.stdin.write(audio)
+        await self.process.stdin.drain()
+
+    async def close(self):
+        if self.process:
+            self.process.stdin.close()
+            await self.process.wait()
+
+
+class FileSink:
+    """把 MP3 数据追加写入文件，"-" 表示标准输出"""
+
+    def __init__(self, path):
+        self.file = sys.stdout.buffer if path == "-" else open(path, 'wb')
+
+    async def write(self, audio):
+        self.file.write(audio)
+        self.file.flush()
+
+    async def close(self):
+        if self.file is not sys.stdout.buffer:
+            self.file.close()
+
+
+def default_player():
+    for command in PLAYERS:
+        if shutil.which(command[0]):
+            return command
+    return None
+
+
+async def speak_stream(source, sink, voice=DEFAULT_VOICE, rate="+0%", volume="+0%",
+                       concurrency=3, cache=None, on_sentence=None, idle_flush=IDLE_FLUSH_S):
+    """边读取 source（异步产出文本片段）边合成，按顺序把每句音频写入 sink，返回句子数
+
+    source 超过 idle_flush 秒没有产出新文本时，缓冲中的半句也立即合成；为 None 时一直等待。
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    # 已开始合成、等待按顺序输出的句子；队列满时暂停读取，避免无限预读
+    pending = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def synthesize(index, sentence):
+        async with semaphore:
+            chunk = TextChunk(index, 0, len(sentence), sentence)
+            if cache is not None:
+                return await synthesize_chunk_cached(chunk, voice, rate, volume, cache)
+            return await synthesize_chunk(chunk, voice, rate, volume)
+
+    async def produce():
+        segmenter = SentenceSegmenter()
+        index = 0
+        iterator = source.__aiter__()
+        next_text = None
+
+        async def emit(sentences):
+            nonlocal index
+            for sentence in sentences:
+                await pending.put((sentence, asyncio.ensure_future(synthesize(index, sentence))))
+                index += 1
+
+        try:
+            while True:
+                if next_text is None:
+                    # 读取放在单独的任务中，等待超时不会中断上游的迭代器
+                    next_text = asyncio.ensure_future(iterator.__anext__())
+                timeout = idle_flush if segmenter.buffer.strip() else None
+                done, _ = await asyncio.wait({next_text}, timeout=timeout)
+                if not done:
+                    await emit(segmenter.flush())
+                    continue
+                task, next_text = next_text, None
+                try:
+                    text = task.result()
+                except StopAsyncIteration:
+                    break
+                await emit(segmenter.feed(text))
+            await emit(segmenter.flush())
+        except Exception:
+            await pending.put(None)
+            raise
+        finally:
+            if next_text is not None:
+                next_text.cancel()
+        await pending.put(None)
+
+    producer = asyncio.ensure_future(produce())
+    count = 0
+    try:
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            sentence, task = item
+            try:
+                result = await task
+            except Exception as e:
+                print(f"合成失败，已跳过: {sentence[:20]}... {str(e)}", file=sys.stderr)
+                continue
+            if on_sentence:
+                on_sentence(sentence)
+            await sink.write(result.audio)
+            count += 1
+        await producer
+    finally:
+        producer.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item:
+                item[1].cancel()
+        await sink.close()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="边读取边朗读：逐句合成标准输入或管道中的文本")
+    parser.add_argument("input", nargs="?", help="输入文件或命名管道，默认为标准输入")
+    parser.add_argument("--voice", default=DEFAULT_VOICE)
+    parser.add_argument("--rate", default="+10%")
+    parser.add_argument("--volume", default="+70%")
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--player", help="播放器命令，需从标准输入读取 MP3，默认自动查找 ffplay/mpv/mpg123")
+    parser.add_argument("-o", "--output", help="不播放，写入文件（- 为标准输出）")
+    parser.add_argument("--quiet", action="store_true", help="不打印正在朗读的句子")
+    parser.add_argument("--idle-flush", type=float, default=IDLE_FLUSH_S,
+                        help="上游超过该秒数没有新文本时读出未结束的半句，0 为一直等待")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        sink = FileSink(args.output)
+    else:
+        command = shlex.split(args.player) if args.player else default_player()
+        if not command:
+            parser.error("未找到播放器，请用 --player 指定或用 --output 写入文件")
+        sink = PlayerSink(command)
+
+    def on_sentence(sentence):
+        if not args.quiet:
+            print(sentence, file=sys.stderr)
+
+    async def run():
+        file = open(args.input, 'rb') if args.input else sys.stdin
+        try:
+            return await speak_stream(read_file(file), sink, args.voice, args.rate, args.volume,
+                                      args.concurrency, on_sentence=on_sentence,
+                                      idle_flush=args.idle_flush or None)
+        finally:
+            if args.input:
+                file.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
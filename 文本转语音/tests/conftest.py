@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 各模块是平铺的脚本，测试时把所在目录加入导入路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,62 @@
+import asyncio
+import pytest
+import tts_core
+from tts_core import split_chunks, synthesize_chunk
+from audio_index import AudioIndex, index_path
+from fake_backend import FakeBackend
+
+TEXT = "".join(f"第{i}句话。" for i in range(60))
+MS_PER_CHAR = 20
+
+
+@pytest.fixture
+def index():
+    tts_core.set_backend(FakeBackend(latency=0, ms_per_char=MS_PER_CHAR))
+    try:
+        chunks = split_chunks(TEXT, max_chars=100)
+        results = [asyncio.run(synthesize_chunk(chunk, "v", "+0%", "+0%")) for chunk in chunks]
+    finally:
+        tts_core.set_backend(None)
+    return AudioIndex.from_chunks(TEXT, chunks, results)
+
+
+def sentence_starts():
+    return [start for start, _ in tts_core.split_sentences(TEXT)]
+
+
+def test_every_sentence_is_indexed_in_order(index):
+    assert index.offsets == sentence_starts()
+    assert index.times == sorted(index.times)
+    assert index.times[0] == 0
+
+
+def test_lookups_round_trip(index):
+    for offset, ms in zip(index.offsets, index.times):
+        assert index.time_at(offset) == int(ms)
+        assert index.offset_at(ms) == offset
+    # 句子中间的位置落到所在句子的开头
+    assert index.time_at(index.offsets[3] + 2) == int(index.times[3])
+    assert index.span_at(index.times[3] + 1) == (index.offsets[3], index.offsets[4])
+    assert index.span_at(index.times[-1] + 10_000) == (index.offsets[-1], len(TEXT))
+
+
+def test_time_follows_audio_duration(index):
+    # 替身后端每个字符 MS_PER_CHAR 毫秒（按帧取整），第二句从第一句的时长之后开始
+    first = TEXT[:index.offsets[1]]
+    assert abs(index.times[1] - len(first) * MS_PER_CHAR) <= tts_core.FRAME_MS
+
+
+def test_save_and_load(tmp_path, index):
+    path = index_path(str(tmp_path / "out.mp3"))
+    index.save(path)
+    loaded = AudioIndex.load(path, TEXT)
+    assert loaded.offsets == index.offsets and loaded.times == index.times
+    # 文本改变后索引失效
+    assert AudioIndex.load(path, TEXT + "新增。") is None
+    assert AudioIndex.load(str(tmp_path / "missing.json")) is None
+
+
+def test_empty_index():
+    index = AudioIndex([], 10)
+    assert index.time_at(5) == 0
+    assert index.span_at(100) == (0, 10)
@@ -0,0 +1,88 @@
+import struct
+from tts_core import silence, FRAME_MS
+from audiobook import split_chapters, chapter_tag, build_combined, MAX_TOC_ENTRIES
+
+
+def unsyncsafe(data):
+    size = 0
+    for byte in data:
+        size = (size << 7) | byte
+    return size
+
+
+def parse_frames(body):
+    """[(帧 ID, 内容)]"""
+    frames = []
+    position = 0
+    while position + 10 <= len(body):
+        frame_id = body[position:position + 4].decode('ascii')
+        size = struct.unpack(">I", body[position + 4:position + 8])[0]
+        frames.append((frame_id, body[position + 10:position + 10 + size]))
+        position += 10 + size
+    return frames
+
+
+def parse_tag(data):
+    assert data[:5] == b"ID3\x03\x00"
+    size = unsyncsafe(data[6:10])
+    return parse_frames(data[10:10 + size]), 10 + size
+
+
+def parse_chap(payload):
+    element_id, rest = payload.split(b"\x00", 1)
+    times = struct.unpack(">IIII", rest[:16])
+    return element_id.decode('ascii'), times, parse_frames(rest[16:])
+
+
+def parse_ctoc(payload):
+    element_id, rest = payload.split(b"\x00", 1)
+    flags, count = rest[0], rest[1]
+    children = rest[2:].split(b"\x00")[:count]
+    return element_id.decode('ascii'), flags, [child.decode('ascii') for child in children]
+
+
+def title_of(frames):
+    payload = dict(frames)["TIT2"]
+    return payload[1:].decode('utf-16').rstrip("\x00")
+
+
+def test_split_chapters_with_preface():
+    text = "序言内容。\n第一章 开始\n正文一。\n第2回 继续\n正文二。\n"
+    chapters = split_chapters(text)
+    assert [chapter.title for chapter in chapters] == ["前言", "第一章 开始", "第2回 继续"]
+    assert "".join(chapter.text for chapter in chapters) == text
+    assert [chapter.title for chapter in split_chapters("没有标题的文本。")] == ["全文"]
+
+
+def test_combined_file_chapter_index_points_at_audio():
+    chapters = split_chapters("第一章 甲\n内容。\n第二章 乙\n内容。\n第三章 丙\n内容。\n")
+    audios = [silence(FRAME_MS * n) for n in (10, 20, 30)]
+    parts, entries = build_combined("书名", chapters, audios, gap_ms=FRAME_MS * 5)
+    data = b"".join(parts)
+    frames, tag_length = parse_tag(data)
+    assert tag_length == len(parts[0])
+    assert title_of(frames) == "书名"
+
+    chaps = [parse_chap(payload) for frame_id, payload in frames if frame_id == "CHAP"]
+    assert [element_id for element_id, _, _ in chaps] == ["ch0", "ch1", "ch2"]
+    assert [title_of(sub) for _, _, sub in chaps] == ["第一章 甲", "第二章 乙", "第三章 丙"]
+    for (_, (start_ms, end_ms, start_byte, end_byte), _), audio, entry in zip(chaps, audios, entries):
+        # 字节位置包含标签长度，章节音频（加上章节间的静音）正好位于其中
+        assert data[start_byte:start_byte + len(audio)] == audio
+        assert (start_ms, end_ms) == (int(entry[1]), int(entry[2]))
+    assert chaps[-1][1][3] == len(data)
+
+    tocs = [parse_ctoc(payload) for frame_id, payload in frames if frame_id == "CTOC"]
+    assert tocs == [("toc", 0x03, ["ch0", "ch1", "ch2"])]
+
+
+def test_many_chapters_use_nested_tables_of_contents():
+    count = MAX_TOC_ENTRIES + 10
+    entries = [(f"第{i}章", i * 1000, (i + 1) * 1000, i * 100, (i + 1) * 100) for i in range(count)]
+    frames, _ = parse_tag(chapter_tag("书名", entries))
+    tocs = {element_id: (flags, children)
+            for element_id, flags, children in (parse_ctoc(payload) for frame_id, payload in frames
+                                                 if frame_id == "CTOC")}
+    assert tocs["toc"] == (0x03, ["toc0", "toc1"])
+    assert tocs["toc0"][1] == [f"ch{i}" for i in range(MAX_TOC_ENTRIES)]
+    assert tocs["toc1"][1] == [f"ch{i}" for i in range(MAX_TOC_ENTRIES, count)]
@@ -0,0 +1,47 @@
+import time
+import asyncio
+
+import pytest
+import tts_core
+from audition import audition, cached_preview, preview_text
+from fake_backend import FakeBackend
+
+VOICES = [f"voice-{i}" for i in range(5)]
+
+
+@pytest.fixture
+def backend():
+    backend = FakeBackend(latency=0.2, ms_per_char=20)
+    tts_core.set_backend(backend)
+    yield backend
+    tts_core.set_backend(None)
+
+
+def test_preview_text_takes_leading_sentences():
+    assert preview_text("第一句。第二句。第三句。") == "第一句。第二句。"
+    assert preview_text("第一句。第二句。", max_chars=5) == "第一句。"
+    # 首句过长时在逗号处截断
+    assert preview_text("一二三，四五六七八九十。", max_chars=6) == "一二三，"
+    assert preview_text("  \n") == ""
+
+
+def test_all_voices_synthesize_concurrently_by_default(tmp_path, backend):
+    ready = []
+    start = time.perf_counter()
+    paths = asyncio.run(audition("你好。", VOICES, cache_dir=str(tmp_path),
+                                 on_ready=lambda voice, path: ready.append(voice)))
+    assert time.perf_counter() - start < 0.2 * 3
+    assert sorted(paths) == sorted(ready) == sorted(VOICES)
+    assert cached_preview(VOICES[0], "+0%", "+0%", "你好。", str(tmp_path)) == paths[VOICES[0]]
+
+    # 已有的试听不再合成
+    requests = backend.requests
+    asyncio.run(audition("你好。", VOICES, cache_dir=str(tmp_path)))
+    assert backend.requests == requests
+
+
+def test_concurrency_limit_starts_voices_in_order(tmp_path, backend):
+    ready = []
+    asyncio.run(audition("你好。", VOICES, cache_dir=str(tmp_path), concurrency=1,
+                         on_ready=lambda voice, path: ready.append(voice)))
+    assert ready == VOICES
@@ -0,0 +1,16 @@
+import asyncio
+
+import tts_core
+from benchmark import make_text, measure_conversion, measure_stitching
+from fake_backend import FakeBackend
+
+
+def test_stitching_runs_on_synthesized_chunks():
+    tts_core.set_backend(FakeBackend(latency=0, ms_per_char=20))
+    try:
+        elapsed, ttfa, chunks, results = asyncio.run(measure_conversion(make_text(2000), 4, 0))
+    finally:
+        tts_core.set_backend(None)
+    assert len(results) == len(chunks) > 1
+    assert 0 <= ttfa <= elapsed
+    assert measure_stitching(chunks, results, repeat=1) > 0
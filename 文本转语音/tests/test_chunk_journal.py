@@ -0,0 +1,94 @@
+import os
+from tts_core import ChunkAudio, split_chunks
+from chunk_journal import ChunkJournal
+
+TEXT = "".join(f"第{i}句话。" for i in range(400))
+ARGS = ("zh-CN-XiaoxiaoNeural", "+0%", "+0%")
+
+
+def make_chunks():
+    return split_chunks(TEXT, max_chars=200)
+
+
+def result(index):
+    return ChunkAudio(bytes([index]) * (100 + index), [(index * 10, f"第{index}句话。")])
+
+
+def open_journal(root, text=TEXT, args=ARGS):
+    return ChunkJournal(text, *args, make_chunks(), root=str(root))
+
+
+def test_completed_chunks_are_restored(tmp_path):
+    journal = open_journal(tmp_path)
+    assert journal.restored == {}
+    for index in (0, 2, 3):
+        journal.append(index, result(index))
+    journal.close()
+
+    journal = open_journal(tmp_path)
+    assert sorted(journal.restored) == [0, 2, 3]
+    for index, restored in journal.restored.items():
+        assert restored.audio == result(index).audio
+        assert restored.boundaries == result(index).boundaries
+    journal.close()
+
+
+def test_torn_record_and_data_are_discarded(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append(0, result(0))
+    journal.append(1, result(1))
+    journal.close()
+    # 模拟崩溃：数据写了一半，日志记录也只写了一半
+    with open(journal.data_path, 'ab') as file:
+        file.write(b"partial")
+    with open(journal.journal_path, 'a', encoding='utf-8') as file:
+        file.write('{"index": 2, "off')
+
+    journal = open_journal(tmp_path)
+    assert sorted(journal.restored) == [0, 1]
+    journal.append(2, result(2))
+    journal.close()
+    assert os.path.getsize(journal.data_path) == sum(len(result(i).audio) for i in range(3))
+
+    journal = open_journal(tmp_path)
+    assert sorted(journal.restored) == [0, 1, 2]
+    assert journal.restored[2].audio == result(2).audio
+    journal.close()
+
+
+def test_corrupted_chunk_fails_checksum(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append(0, result(0))
+    journal.append(1, result(1))
+    journal.close()
+    with open(journal.data_path, 'r+b') as file:
+        file.seek(len(result(0).audio))
+        file.write(b"\xff")
+
+    journal = open_journal(tmp_path)
+    assert sorted(journal.restored) == [0]
+    journal.close()
+
+
+def test_different_parameters_use_separate_journals(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append(0, result(0))
+    journal.close()
+
+    other = open_journal(tmp_path, args=("zh-CN-YunxiNeural", "+0%", "+0%"))
+    assert other.restored == {}
+    other.close()
+
+
+def test_append_after_close_is_ignored(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.close()
+    journal.append(0, result(0))
+    assert open_journal(tmp_path).restored == {}
+
+
+def test_discard_removes_journal(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.append(0, result(0))
+    journal.discard()
+    assert not os.path.exists(journal.directory)
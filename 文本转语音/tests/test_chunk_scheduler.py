@@ -0,0 +1,52 @@
+from chunk_scheduler import PlayheadScheduler
+
+
+def drain(scheduler):
+    order = []
+    while True:
+        index = scheduler.next_chunk()
+        if index is None:
+            return order
+        order.append(index)
+
+
+def test_starts_from_beginning_in_order():
+    assert drain(PlayheadScheduler(5)) == [0, 1, 2, 3, 4]
+
+
+def test_seek_prioritizes_lookahead_then_later_then_earlier():
+    scheduler = PlayheadScheduler(10, lookahead=2)
+    scheduler.seek(5)
+    assert drain(scheduler) == [5, 6, 7, 8, 9, 4, 3, 2, 1, 0]
+
+
+def test_seek_reorders_pending_chunks_only():
+    scheduler = PlayheadScheduler(6, lookahead=1)
+    assert scheduler.next_chunk() == 0
+    assert scheduler.next_chunk() == 1
+    scheduler.seek(4)
+    assert drain(scheduler) == [4, 5, 3, 2]
+
+
+def test_mark_done_before_start_skips_chunk():
+    scheduler = PlayheadScheduler(4)
+    scheduler.mark_done(1)
+    assert drain(scheduler) == [0, 2, 3]
+
+
+def test_requeue_returns_failed_chunk():
+    scheduler = PlayheadScheduler(3)
+    assert scheduler.next_chunk() == 0
+    scheduler.requeue(0)
+    assert scheduler.next_chunk() == 0
+    for index in (0, 1, 2):
+        scheduler.mark_done(index)
+    assert scheduler.is_finished()
+
+
+def test_seek_is_clamped_to_valid_range():
+    scheduler = PlayheadScheduler(3)
+    scheduler.seek(99)
+    assert scheduler.playhead == 2
+    scheduler.seek(-5)
+    assert scheduler.playhead == 0
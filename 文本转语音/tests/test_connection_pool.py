@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+import tts_core
+from tts_core import TextChunk, synthesize_chunk
+from fake_backend import FakeBackend, FakeServer
+import connection_pool
+from connection_pool import ConnectionPool
+
+pytestmark = pytest.mark.skipif(connection_pool.TTSConfig is None, reason="当前 edge-tts 版本不支持连接复用")
+
+ARGS = ("zh-CN-XiaoxiaoNeural", "+0%", "+0%")
+TEXTS = ["第一句。", "第二句。", "第三句。", "第四句。"]
+MS_PER_CHAR = 20
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    yield
+    tts_core.set_backend(None)
+
+
+def run_with_pool(server, pool_options, scenario):
+    async def main():
+        url = await server.start()
+        pool = ConnectionPool(url=url, **pool_options)
+        tts_core.set_backend(pool.communicate)
+        try:
+            return await scenario(pool)
+        finally:
+            await pool.close()
+            await server.stop()
+    return asyncio.run(main())
+
+
+async def synthesize_all(texts):
+    return [await synthesize_chunk(TextChunk(0, 0, len(text), text), *ARGS) for text in texts]
+
+
+def expected_audio(text):
+    return FakeBackend(ms_per_char=MS_PER_CHAR)(text, "").events()[1]
+
+
+def test_sequential_requests_reuse_one_connection():
+    server = FakeServer(FakeBackend(latency=0, ms_per_char=MS_PER_CHAR))
+
+    async def scenario(pool):
+        results = await synthesize_all(TEXTS)
+        return results, pool.opened, pool.reused
+
+    results, opened, reused = run_with_pool(server, {}, scenario)
+    assert [result.audio for result in results] == [expected_audio(text) for text in TEXTS]
+    assert (opened, reused, server.connections) == (1, len(TEXTS) - 1, 1)
+
+
+def test_reconnects_when_server_closes_connection():
+    server = FakeServer(FakeBackend(latency=0, ms_per_char=MS_PER_CHAR), close_after_turn=True)
+
+    async def scenario(pool):
+        results = []
+        for text in TEXTS:
+            results.extend(await synthesize_all([text]))
+            # 等服务端的关闭帧到达，空闲连接随后被识别为已关闭
+            await asyncio.sleep(0.05)
+        return results, pool.opened
+
+    results, opened = run_with_pool(server, {}, scenario)
+    assert [result.audio for result in results] == [expected_audio(text) for text in TEXTS]
+    assert opened == len(TEXTS)
+    assert server.turns == len(TEXTS)
+
+
+def test_stale_connection_is_retried_on_a_new_one():
+    server = FakeServer(FakeBackend(latency=0, ms_per_char=MS_PER_CHAR))
+    reply = server.reply
+    stalled = []
+
+    async def stall_first(websocket, request_id, text):
+        # 第一个请求不应答，模拟已被服务端丢弃但尚未关闭的空闲连接
+        if not stalled:
+            stalled.append(websocket)
+            await asyncio.sleep(1)
+        return await reply(websocket, request_id, text)
+
+    async def scenario(pool):
+        await pool.prewarm(1)
+        server.reply = stall_first
+        results = await synthesize_all(TEXTS[:1])
+        return results, pool.opened, pool.reused
+
+    results, opened, reused = run_with_pool(server, {"stale_timeout": 0.2}, scenario)
+    assert results[0].audio == expected_audio(TEXTS[0])
+    assert (opened, reused) == (2, 1)
+
+
+def test_server_injects_backend_failures():
+    server = FakeServer(FakeBackend(latency=0, error_rate=1.0, ms_per_char=MS_PER_CHAR))
+
+    async def scenario(pool):
+        with pytest.raises(Exception):
+            await synthesize_all(TEXTS[:1])
+
+    run_with_pool(server, {}, scenario)
+    assert server.backend.errors >= 1
+    assert server.turns == 0
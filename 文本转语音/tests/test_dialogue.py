@@ -0,0 +1,61 @@
+import asyncio
+
+import tts_core
+from dialogue import NARRATOR, parse_script, parse_voice_mapping, synthesize_dialogue
+from fake_backend import FakeBackend
+
+
+def test_parse_script_speakers_and_paragraphs():
+    lines = parse_script("张三：你今天怎么来得这么早？\n李四: 路上不堵车。\n\n两人相视一笑。\n")
+    assert [(line.speaker, line.text) for line in lines] == [
+        ("张三", "你今天怎么来得这么早？"),
+        ("李四", "路上不堵车。"),
+        (NARRATOR, "两人相视一笑。"),
+    ]
+    assert [line.paragraph_break for line in lines] == [False, False, True]
+
+
+def test_times_and_urls_are_not_speakers():
+    lines = parse_script("10:30 开会\n10：30开会\n详见 http://example.com\nhttp://example.com/a\n")
+    assert all(line.speaker == NARRATOR for line in lines)
+    assert lines[0].text == "10:30 开会"
+    assert lines[3].text == "http://example.com/a"
+
+
+def test_known_speakers_only():
+    script = "张三：早。\n注意：这里不是角色。\n"
+    lines = parse_script(script, {"张三", NARRATOR})
+    assert [(line.speaker, line.text) for line in lines] == [
+        ("张三", "早。"),
+        (NARRATOR, "注意：这里不是角色。"),
+    ]
+    assert parse_script(script)[1].speaker == "注意"
+
+
+def test_parse_voice_mapping():
+    assert parse_voice_mapping(["张三 = zh-CN-YunxiNeural"]) == {"张三": "zh-CN-YunxiNeural"}
+    try:
+        parse_voice_mapping(["张三"])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("缺少语音时应报错")
+
+
+def test_synthesize_dialogue_uses_voice_per_speaker():
+    voices_used = []
+    backend = FakeBackend(latency=0)
+
+    def recording(text, voice, *args, **kwargs):
+        voices_used.append((text, voice))
+        return backend(text, voice, *args, **kwargs)
+
+    tts_core.set_backend(recording)
+    try:
+        lines = parse_script("甲：一。\n乙：二。\n三。")
+        audio = asyncio.run(synthesize_dialogue(lines, {"甲": "voice-a", "乙": "voice-b"}, "voice-n",
+                                                pause_ms=0, paragraph_pause_ms=0))
+    finally:
+        tts_core.set_backend(None)
+    assert sorted(voices_used) == sorted([("一。", "voice-a"), ("二。", "voice-b"), ("三。", "voice-n")])
+    assert audio
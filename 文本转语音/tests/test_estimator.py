@@ -0,0 +1,61 @@
+import pytest
+from estimator import (DurationEstimator, DEFAULT_MS_PER_UNIT, DEFAULT_WALL_RATIO, SMOOTHING,
+                       text_units, rate_factor, order_jobs, format_duration)
+
+VOICE = "zh-CN-XiaoxiaoNeural"
+
+
+@pytest.fixture
+def estimator(tmp_path):
+    return DurationEstimator(str(tmp_path / "estimator.json"))
+
+
+def test_text_units_and_rate_factor():
+    assert text_units("你好，世界") == (4, "cjk")
+    assert text_units("Hello wonderful world, it's 3.14") == (5 * 1.5, "latin")
+    assert rate_factor("+0%") == 1
+    assert rate_factor("+100%") == 0.5
+    assert rate_factor(-50) == 2
+
+
+def test_uncalibrated_estimate_uses_defaults(estimator):
+    estimate = estimator.estimate("字" * 100, VOICE, "+0%")
+    assert estimate.audio_s == pytest.approx(100 * DEFAULT_MS_PER_UNIT / 1000)
+    assert estimate.wall_s == pytest.approx(estimate.audio_s * DEFAULT_WALL_RATIO)
+    assert estimate.chunks == 1
+
+
+def test_observations_calibrate_and_persist(estimator):
+    text = "字" * 100
+    # 实际每字 300 毫秒，合成耗时为音频的一半
+    estimator.observe(text, VOICE, "+0%", audio_s=30, wall_s=15)
+    estimate = estimator.estimate(text, VOICE)
+    assert (estimate.audio_s, estimate.wall_s) == pytest.approx((30, 15))
+
+    estimator.observe(text, VOICE, "+0%", audio_s=20, wall_s=None)
+    expected = 300 + SMOOTHING * (200 - 300)
+    assert estimator.estimate(text, VOICE).audio_s == pytest.approx(expected * 100 / 1000)
+
+    estimator.save()
+    reloaded = DurationEstimator(estimator.path)
+    assert reloaded.estimate(text, VOICE).audio_s == pytest.approx(expected * 100 / 1000)
+
+
+def test_uncalibrated_voice_borrows_from_same_script(estimator):
+    estimator.observe("字" * 100, VOICE, "+0%", audio_s=30, wall_s=15)
+    assert estimator.estimate("字" * 100, "zh-CN-YunxiNeural").audio_s == pytest.approx(30)
+    assert estimator.estimate("word " * 100, "zh-CN-YunxiNeural").audio_s == pytest.approx(
+        150 * DEFAULT_MS_PER_UNIT / 1000)
+
+
+def test_order_jobs(estimator):
+    texts = ["字" * 300, "字" * 10, "字" * 100]
+    assert order_jobs(texts, estimator, VOICE) == [1, 2, 0]
+    assert order_jobs(texts, estimator, VOICE, policy="ljf") == [0, 2, 1]
+    with pytest.raises(ValueError):
+        order_jobs(texts, estimator, VOICE, policy="random")
+
+
+def test_format_duration():
+    assert format_duration(59.6) == "1:00"
+    assert format_duration(3725) == "1:02:05"
@@ -0,0 +1,102 @@
+import time
+import asyncio
+import pytest
+import tts_core
+from fair_scheduler import FairScheduler, ClientQuota, percentile
+from fake_backend import FakeBackend
+
+MS_PER_CHAR = 20
+BOOK = "".join(f"第{i}句话。" for i in range(2000))
+
+
+@pytest.fixture
+def backend():
+    backend = FakeBackend(latency=0.02, ms_per_char=MS_PER_CHAR)
+    tts_core.set_backend(backend)
+    yield backend
+    tts_core.set_backend(None)
+
+
+def run(scheduler, scenario):
+    async def main():
+        scheduler.start()
+        try:
+            return await scenario()
+        finally:
+            await scheduler.stop()
+    return asyncio.run(main())
+
+
+def test_small_request_is_not_starved_by_a_book(backend):
+    scheduler = FairScheduler(concurrency=2)
+    finished = {}
+
+    async def submit(client, text):
+        audio = await scheduler.synthesize(client, text)
+        finished[client] = time.monotonic()
+        return audio
+
+    async def scenario():
+        book = asyncio.ensure_future(submit("batch", BOOK))
+        await asyncio.sleep(0.05)
+        short = await submit("web", "你好。")
+        return await book, short
+
+    book, short = run(scheduler, scenario)
+    assert finished["web"] < finished["batch"]
+    assert short == FakeBackend(ms_per_char=MS_PER_CHAR)("你好。", "").events()[1]
+    assert book == b"".join(FakeBackend(ms_per_char=MS_PER_CHAR)(chunk.text, "").events()[1]
+                            for chunk in tts_core.split_chunks(BOOK))
+    stats = scheduler.stats()
+    assert stats["web"]["jobs_done"] == stats["batch"]["jobs_done"] == 1
+    assert stats["batch"]["chars_served"] == len(BOOK)
+
+
+def test_weights_share_workers_proportionally(backend):
+    scheduler = FairScheduler(concurrency=1, quotas={"heavy": ClientQuota(weight=3)})
+    order = []
+    original = scheduler._synthesize_chunk
+
+    async def record(job, chunk):
+        order.append(job.client)
+        return await original(job, chunk)
+    scheduler._synthesize_chunk = record
+
+    async def scenario():
+        await asyncio.gather(scheduler.synthesize("heavy", BOOK), scheduler.synthesize("light", BOOK))
+
+    run(scheduler, scenario)
+    # 两个客户端都有积压时，权重 3 的客户端得到约 3 倍的分块
+    both = order[:20]
+    assert both.count("heavy") >= 2.5 * both.count("light")
+
+
+def test_max_concurrency_quota(backend):
+    scheduler = FairScheduler(concurrency=4, quotas={"batch": ClientQuota(max_concurrency=1)})
+    peak = [0]
+    original = scheduler._synthesize_chunk
+
+    async def record(job, chunk):
+        peak[0] = max(peak[0], scheduler.client("batch").in_flight)
+        return await original(job, chunk)
+    scheduler._synthesize_chunk = record
+
+    run(scheduler, lambda: scheduler.synthesize("batch", BOOK))
+    assert peak[0] == 1
+
+
+def test_failure_is_reported_to_the_client():
+    tts_core.set_backend(FakeBackend(latency=0, error_rate=1.0))
+    try:
+        scheduler = FairScheduler(concurrency=2, max_retries=2, retry_delay=0)
+        with pytest.raises(Exception):
+            run(scheduler, lambda: scheduler.synthesize("a", "你好。"))
+        assert scheduler.stats()["a"]["jobs_failed"] == 1
+    finally:
+        tts_core.set_backend(None)
+
+
+def test_percentile():
+    assert percentile([], 0.5) is None
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(range(100), 0.99) == 99
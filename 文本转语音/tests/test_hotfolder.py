@@ -0,0 +1,85 @@
+import os
+import json
+import asyncio
+import pytest
+import tts_core
+from hotfolder import HotFolder, MANIFEST_NAME
+from audio_index import index_path
+from fake_backend import FakeBackend
+
+MS_PER_CHAR = 20
+
+
+@pytest.fixture
+def backend():
+    backend = FakeBackend(latency=0, ms_per_char=MS_PER_CHAR)
+    tts_core.set_backend(backend)
+    yield backend
+    tts_core.set_backend(None)
+
+
+def run_folder(directory, action, poll_interval=None, timeout=5):
+    """启动热文件夹，执行 action(folder) 后等待转换数达到其返回值，再停止"""
+    async def main():
+        folder = HotFolder([str(directory)], debounce=0.05, poll_interval=poll_interval)
+        runner = asyncio.ensure_future(folder.run())
+        await asyncio.sleep(0.1)
+        expected = action(folder)
+        deadline = asyncio.get_running_loop().time() + timeout
+        while folder.converted < expected and asyncio.get_running_loop().time() < deadline:
+            await asyncio.sleep(0.02)
+        # 再等一会，确认没有多余的转换
+        await asyncio.sleep(0.2)
+        folder.stop()
+        await runner
+        return folder
+    return asyncio.run(main())
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+
+
+@pytest.mark.parametrize("poll_interval", [None, 0.05])
+def test_new_text_file_is_converted(tmp_path, backend, poll_interval):
+    source = tmp_path / "a.txt"
+
+    def action(folder):
+        write(source, "第一句。第二句。")
+        (tmp_path / "ignored.md").write_text("不转换。", encoding='utf-8')
+        return 1
+
+    folder = run_folder(tmp_path, action, poll_interval)
+    assert folder.converted == 1
+    output = tmp_path / "a.mp3"
+    assert output.read_bytes() == FakeBackend(ms_per_char=MS_PER_CHAR)("第一句。第二句。", "").events()[1]
+    assert os.path.exists(index_path(str(output)))
+    assert not (tmp_path / "ignored.mp3").exists()
+    manifest = json.loads((tmp_path / MANIFEST_NAME).read_text(encoding='utf-8'))
+    assert manifest["a.txt"]["output"] == "a.mp3"
+
+
+def test_converted_files_are_skipped_after_restart(tmp_path, backend):
+    write(tmp_path / "a.txt", "内容。")
+    assert run_folder(tmp_path, lambda folder: 1).converted == 1
+    requests = backend.requests
+
+    assert run_folder(tmp_path, lambda folder: 0).converted == 0
+    assert backend.requests == requests
+
+    # 内容改变后重新转换
+    def action(folder):
+        write(tmp_path / "a.txt", "新的内容。")
+        return 1
+    assert run_folder(tmp_path, action).converted == 1
+
+
+def test_rapid_writes_are_debounced(tmp_path, backend):
+    def action(folder):
+        for i in range(5):
+            write(tmp_path / "a.txt", "句子。" * (i + 1))
+        return 1
+
+    assert run_folder(tmp_path, action).converted == 1
+    assert backend.requests == 1
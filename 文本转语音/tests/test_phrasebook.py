@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+import tts_core
+import phrasebook
+from phrasebook import Phrasebook, write_phrasebook, build
+from fake_backend import FakeBackend
+
+
+def test_round_trip_with_zero_copy_views(tmp_path):
+    path = str(tmp_path / "book.t2vp")
+    entries = [(f"提示语{i}", bytes([i % 256]) * (i + 1)) for i in range(500)]
+    assert write_phrasebook(path, entries + [(" 提示语0 ", b"replaced")], {"voice": "v"}) == 500
+    with Phrasebook(path) as book:
+        assert len(book) == 500
+        assert book.settings == {"voice": "v"}
+        for prompt, audio in entries[1:]:
+            view = book.get(prompt)
+            assert isinstance(view, memoryview) and view == audio
+            view.release()
+        # 提示语首尾空白不影响查找，重复的提示语保留最后一个
+        assert bytes(book.get("提示语0\n")) == b"replaced"
+        assert "提示语1" in book and "不存在" not in book
+        assert book.get("不存在") is None
+        assert sorted(book.prompts()) == sorted(prompt for prompt, _ in entries)
+
+
+def test_hash_collisions_compare_keys(tmp_path, monkeypatch):
+    monkeypatch.setattr(phrasebook, "key_hash", lambda key: 7)
+    path = str(tmp_path / "book.t2vp")
+    write_phrasebook(path, [("甲", b"a"), ("乙", b"b"), ("丙", b"c")])
+    with Phrasebook(path) as book:
+        assert [bytes(book.get(prompt)) for prompt in ("甲", "乙", "丙")] == [b"a", b"b", b"c"]
+        assert book.get("丁") is None
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(ValueError):
+        Phrasebook(str(path))
+
+
+def test_build_synthesizes_unique_prompts(tmp_path):
+    backend = FakeBackend(latency=0, ms_per_char=20)
+    tts_core.set_backend(backend)
+    try:
+        path = str(tmp_path / "book.t2vp")
+        count = asyncio.run(build(["请稍候。", "请稍候。 ", "", "谢谢。"], path, voice="v"))
+    finally:
+        tts_core.set_backend(None)
+    assert count == 2 and backend.requests == 2
+    with Phrasebook(path) as book:
+        assert bytes(book.get("谢谢。")) == FakeBackend(ms_per_char=20)("谢谢。", "").events()[1]
+        assert book.settings["voice"] == "v"
@@ -0,0 +1,35 @@
+import time
+
+from progress import ConversionProgress
+from tts_core import BYTES_PER_MS
+
+
+def test_updates_are_coalesced_and_retries_discard_audio():
+    snapshots = []
+    progress = ConversionProgress(2, emit=snapshots.append, interval=60)
+    progress.chunk_started(0)
+    progress.audio_received(0, 1000)
+    # 重试时上一次收到的音频不计入
+    progress.chunk_started(0)
+    progress.audio_received(0, 600)
+    progress.chunk_done(0)
+    assert snapshots == []
+
+    progress.flush()
+    snapshot = snapshots[-1]
+    assert (snapshot.chunks_done, snapshot.chunks_total) == (1, 2)
+    assert snapshot.bytes_received == 1600
+    assert snapshot.audio_s == 600 / BYTES_PER_MS / 1000
+
+
+def test_emits_at_most_once_per_interval():
+    snapshots = []
+    progress = ConversionProgress(1, emit=snapshots.append, interval=0.05)
+    for _ in range(100):
+        progress.audio_received(0, 10)
+    assert len(snapshots) <= 1
+    time.sleep(0.06)
+    progress.audio_received(0, 10)
+    assert len(snapshots) >= 1
+    assert snapshots[-1].bytes_per_s > 0
+    assert snapshots[-1].idle_s < 0.05
@@ -0,0 +1,88 @@
+import os
+import asyncio
+import threading
+import pytest
+import tts_core
+from tts_core import TextChunk, synthesize_chunk_cached
+from sentence_cache import SentenceCache
+from fake_backend import FakeBackend
+
+ARGS = ("zh-CN-XiaoxiaoNeural", "+0%", "+0%")
+
+
+@pytest.fixture
+def backend():
+    backend = FakeBackend(latency=0, ms_per_char=20)
+    tts_core.set_backend(backend)
+    yield backend
+    tts_core.set_backend(None)
+
+
+def test_put_get_round_trip(tmp_path):
+    cache = SentenceCache(str(tmp_path))
+    assert cache.get(*ARGS, "你好。") is None
+    cache.put(*ARGS, "你好。", b"audio")
+    # 键忽略句子首尾的空白
+    assert cache.get(*ARGS, " 你好。\n") == b"audio"
+    assert cache.get("zh-CN-YunxiNeural", "+0%", "+0%", "你好。") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    cache.flush()
+    assert os.path.exists(cache.path(cache.key(*ARGS, "你好。")))
+    assert SentenceCache(str(tmp_path)).get(*ARGS, "你好。") == b"audio"
+
+
+def test_put_does_not_write_on_the_calling_thread(tmp_path, monkeypatch):
+    cache = SentenceCache(str(tmp_path), max_bytes=1000)
+    caller = threading.get_ident()
+    writers = set()
+    write = cache._write
+    monkeypatch.setattr(cache, "_write", lambda *args: (writers.add(threading.get_ident()), write(*args)))
+    for i in range(5):
+        cache.put(*ARGS, f"第{i}句。", bytes(100))
+    cache.flush()
+    assert writers and caller not in writers
+    # 重写同一句子时按差值更新总大小
+    cache.put(*ARGS, "第0句。", bytes(40))
+    cache.flush()
+    assert cache._size == 440
+
+
+def test_prune_removes_least_recently_used(tmp_path):
+    cache = SentenceCache(str(tmp_path), max_bytes=None)
+    for i, sentence in enumerate(("一。", "二。", "三。")):
+        cache.put(*ARGS, sentence, bytes(100))
+        cache.flush()
+        path = cache.path(cache.key(*ARGS, sentence))
+        os.utime(path, (1000 + i, 1000 + i))
+    # 读取会刷新修改时间，"一。"变为最近使用
+    cache.get(*ARGS, "一。")
+    assert cache.prune(200) == 1
+    assert not cache.contains(*ARGS, "二。")
+    assert cache.contains(*ARGS, "一。") and cache.contains(*ARGS, "三。")
+
+
+def test_put_keeps_total_size_within_budget(tmp_path):
+    cache = SentenceCache(str(tmp_path), max_bytes=1000)
+    for i in range(30):
+        cache.put(*ARGS, f"第{i}句。", bytes(100))
+    cache.flush()
+    assert sum(size for _, size, _ in cache._files()) <= 1000
+    assert cache.contains(*ARGS, "第29句。")
+
+
+def test_cached_synthesis_reuses_sentences(tmp_path, backend):
+    cache = SentenceCache(str(tmp_path))
+    text = "第一句。第二句。第三句。"
+    chunk = TextChunk(0, 0, len(text), text)
+
+    first = asyncio.run(synthesize_chunk_cached(chunk, *ARGS, cache))
+    requests = backend.requests
+    second = asyncio.run(synthesize_chunk_cached(chunk, *ARGS, cache))
+    assert backend.requests == requests
+    assert second.audio == first.audio
+    assert [sentence for _, sentence in second.boundaries] == ["第一句。", "第二句。", "第三句。"]
+
+    # 只有新句子需要合成
+    text = "第二句。新的一句。"
+    asyncio.run(synthesize_chunk_cached(TextChunk(0, 0, len(text), text), *ARGS, cache))
+    assert backend.requests == requests + 1
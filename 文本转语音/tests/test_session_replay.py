@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+import tts_core
+from tts_core import TextChunk, synthesize_chunk
+from fake_backend import FakeBackend
+from session_replay import RecordingBackend, ReplayBackend, ReplayedError, ReplayMiss
+
+ARGS = ("zh-CN-XiaoxiaoNeural", "+0%", "+0%")
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    yield
+    tts_core.set_backend(None)
+
+
+def synthesize(text):
+    return asyncio.run(synthesize_chunk(TextChunk(0, 0, len(text), text), *ARGS))
+
+
+def record(path, texts, backend):
+    tts_core.set_backend(RecordingBackend(str(path), backend))
+    results = []
+    for text in texts:
+        try:
+            results.append(synthesize(text))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def test_replay_reproduces_recorded_sessions(tmp_path):
+    path = tmp_path / "sessions.jsonl"
+    recorded = record(path, ["第一句。第二句。", "第三句。"], FakeBackend(latency=0, ms_per_char=20))
+
+    replay = ReplayBackend(str(path), speed=0, strict=True)
+    tts_core.set_backend(replay)
+    for text, expected in zip(["第一句。第二句。", "第三句。"], recorded):
+        result = synthesize(text)
+        assert result.audio == expected.audio
+        assert result.boundaries == expected.boundaries
+    with pytest.raises(ReplayMiss):
+        synthesize("没有录制的句子。")
+    assert (replay.requests, replay.misses) == (3, 1)
+
+
+def test_lenient_replay_cycles_sessions_and_replays_errors(tmp_path):
+    path = tmp_path / "sessions.jsonl"
+    results = record(path, ["好。"], FakeBackend(latency=0, error_rate=1.0))
+    assert isinstance(results[0], Exception)
+
+    replay = ReplayBackend(str(path), speed=0)
+    tts_core.set_backend(replay)
+    with pytest.raises(ReplayedError):
+        synthesize("完全不同的文本。")
+    assert (replay.misses, replay.errors) == (1, 1)
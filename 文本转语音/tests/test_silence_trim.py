@@ -0,0 +1,98 @@
+import io
+import pytest
+
+np = pytest.importorskip("numpy")
+soundfile = pytest.importorskip("soundfile")
+import silence_trim
+from silence_trim import trim_chunk, trim_results, frame_levels, silent_runs, MARGIN_FRAMES
+from tts_core import TextChunk, ChunkAudio, FRAME_BYTES, FRAME_MS, TICKS_PER_MS, silence
+
+if not silence_trim.AVAILABLE:
+    pytest.skip("需要支持 MP3 的 soundfile（libsndfile 1.1 以上）", allow_module_level=True)
+
+RATE = 24000
+
+
+def tone(ms):
+    t = np.arange(int(RATE * ms / 1000)) / RATE
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def quiet(ms):
+    return np.zeros(int(RATE * ms / 1000), dtype=np.float32)
+
+
+def encode(samples):
+    """编码为 48kbps CBR MP3 帧（去掉开头的 Info 帧）"""
+    buffer = io.BytesIO()
+    soundfile.write(buffer, samples, RATE, format='MP3', bitrate_mode='CONSTANT', compression_level=0.72)
+    return buffer.getvalue()[FRAME_BYTES:]
+
+
+def speech_runs(audio):
+    """[(开始毫秒, 结束毫秒)]：非静音的区间"""
+    silent = frame_levels(audio) < silence_trim.SILENCE_DB
+    runs = silent_runs(~silent)
+    return [(start * FRAME_MS, end * FRAME_MS) for start, end in runs]
+
+
+@pytest.fixture(scope="module")
+def chunk_audio():
+    # 开头 600ms 静音，第一句 1000ms，段落间 1500ms，第二句中 100ms 的逗号停顿，结尾 700ms 静音
+    samples = np.concatenate([quiet(600), tone(1000), quiet(1500), tone(800), quiet(100), tone(500),
+                              quiet(700)])
+    audio = encode(samples)
+    assert silence_trim.is_frame_aligned(audio)
+    text = "第一句。\n第二句，还有三。"
+    boundaries = [(int(600 * TICKS_PER_MS), "第一句。"), (int(3100 * TICKS_PER_MS), "第二句，还有三。")]
+    return TextChunk(0, 0, len(text), text), ChunkAudio(audio, boundaries)
+
+
+def test_pauses_are_normalized(chunk_audio):
+    chunk, result = chunk_audio
+    trimmed = trim_chunk(chunk, result, trailing_ms=400)
+    runs = speech_runs(trimmed.audio)
+    assert len(runs) == 3
+    # 开头只保留 MARGIN_FRAMES 帧，段落停顿为 900ms，逗号停顿不变
+    assert runs[0][0] <= (MARGIN_FRAMES + 1) * FRAME_MS
+    assert abs((runs[1][0] - runs[0][1]) - silence_trim.PARAGRAPH_PAUSE_MS) <= 3 * FRAME_MS
+    assert abs((runs[2][0] - runs[1][1]) - 100) <= 3 * FRAME_MS
+    total_ms = len(trimmed.audio) / FRAME_BYTES * FRAME_MS
+    assert abs((total_ms - runs[2][1]) - 400) <= 3 * FRAME_MS
+    # 结果仍可完整解码
+    samples, _ = soundfile.read(io.BytesIO(trimmed.audio))
+    assert len(samples) > 0
+
+
+def test_boundaries_follow_trimmed_audio(chunk_audio):
+    chunk, result = chunk_audio
+    trimmed = trim_chunk(chunk, result, trailing_ms=400)
+    runs = speech_runs(trimmed.audio)
+    times = [ticks / TICKS_PER_MS for ticks, _ in trimmed.boundaries]
+    assert [text for _, text in trimmed.boundaries] == [text for _, text in result.boundaries]
+    for ms, (start, _) in zip(times, [runs[0], runs[1]]):
+        assert abs(ms - start) <= 3 * FRAME_MS
+
+
+def test_unalignable_or_silent_audio_is_unchanged():
+    chunk = TextChunk(0, 0, 3, "句子。")
+    odd = ChunkAudio(b"\x00" * 100, [])
+    assert trim_chunk(chunk, odd, 400) is odd
+    only_silence = ChunkAudio(silence(1000), [])
+    assert trim_chunk(chunk, only_silence, 400) is only_silence
+
+
+def test_trim_results_inserts_pauses_between_chunks(chunk_audio):
+    chunk, result = chunk_audio
+    # split_chunks 不把句子之间的换行放进分块，分块之间留有空隙
+    chunks = [TextChunk(0, 0, 4, "第一句。"), TextChunk(1, 5, 9, "第二句。"), TextChunk(2, 9, 13, "第三句。")]
+    trimmed = trim_results(chunks, [result] * 3)
+
+    def trailing_pause(item):
+        return len(item.audio) / FRAME_BYTES * FRAME_MS - speech_runs(item.audio)[-1][1]
+
+    # 第一个分块之后是换行，为段落停顿；第二个分块之后是句间停顿；最后一个分块不留结尾停顿
+    assert abs(trailing_pause(trimmed[0]) - silence_trim.PARAGRAPH_PAUSE_MS) <= 3 * FRAME_MS
+    assert abs(trailing_pause(trimmed[1]) - silence_trim.SENTENCE_PAUSE_MS) <= 3 * FRAME_MS
+    last = trimmed[2]
+    assert len(last.audio) / FRAME_BYTES * FRAME_MS - speech_runs(last.audio)[-1][1] <= 3 * FRAME_MS
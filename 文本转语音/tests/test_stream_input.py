@@ -0,0 +1,40 @@
+from stream_input import SentenceSegmenter
+
+
+def test_terminated_sentences_are_emitted_immediately():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("你好。今天") == ["你好。"]
+    assert segmenter.feed("天气不错。") == ["今天天气不错。"]
+    assert segmenter.feed("第一行\n") == ["第一行"]
+    assert segmenter.flush() == []
+
+
+def test_ambiguous_ending_waits_for_more_text():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("It is 3.") == []
+    assert segmenter.feed("14 now. Next") == ["It is 3.14 now."]
+    assert segmenter.feed(" one!") == []
+    assert segmenter.feed("?") == []
+    assert segmenter.flush() == ["Next one!?"]
+
+
+def test_closing_quote_stays_with_sentence():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("他说：“走吧。”好") == ["他说：“走吧。”"]
+    # 中文句号已明确结束句子，之后单独到达的引号没有可朗读的文字
+    assert segmenter.feed("。") == ["好。"]
+    assert segmenter.feed("”") == []
+    assert segmenter.flush() == []
+
+
+def test_long_pending_text_is_cut_at_soft_break():
+    segmenter = SentenceSegmenter(max_pending=20)
+    sentences = segmenter.feed("一二三四五六七八九十，" * 3)
+    assert sentences == ["一二三四五六七八九十，", "一二三四五六七八九十，"]
+    assert segmenter.flush() == ["一二三四五六七八九十，"]
+
+
+def test_punctuation_only_fragments_are_dropped():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("……\n") == []
+    assert segmenter.flush() == []
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+import tts_core
+import tts_api
+from fake_backend import FakeBackend
+
+MS_PER_CHAR = 20
+
+
+class RewritingBackend(FakeBackend):
+    """第一个边界事件的文本被服务端改写，无法在原文中定位"""
+
+    def __call__(self, text, voice, rate="+0%", volume="+0%", **kwargs):
+        communicate = super().__call__(text, voice, rate, volume, **kwargs)
+        events = communicate.events
+
+        def rewritten():
+            boundaries, audio = events()
+            boundaries[0]["text"] = "改写过的文本"
+            return boundaries, audio
+        communicate.events = rewritten
+        return communicate
+
+
+@pytest.fixture
+def backend():
+    backend = FakeBackend(latency=0, ms_per_char=MS_PER_CHAR)
+    tts_core.set_backend(backend)
+    yield backend
+    tts_core.set_backend(None)
+
+
+def expected_audio(text):
+    return FakeBackend(ms_per_char=MS_PER_CHAR)(text, "").events()[1]
+
+
+async def collect(text, **kwargs):
+    return [event async for event in tts_api.stream(text, **kwargs)]
+
+
+def test_synthesize_matches_backend_audio(backend):
+    text = "第一句。第二句。"
+    assert tts_api.synthesize(text) == expected_audio(text)
+    assert tts_api.synthesize("  ") == b""
+
+
+def test_stream_yields_chunks_in_order_with_offsets(backend):
+    text = "".join(f"第{i}句话。" for i in range(300))
+    events = asyncio.run(collect(text, concurrency=4))
+    audio = b"".join(event["data"] for event in events if event["type"] == "audio")
+    assert audio == tts_api.synthesize(text)
+    boundaries = [event for event in events if event["type"] == "SentenceBoundary"]
+    assert len(boundaries) == 300
+    for event in boundaries:
+        assert text[event["text_offset"]:].startswith(event["text"])
+    offsets = [event["offset"] for event in boundaries]
+    assert offsets == sorted(offsets)
+
+
+def test_stream_keeps_offsets_aligned_after_unlocatable_boundary():
+    tts_core.set_backend(RewritingBackend(latency=0, ms_per_char=MS_PER_CHAR))
+    try:
+        events = asyncio.run(collect("第一句。第二句。第三句。"))
+    finally:
+        tts_core.set_backend(None)
+    offsets = [event["text_offset"] for event in events if event["type"] == "SentenceBoundary"]
+    assert offsets == [None, 4, 8]
+
+
+def test_synthesize_many_keeps_input_order(backend):
+    texts = ["甲。" * 300, "乙。", "", "丙。" * 10]
+    results = tts_api.synthesize_many(texts, concurrency=3, order=[3, 1, 0, 2])
+    assert results == [expected_audio(text) if text else b"" for text in texts]
@@ -0,0 +1,46 @@
+import os
+import pytest
+from tts_core import split_sentences, split_chunks, atomic_write
+
+
+def sentences(text):
+    return [text[start:end].strip() for start, end in split_sentences(text)]
+
+
+def test_split_sentences_on_chinese_and_ascii_punctuation():
+    assert sentences("你好。今天呢？好！\n下一行") == ["你好。", "今天呢？", "好！", "下一行"]
+    assert sentences("Hello world. Pi is 3.14, see example.com! Done.") == [
+        "Hello world.", "Pi is 3.14, see example.com!", "Done."]
+
+
+def test_chunks_cover_text_without_gaps():
+    text = "".join(f"第{i}句话。" for i in range(500))
+    chunks = split_chunks(text, max_chars=100)
+    assert "".join(chunk.text for chunk in chunks) == text
+    assert all(len(chunk.text) <= 100 for chunk in chunks)
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+    # 分块只在句子边界处切开
+    assert all(chunk.text.endswith("。") for chunk in chunks)
+
+
+def test_long_sentence_is_cut_at_soft_break():
+    text = "word " * 100
+    chunks = split_chunks(text, max_chars=48)
+    assert "".join(chunk.text for chunk in chunks) == text
+    assert all(chunk.text.endswith(" ") for chunk in chunks)
+    assert [len(chunk.text) for chunk in split_chunks("字" * 250, max_chars=100)] == [100, 100, 50]
+
+
+def test_atomic_write_replaces_file_and_cleans_up_on_error(tmp_path):
+    path = str(tmp_path / "out.mp3")
+    atomic_write(path, (b"ab", b"cd"))
+    assert open(path, 'rb').read() == b"abcd"
+
+    def failing():
+        yield b"partial"
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        atomic_write(path, failing())
+    assert open(path, 'rb').read() == b"abcd"
+    assert os.listdir(tmp_path) == ["out.mp3"]
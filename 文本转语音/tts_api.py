@@ -0,0 +1,123 @@
+"""可嵌入其他程序的文本转语音接口
+
+    import tts_api
+    audio = tts_api.synthesize("你好，世界。", voice="zh-CN-XiaoxiaoNeural")
+
+    async for event in tts_api.stream(text):
+        if event["type"] == "audio":
+            ...
+
+同步接口在进程内共享的后台事件循环中执行，可在任意线程调用（后台循环线程本身除外）。
+"""
+import asyncio
+from tts_core import (TextChunk, TICKS_PER_MS, locate_boundaries, split_chunks,
+                      synthesize_chunk, synthesize_chunk_cached, synthesize_scheduled)
+from chunk_scheduler import PlayheadScheduler
+from connection_pool import shared_loop
+
+DEFAULT_VOICE = "zh-CN-XiaoxiaoNeural"
+# 界面中列出的语音：显示名称 -> 语音 ID
+VOICES = {
+    '晓晓（女）': 'zh-CN-XiaoxiaoNeural',
+    '云希（男）': 'zh-CN-YunxiNeural',
+    '云扬（男）': 'zh-CN-YunyangNeural',
+    '云健（男）': 'zh-CN-YunjianNeural',
+    '晓忆（女）': 'zh-CN-XiaoyiNeural',
+    '云霞（女）': 'zh-CN-YunxiaNeural',
+    '晓北（女）': 'zh-CN-XiaobeiNeural',
+    '晓曼（女，香港）': 'zh-HK-HiuMaanNeural',
+    '云龙（男，香港）': 'zh-HK-WanLungNeural',
+    '晓佳（女，香港）': 'zh-HK-HiuGaaiNeural',
+    '晓晨（女，台湾）': 'zh-TW-HsiaoChenNeural',
+    '云哲（男，台湾）': 'zh-TW-YunJheNeural',
+    '晓宇（女，台湾）': 'zh-TW-HsiaoYuNeural'
+}
+
+
+async def synthesize_async(text, voice=DEFAULT_VOICE, rate="+0%", volume="+0%",
+                           concurrency=3, cache=None):
+    """合成整段文本，返回 MP3 数据"""
+    chunks = split_chunks(text)
+    if not chunks:
+        return b""
+    results = await synthesize_scheduled(chunks, PlayheadScheduler(len(chunks)), voice, rate, volume,
+                                         concurrency=concurrency, cache=cache)
+    return b"".join(result.audio for result in results)
+
+
+def synthesize(text, voice=DEFAULT_VOICE, rate="+0%", volume="+0%", concurrency=3, cache=None):
+    """synthesize_async 的同步版本"""
+    return shared_loop().submit(synthesize_async(text, voice, rate, volume, concurrency, cache)).result()
+
+
+async def stream(text, voice=DEFAULT_VOICE, rate="+0%", volume="+0%", concurrency=3, cache=None):
+    """按文本顺序逐块产出音频和边界事件
+
+    产出的字典与 edge_tts.Communicate.stream() 相同：
+    {"type": "audio", "data": bytes} 或
+    {"type": "SentenceBoundary", "offset": 时间刻度, "duration": 0, "text": str, "text_offset": int}，
+    其中 offset 是相对整段音频起点的时间（100 纳秒），text_offset 为句子在 text 中的字符偏移。
+    后面的分块会提前并发合成，最多同时进行 concurrency 个请求。
+    """
+    chunks = split_chunks(text)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def synthesize_one(chunk):
+        async with semaphore:
+            if cache is not None:
+                return await synthesize_chunk_cached(chunk, voice, rate, volume, cache)
+            return await synthesize_chunk(chunk, voice, rate, volume)
+
+    tasks = {}
+    base_ms = 0
+    try:
+        for index, chunk in enumerate(chunks):
+            # 保持 concurrency 个分块在前方预先合成
+            for ahead in range(index, min(index + concurrency, len(chunks))):
+                if ahead not in tasks:
+                    tasks[ahead] = asyncio.ensure_future(synthesize_one(chunks[ahead]))
+            result = await tasks.pop(index)
+
+            for (ticks, sentence), text_offset in zip(result.boundaries,
+                                                      locate_boundaries(chunk, result.boundaries)):
+                yield {
+                    "type": "SentenceBoundary",
+                    "offset": int(base_ms * TICKS_PER_MS) + ticks,
+                    "duration": 0,
+                    "text": sentence,
+                    "text_offset": text_offset,
+                }
+            yield {"type": "audio", "data": result.audio}
+            base_ms += result.duration_ms
+    finally:
+        for task in tasks.values():
+            task.cancel()
+
+
+async def synthesize_many_async(texts, voice=DEFAULT_VOICE, rate="+0%", volume="+0%",
+                                concurrency=4, cache=None, order=None):
+    """批量合成多段文本，返回与 texts 顺序一致的 MP3 数据列表
+
+    所有文本的分块放入同一个调度器，总并发请求数不超过 concurrency。
+    order 为文本下标的合成顺序（例如 estimator.order_jobs 的结果），默认按 texts 顺序。
+    """
+    chunks = []
+    ranges = [(0, 0)] * len(texts)
+    for i in (range(len(texts)) if order is None else order):
+        first = len(chunks)
+        for chunk in split_chunks(texts[i]):
+            chunks.append(TextChunk(len(chunks), chunk.start, chunk.end, chunk.text))
+        ranges[i] = (first, len(chunks))
+    if not chunks:
+        return [b"" for _ in ranges]
+
+    results = await synthesize_scheduled(chunks, PlayheadScheduler(len(chunks)), voice, rate, volume,
+                                         concurrency=concurrency, cache=cache)
+    return [b"".join(result.audio for result in results[first:last]) for first, last in ranges]
+
+
+def synthesize_many(texts, voice=DEFAULT_VOICE, rate="+0%", volume="+0%", concurrency=4, cache=None,
+                    order=None):
+    """synthesize_many_async 的同步版本"""
+    return shared_loop().submit(
+        synthesize_many_async(list(texts), voice, rate, volume, concurrency, cache, order)).result()
@@ -0,0 +1,348 @@
+import os
+import re
+import asyncio
+from bisect import bisect_right
+from edge_tts import Communicate
+
+# 单个分块的最大字符数，过长的文本按句子边界切分后分块合成
+MAX_CHUNK_CHARS = 1000
+
+# edge-tts 输出为 24kHz、48kbps 的单声道 CBR MP3，每帧 576 个采样
+FRAME_BYTES = 144
+FRAME_MS = 24
+BYTES_PER_MS = FRAME_BYTES / FRAME_MS
+# 边界事件的时间单位为 100 纳秒
+TICKS_PER_MS = 10000
+# MPEG-2 Layer III、48kbps、24kHz、单声道的静音帧（边信息全零）
+SILENT_FRAME = b'\xff\xf3\x64\xc0' + bytes(FRAME_BYTES - 4)
+# 帧头之后是 9 字节边信息，其余为主数据；main_data_begin 只有 8 位，最多回溯 255 字节
+SIDE_INFO_BYTES = 9
+MAIN_DATA_BYTES = FRAME_BYTES - 4 - SIDE_INFO_BYTES
+MAX_RESERVOIR = 255
+
+# 合成后端，接口与 edge_tts.Communicate 一致，可替换为本地替身
+_backend = Communicate
+
+# 句末标点（含紧随其后的引号、括号）或换行视为句子边界
+# 英文句号只在其后是空白或文本结尾时才算句末，避免切开 3.14、example.com 等
+_SENTENCE_END = re.compile(r'[。！？!?；;…]+[”’」』）)"\']*|\.+[”’」』）)"\']*(?=\s|$)|\n+')
+# 超长句子优先在逗号或空白处切开
+_SOFT_BREAK = re.compile(r'[，,、：:\s]')
+
+
+class TextChunk:
+    """文本分块，记录其在原文中的位置"""
+
+    def __init__(self, index, start, end, text):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __repr__(self):
+        return f"TextChunk({self.index}, {self.start}, {self.end})"
+
+
+class ChunkAudio:
+    """分块合成结果：音频数据及边界事件 (时间刻度, 文本)"""
+
+    def __init__(self, audio, boundaries):
+        self.audio = audio
+        self.boundaries = boundaries
+
+    @property
+    def duration_ms(self):
+        return audio_duration_ms(self.audio)
+
+
+def audio_duration_ms(audio):
+    """根据 CBR 码率计算音频时长（毫秒）"""
+    return len(audio) / BYTES_PER_MS
+
+
+def silence(ms):
+    """生成指定时长（按帧取整）的静音 MP3 数据"""
+    return SILENT_FRAME * max(int(round(ms / FRAME_MS)), 0)
+
+
+def set_backend(communicate_cls=None):
+    """替换合成后端，传入 None 时恢复为 edge_tts.Communicate"""
+    global _backend
+    _backend = communicate_cls or Communicate
+
+
+def get_backend():
+    """当前使用的合成后端"""
+    return _backend
+
+
+def atomic_write(path, parts):
+    """把各段数据写入同目录下的隐藏临时文件，落盘后重命名为 path，读取方不会看到写了一半的文件
+
+    写入失败时删除临时文件并重新抛出异常，原有的 path 保持不变。
+    """
+    directory, name = os.path.split(path)
+    temp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, 'wb') as file:
+            for part in parts:
+                file.write(part)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def frame_offset(ms):
+    """毫秒位置向下对齐到 MP3 帧边界后的字节偏移"""
+    return int(ms // FRAME_MS) * FRAME_BYTES
+
+
+def detach_reservoir(frames):
+    """切点之后的帧可能从被删除的帧中读取比特池数据，把这些帧的边信息清零，使其解码为静音
+
+    清零的只是边信息，帧内的主数据仍然保留。有的解码器（mpg123）只经由前一帧接续比特池，
+    所以清零的帧把 main_data_begin 设为当前可回溯的字节数，之后的帧仍能取到完整的数据。
+    遇到第一个不越过切点的帧后，其后的帧与原始音频一致，无需处理。
+    """
+    available = 0
+    for position in range(0, len(frames), FRAME_BYTES):
+        if frames[position + 4] <= available:
+            break
+        frames[position + 4:position + 4 + SIDE_INFO_BYTES] = bytes(SIDE_INFO_BYTES)
+        frames[position + 4] = available
+        available = min(available + MAIN_DATA_BYTES, MAX_RESERVOIR)
+    return frames
+
+
+def standalone_frames(audio):
+    """从整段音频中切出的帧单独保存或拼到其他音频之后前，去掉对切点之前帧的比特池引用
+
+    不是等长帧的音频原样返回。
+    """
+    if not audio or len(audio) % FRAME_BYTES or any(
+            audio[position:position + 2] != SILENT_FRAME[:2] for position in range(0, len(audio), FRAME_BYTES)):
+        return audio
+    return bytes(detach_reservoir(bytearray(audio)))
+
+
+def join_chunk_audio(parts):
+    """拼接多段 ChunkAudio，边界事件时间按前面音频的时长顺延"""
+    audio = bytearray()
+    boundaries = []
+    for part in parts:
+        base_ticks = int(audio_duration_ms(audio) * TICKS_PER_MS)
+        boundaries += [(ticks + base_ticks, text) for ticks, text in part.boundaries]
+        audio.extend(part.audio)
+    return ChunkAudio(bytes(audio), boundaries)
+
+
+def split_sentences(text):
+    """按句子切分文本，返回 (start, end) 区间列表，跳过纯空白片段"""
+    spans = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        end = match.end()
+        if text[start:end].strip():
+            spans.append((start, end))
+        start = end
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+
+def split_chunks(text, max_chars=MAX_CHUNK_CHARS, sentences=None):
+    """将文本按句子边界合并为不超过 max_chars 的分块
+
+    sentences 为已经计算好的 split_sentences(text) 结果，可避免重复切分。
+    """
+    spans = []
+    for start, end in (split_sentences(text) if sentences is None else sentences):
+        # 超长句子在 max_chars 以内最后一个逗号或空白处切开，没有时才按长度硬切
+        while end - start > max_chars:
+            cut = soft_break(text, start, start + max_chars) or start + max_chars
+            spans.append((start, cut))
+            start = cut
+        spans.append((start, end))
+
+    chunks = []
+    chunk_start = chunk_end = None
+    for start, end in spans:
+        if chunk_start is not None and end - chunk_start > max_chars:
+            chunks.append(TextChunk(len(chunks), chunk_start, chunk_end, text[chunk_start:chunk_end]))
+            chunk_start = None
+        if chunk_start is None:
+            chunk_start = start
+        chunk_end = end
+    if chunk_start is not None:
+        chunks.append(TextChunk(len(chunks), chunk_start, chunk_end, text[chunk_start:chunk_end]))
+    return chunks
+
+
+def soft_break(text, start, end):
+    """text[start:end] 中最后一个逗号或空白之后的位置，没有时返回 None"""
+    breaks = [match.end() for match in _SOFT_BREAK.finditer(text, start, end)]
+    return breaks[-1] if breaks and breaks[-1] > start else None
+
+
+def chunk_index_at(chunks, offset):
+    """返回包含字符偏移 offset 的分块序号"""
+    if not chunks:
+        return 0
+    starts = [chunk.start for chunk in chunks]
+    return max(bisect_right(starts, offset) - 1, 0)
+
+
+def locate_boundaries(chunk, boundaries):
+    """每个边界事件在原文中的字符偏移，与 boundaries 一一对应，无法定位的为 None"""
+    located = []
+    cursor = 0
+    for _, text in boundaries:
+        found = chunk.text.find(text, cursor) if text else -1
+        if found < 0:
+            # 服务端可能改写了文本（如转义字符），无法定位
+            located.append(None)
+            continue
+        located.append(chunk.start + found)
+        cursor = found + len(text)
+    return located
+
+
+def boundary_offsets(chunk, boundaries):
+    """将分块的边界事件映射为 (原文字符偏移, 分块内毫秒) 列表，跳过无法定位的事件"""
+    return [(offset, ticks / TICKS_PER_MS)
+            for offset, (ticks, _) in zip(locate_boundaries(chunk, boundaries), boundaries) if offset is not None]
+
+
+def split_audio_by_sentences(chunk, result, spans):
+    """按句子切分分块音频
+
+    spans 为分块内的句子区间，返回 [(start, end, audio)]。
+    找不到起始边界事件的句子无法单独切出，会并入前一段。
+    """
+    cuts = {offset - chunk.start: ms for offset, ms in boundary_offsets(chunk, result.boundaries)}
+    segments = []
+    for start, end in spans:
+        sentence = chunk.text[start:end]
+        ms = cuts.get(start + len(sentence) - len(sentence.lstrip()))
+        if not segments:
+            segments.append([start, end, 0])
+        elif ms is None or frame_offset(ms) <= segments[-1][2]:
+            segments[-1][1] = end
+        else:
+            segments.append([start, end, min(frame_offset(ms), len(result.audio))])
+
+    pieces = []
+    for i, (start, end, position) in enumerate(segments):
+        next_position = segments[i + 1][2] if i + 1 < len(segments) else len(result.audio)
+        pieces.append((start, end, result.audio[position:next_position]))
+    return pieces
+
+
+async def synthesize_chunk(chunk, voice, rate, volume, on_audio=None):
+    """合成单个分块，返回 ChunkAudio；on_audio(字节数) 在每次收到音频数据时调用"""
+    communicate = _backend(chunk.text, voice, rate=rate, volume=volume)
+    audio = bytearray()
+    boundaries = []
+    async for message in communicate.stream():
+        if message["type"] == "audio":
+            audio.extend(message["data"])
+            if on_audio:
+                on_audio(len(message["data"]))
+        elif message["type"] in ("WordBoundary", "SentenceBoundary"):
+            boundaries.append((message["offset"], message["text"]))
+    return ChunkAudio(bytes(audio), boundaries)
+
+
+async def synthesize_chunk_cached(chunk, voice, rate, volume, cache, on_audio=None):
+    """借助句子缓存合成分块，只合成缓存中没有的句子"""
+    spans = split_sentences(chunk.text)
+    if not spans:
+        return await synthesize_chunk(chunk, voice, rate, volume, on_audio)
+    cached = [cache.get(voice, rate, volume, chunk.text[start:end]) for start, end in spans]
+
+    parts = []
+    i = 0
+    while i < len(spans):
+        if cached[i] is not None:
+            start, end = spans[i]
+            parts.append(ChunkAudio(cached[i], [(0, chunk.text[start:end].strip())]))
+            if on_audio:
+                on_audio(len(cached[i]))
+            i += 1
+            continue
+
+        # 连续的未缓存句子合并为一次请求
+        j = i
+        while j < len(spans) and cached[j] is None:
+            j += 1
+        run_start, run_end = spans[i][0], spans[j - 1][1]
+        run = TextChunk(chunk.index, chunk.start + run_start, chunk.start + run_end,
+                        chunk.text[run_start:run_end])
+        result = await synthesize_chunk(run, voice, rate, volume, on_audio)
+
+        run_spans = [(start - run_start, end - run_start) for start, end in spans[i:j]]
+        for start, end, audio in split_audio_by_sentences(run, result, run_spans):
+            if (start, end) in run_spans and audio:
+                # 缓存的句子之后会拼在其他音频之后，不能引用原来前一句的比特池
+                cache.put(voice, rate, volume, run.text[start:end], standalone_frames(audio))
+        parts.append(result)
+        i = j
+    return join_chunk_audio(parts)
+
+
+async def synthesize_scheduled(chunks, scheduler, voice, rate, volume,
+                               concurrency=3, max_retries=3, retry_delay=1,
+                               on_chunk_start=None, on_chunk_done=None, is_cancelled=None, cache=None,
+                               on_audio=None, on_result=None):
+    """按调度器给出的顺序并发合成分块，返回按分块顺序排列的 ChunkAudio 列表
+
+    on_chunk_start(index) 在分块每次开始（包括重试）时调用，on_audio(index, 字节数) 在收到音频数据时调用，
+    on_result(index, ChunkAudio) 在分块合成成功后、on_chunk_done 之前调用。
+    调度器中开始前已标记完成的分块不会合成，其结果为 None。
+    """
+    results = [None] * len(chunks)
+
+    async def worker():
+        while not (is_cancelled and is_cancelled()):
+            index = scheduler.next_chunk()
+            if index is None:
+                return
+            received = (lambda size, index=index: on_audio(index, size)) if on_audio else None
+            retries = 0
+            while True:
+                if on_chunk_start:
+                    on_chunk_start(index)
+                try:
+                    if cache is not None:
+                        results[index] = await synthesize_chunk_cached(chunks[index], voice, rate, volume, cache,
+                                                                       received)
+                    else:
+                        results[index] = await synthesize_chunk(chunks[index], voice, rate, volume, received)
+                    break
+                except Exception as e:
+                    retries += 1
+                    if retries >= max_retries:
+                        scheduler.requeue(index)
+                        raise
+                    print(f"分块 {index} 转换失败，正在重试 ({retries}/{max_retries}): {str(e)}")
+                    await asyncio.sleep(retry_delay)
+            if on_result:
+                on_result(index, results[index])
+            scheduler.mark_done(index)
+            if on_chunk_done:
+                on_chunk_done(index)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(max(1, min(concurrency, len(chunks))))]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        # 某个分块最终失败时停止其余工作协程，不再继续合成注定被丢弃的分块；
+        # 等它们真正结束后才返回，之后不会再有 on_result 等回调
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+    return results